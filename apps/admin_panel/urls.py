@@ -1,7 +1,8 @@
 from django.urls import path
+from . import views
 
 app_name = 'admin_panel'
 
 urlpatterns = [
-    # URLs will be added during implementation
+    path('uploads/', views.upload_queue_view, name='upload_queue'),
 ]
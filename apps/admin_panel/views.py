@@ -0,0 +1,25 @@
+from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.shortcuts import redirect, render
+
+from apps.core.models import PendingUpload
+from apps.core.upload_queue import get_queue_status, retry_uploads
+
+
+@staff_member_required
+def upload_queue_view(request):
+    """Write-behind upload queue: backlog, retries and failed uploads."""
+    if request.method == 'POST':
+        pks = request.POST.getlist('upload')
+        count = retry_uploads([int(pk) for pk in pks if pk.isdigit()] if pks else None)
+        messages.success(request, f"Requeued {count} failed upload(s).")
+        return redirect('admin_panel:upload_queue')
+
+    context = {
+        'status': get_queue_status(),
+        'failed_uploads': PendingUpload.objects.filter(status=PendingUpload.STATUS_FAILED)[:50],
+        'retrying_uploads': PendingUpload.objects.filter(
+            status=PendingUpload.STATUS_PENDING, attempts__gt=0
+        ).order_by('next_attempt_at')[:20],
+    }
+    return render(request, 'admin_panel/upload_queue.html', context)
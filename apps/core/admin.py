@@ -0,0 +1,29 @@
+from django.contrib import admin
+from .models import PendingUpload, StoredObject
+from .upload_queue import retry_uploads
+
+
+@admin.register(StoredObject)
+class StoredObjectAdmin(admin.ModelAdmin):
+    """Admin for the storage metadata index."""
+
+    list_display = ('name', 'bucket', 'size', 'content_type', 'updated_at')
+    list_filter = ('bucket', 'content_type')
+    search_fields = ('name',)
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(PendingUpload)
+class PendingUploadAdmin(admin.ModelAdmin):
+    """Admin for the write-behind upload queue."""
+
+    list_display = ('name', 'bucket', 'status', 'attempts', 'size', 'next_attempt_at', 'created_at')
+    list_filter = ('status', 'bucket')
+    search_fields = ('name', 'last_error')
+    readonly_fields = ('created_at', 'updated_at')
+    actions = ['retry_failed']
+
+    @admin.action(description='Retry selected failed uploads')
+    def retry_failed(self, request, queryset):
+        count = retry_uploads(list(queryset.values_list('pk', flat=True)))
+        self.message_user(request, f"Requeued {count} upload(s).")
@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.core'
+
+    def ready(self):
+        """Start the write-behind uploaders once serving."""
+        from .serving import on_serving_start
+        on_serving_start(start_uploaders)
+
+
+def start_uploaders():
+    """Start the write-behind uploaders for files spooled by a previous process."""
+    if getattr(settings, 'STORAGE_WRITE_BEHIND', {}).get('ENABLED', False):
+        from .upload_queue import get_upload_queue_worker
+        get_upload_queue_worker().start()
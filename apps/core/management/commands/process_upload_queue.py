@@ -0,0 +1,60 @@
+"""
+Upload files queued by the write-behind storage mode.
+
+Runs the same DB-backed queue as the in-process uploaders started by
+CoreConfig.ready(), so uploads can be drained by a dedicated process on the
+host that owns the spool directory.
+
+Usage:
+    python manage.py process_upload_queue              # run until interrupted
+    python manage.py process_upload_queue --once       # drain the queue and exit
+    python manage.py process_upload_queue --retry-failed --once
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.core.upload_queue import get_write_behind_config, retry_uploads, run_pending_uploads
+
+
+class Command(BaseCommand):
+    help = 'Upload spooled files queued by the write-behind storage mode'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Process every due upload, then exit'
+        )
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help='Requeue uploads that ran out of attempts first'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float,
+            help='Seconds between queue checks (default: STORAGE_WRITE_BEHIND POLL_INTERVAL)'
+        )
+
+    def handle(self, *args, **options):
+        config = get_write_behind_config()
+        poll_interval = options['poll_interval'] or config['POLL_INTERVAL']
+
+        if options['retry_failed']:
+            self.stdout.write(f"Requeued {retry_uploads()} failed upload(s)")
+
+        if options['once']:
+            processed = run_pending_uploads(config['STALE_AFTER'])
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} upload(s)"))
+            return
+
+        self.stdout.write(f"Waiting for queued uploads (polling every {poll_interval}s)...")
+        try:
+            while True:
+                close_old_connections()
+                processed = run_pending_uploads(config['STALE_AFTER'])
+                if processed:
+                    self.stdout.write(f"Processed {processed} upload(s)")
+                time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped")
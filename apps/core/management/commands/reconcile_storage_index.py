@@ -0,0 +1,91 @@
+"""
+Resync the storage metadata index (StoredObject) with the Supabase buckets.
+
+Lists every object in each bucket, adds or corrects index rows that are
+missing or have the wrong size / content type, and removes rows for
+objects that no longer exist. Run it once when enabling
+SUPABASE_STORAGE_INDEX, and whenever objects were changed outside the app.
+
+Rows written after the listing started are kept, so uploads that happen
+while the command runs are not dropped.
+
+Usage:
+    python manage.py reconcile_storage_index
+    python manage.py reconcile_storage_index --bucket soil-images --dry-run
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.core.models import StoredObject
+from config.storage_client import StorageError, get_storage_client
+
+# Rows written / deleted per query
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Resync the StoredObject index with the objects in the Supabase Storage buckets'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bucket', action='append',
+            help='Bucket to reconcile (repeatable; default: all SUPABASE_STORAGE_BUCKETS)'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Report differences without writing')
+
+    def handle(self, *args, **options):
+        client = get_storage_client()
+        if client is None:
+            raise CommandError("Supabase storage is not configured (SUPABASE_URL / SUPABASE_KEY)")
+
+        buckets = options['bucket'] or list(settings.SUPABASE_STORAGE_BUCKETS.values())
+        for bucket in buckets:
+            try:
+                self._reconcile(client, bucket, options['dry_run'])
+            except StorageError as e:
+                raise CommandError(f"Listing {bucket} failed: {e}")
+
+    def _reconcile(self, client, bucket, dry_run):
+        started = timezone.now()
+
+        remote = {}
+        for name, entry in client.walk(bucket):
+            metadata = entry.get('metadata') or {}
+            remote[name] = (int(metadata.get('size') or 0), metadata.get('mimetype') or '')
+
+        indexed = {
+            name: (size, content_type, pk, updated_at)
+            for pk, name, size, content_type, updated_at in StoredObject.objects.filter(
+                bucket=bucket
+            ).values_list('pk', 'name', 'size', 'content_type', 'updated_at').iterator()
+        }
+
+        changed = [
+            StoredObject(bucket=bucket, name=name, size=size, content_type=content_type)
+            for name, (size, content_type) in remote.items()
+            if indexed.get(name, (None, None))[:2] != (size, content_type)
+        ]
+        added = sum(1 for obj in changed if obj.name not in indexed)
+        stale = [
+            pk for name, (_, _, pk, updated_at) in indexed.items()
+            if name not in remote and updated_at < started
+        ]
+
+        if not dry_run:
+            StoredObject.objects.bulk_create(
+                changed,
+                batch_size=BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=['bucket', 'name'],
+                update_fields=['size', 'content_type', 'updated_at'],
+            )
+            for start in range(0, len(stale), BATCH_SIZE):
+                StoredObject.objects.filter(pk__in=stale[start:start + BATCH_SIZE]).delete()
+
+        prefix = '[dry run] ' if dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{bucket}: {len(remote)} object(s); {added} added, "
+            f"{len(changed) - added} updated, {len(stale)} removed"
+        ))
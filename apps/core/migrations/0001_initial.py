@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredObject',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.CharField(max_length=100, verbose_name='Bucket')),
+                ('name', models.CharField(max_length=255, verbose_name='Object Name')),
+                ('size', models.BigIntegerField(verbose_name='Size (bytes)')),
+                ('content_type', models.CharField(blank=True, max_length=100, verbose_name='Content Type')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Stored Object',
+                'verbose_name_plural': 'Stored Objects',
+                'ordering': ['bucket', 'name'],
+                'constraints': [models.UniqueConstraint(fields=('bucket', 'name'), name='unique_stored_object')],
+            },
+        ),
+    ]
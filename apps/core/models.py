@@ -0,0 +1,83 @@
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class StoredObject(models.Model):
+    """
+    Index of the objects in Supabase Storage buckets.
+
+    Kept up to date by SupabaseStorage._save() / delete() so exists() and
+    size() are a single indexed lookup instead of listing the bucket.
+    Resync with `manage.py reconcile_storage_index`.
+    """
+
+    bucket = models.CharField(max_length=100, verbose_name=_('Bucket'))
+    name = models.CharField(max_length=255, verbose_name=_('Object Name'))
+    size = models.BigIntegerField(verbose_name=_('Size (bytes)'))
+    content_type = models.CharField(max_length=100, blank=True, verbose_name=_('Content Type'))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Stored Object')
+        verbose_name_plural = _('Stored Objects')
+        ordering = ['bucket', 'name']
+        constraints = [
+            models.UniqueConstraint(fields=['bucket', 'name'], name='unique_stored_object'),
+        ]
+
+    def __str__(self):
+        return f"{self.bucket}/{self.name}"
+
+
+class PendingUpload(models.Model):
+    """
+    Write-behind upload queue (apps/core/upload_queue.py).
+
+    One row per file that is spooled on local disk but not yet in Supabase
+    Storage. The row is deleted once the upload succeeds.
+    """
+
+    STATUS_PENDING = 'pending'
+    STATUS_UPLOADING = 'uploading'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_UPLOADING, 'Uploading'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    bucket = models.CharField(max_length=100, verbose_name=_('Bucket'))
+    name = models.CharField(max_length=255, verbose_name=_('Object Name'))
+    size = models.BigIntegerField(verbose_name=_('Size (bytes)'))
+    content_type = models.CharField(max_length=100, blank=True, verbose_name=_('Content Type'))
+
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        db_index=True,
+        verbose_name=_('Status')
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name=_('Attempts'))
+    last_error = models.TextField(blank=True, verbose_name=_('Last Error'))
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        db_index=True,
+        verbose_name=_('Next Attempt')
+    )
+
+    # Metadata
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Pending Upload')
+        verbose_name_plural = _('Pending Uploads')
+        ordering = ['created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['bucket', 'name'], name='unique_pending_upload'),
+        ]
+
+    def __str__(self):
+        return f"{self.bucket}/{self.name} ({self.status})"
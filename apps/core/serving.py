@@ -0,0 +1,68 @@
+"""
+Serving-process Startup
+=======================
+Background threads (model warmup, soil job workers, write-behind uploaders)
+belong in the processes that serve requests. Started from
+AppConfig.ready() they would also run in a gunicorn --preload master and
+in the runserver autoreloader parent: the master claims queued work that
+its threads then hold while the workers fork without them.
+
+Apps register a starter with on_serving_start() from ready(). Starters run
+once per process, from whichever comes first:
+
+- gunicorn's post_worker_init hook (config/gunicorn.conf.py), after the
+  worker has loaded the application, so it can warm up before serving;
+- the first request the process handles (request_started), for servers
+  without that hook (runserver, uvicorn, ...).
+"""
+
+import logging
+import os
+import threading
+from typing import Callable, List, Optional
+
+from django.core.signals import request_started
+
+logger = logging.getLogger(__name__)
+
+_starters: List[Callable[[], None]] = []
+_started_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+def on_serving_start(starter: Callable[[], None]):
+    """Register a function to run once in each serving process."""
+    if starter not in _starters:
+        _starters.append(starter)
+    return starter
+
+
+def start_serving():
+    """Run the registered starters, once per process."""
+    global _started_pid
+    pid = os.getpid()
+    with _lock:
+        if _started_pid == pid:
+            return
+        _started_pid = pid
+
+    for starter in _starters:
+        try:
+            starter()
+        except Exception as e:
+            logger.error(f"[ERROR] Startup of {starter.__qualname__} failed: {e}")
+
+
+def _on_request_started(sender, **kwargs):
+    if _started_pid != os.getpid():
+        start_serving()
+
+
+def _reset_lock_after_fork():
+    # Another thread may hold the lock at fork time
+    global _lock
+    _lock = threading.Lock()
+
+
+request_started.connect(_on_request_started, dispatch_uid='core.serving.start')
+os.register_at_fork(after_in_child=_reset_lock_after_fork)
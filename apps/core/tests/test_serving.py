@@ -0,0 +1,104 @@
+"""
+Serving-process startup: background services start in serving processes only.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.test import SimpleTestCase
+
+from apps.core import serving
+
+
+class StartServingTests(SimpleTestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.starter = lambda: self.calls.append(os.getpid())
+        serving.on_serving_start(self.starter)
+        self.addCleanup(serving._starters.remove, self.starter)
+
+        started_pid = serving._started_pid
+        serving._started_pid = None
+        self.addCleanup(setattr, serving, '_started_pid', started_pid)
+
+    def test_first_request_starts_once(self):
+        request_started.send(sender=None)
+        request_started.send(sender=None)
+        serving.start_serving()
+
+        self.assertEqual(self.calls, [os.getpid()])
+
+    def test_starters_run_again_in_forked_child(self):
+        serving.start_serving()
+
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                request_started.send(sender=None)
+                os.write(write_fd, json.dumps(self.calls).encode())
+            finally:
+                os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as f:
+            child_calls = json.loads(f.read())
+        os.waitpid(pid, 0)
+
+        self.assertEqual(child_calls, [os.getpid(), pid])
+        self.assertEqual(self.calls, [os.getpid()])
+
+    def test_failing_starter_does_not_block_others(self):
+        def broken():
+            raise RuntimeError('boom')
+
+        serving._starters.insert(0, broken)
+        self.addCleanup(serving._starters.remove, broken)
+
+        with self.assertLogs('apps.core.serving', 'ERROR'):
+            serving.start_serving()
+        self.assertEqual(self.calls, [os.getpid()])
+
+
+class AppLoadingTests(SimpleTestCase):
+
+    def test_setup_does_not_start_warmup(self):
+        # What a gunicorn --preload master does: load the app, then fork
+        script = textwrap.dedent("""
+            import json, threading
+            import django
+            django.setup()
+            from django.core.signals import request_started
+            from apps.predictions.ml_services import warmup
+
+            after_setup = warmup._state['started']
+            request_started.send(sender=None)
+            print('RESULT', json.dumps([after_setup, warmup._state['started'],
+                              [t.name for t in threading.enumerate()]]))
+        """)
+        env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE='config.settings',
+            ML_WARMUP_ENABLED='True',
+            ML_WARMUP_BACKGROUND='True',
+            SOIL_ASYNC_JOBS='False',
+            STORAGE_WRITE_BEHIND='False',
+        )
+        output = subprocess.run(
+            [sys.executable, '-c', script],
+            cwd=Path(settings.BASE_DIR), env=env, capture_output=True, text=True, timeout=120,
+        )
+        self.assertEqual(output.returncode, 0, output.stderr)
+        # The warmup thread prints too; pick out our line
+        line = next(l for l in output.stdout.splitlines() if l.startswith('RESULT '))
+        after_setup, after_request, threads = json.loads(line[len('RESULT '):])
+
+        self.assertFalse(after_setup)
+        self.assertTrue(after_request)
+        self.assertIn('ml-warmup', threads)
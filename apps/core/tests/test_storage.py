@@ -0,0 +1,235 @@
+"""
+Storage metadata index (StoredObject) and the read-through disk cache, with
+a fake Supabase client.
+"""
+
+import io
+import os
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from apps.core.models import StoredObject
+from config import storage_cache, supabase_storage
+from config.storage_cache import DiskCache
+from config.supabase_storage import SupabaseStorage
+
+BUCKET = 'soil-images'
+
+
+class FakeStorageClient:
+    """In-memory bucket contents; listing the bucket counts as a failure."""
+
+    def __init__(self):
+        self.objects = {}
+        self.downloads = 0
+        self.during_walk = None
+
+    def upload(self, bucket, name, content, content_type='', upsert=False):
+        data = content.read() if hasattr(content, 'read') else bytes(content)
+        self.objects[(bucket, name)] = (data, content_type)
+
+    def remove(self, bucket, names):
+        for name in names:
+            self.objects.pop((bucket, name), None)
+        return []
+
+    def iter_objects(self, bucket, prefix='', page_size=1000):
+        raise AssertionError('listed the bucket instead of using the index')
+
+    def walk(self, bucket, prefix='', page_size=1000):
+        for (object_bucket, name), (data, content_type) in list(self.objects.items()):
+            if object_bucket == bucket:
+                yield name, {'metadata': {'size': len(data), 'mimetype': content_type}}
+        if self.during_walk is not None:
+            self.during_walk()
+
+
+class FakeReader(io.BytesIO):
+    """ObjectReader stand-in serving the fake client's objects."""
+
+    def __init__(self, client, bucket, name):
+        client.downloads += 1
+        super().__init__(client.objects[(bucket, name)][0])
+        self.size = len(self.getvalue())
+
+
+class StorageTestMixin:
+    def start_patches(self, *patches):
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def use_fake_client(self) -> FakeStorageClient:
+        client = FakeStorageClient()
+        self.start_patches(
+            mock.patch.object(supabase_storage, 'get_storage_client', lambda: client),
+            mock.patch.object(supabase_storage, 'ObjectReader', FakeReader),
+            mock.patch.object(supabase_storage.logger, 'disabled', True),
+        )
+        return client
+
+
+@override_settings(
+    SUPABASE_STORAGE=dict(settings.SUPABASE_STORAGE, INDEX_ENABLED=True),
+    STORAGE_WRITE_BEHIND={'ENABLED': False},
+    STORAGE_READ_CACHE={'ENABLED': False},
+)
+class StorageIndexTests(StorageTestMixin, TestCase):
+    def setUp(self):
+        self.client = self.use_fake_client()
+        self.storage = SupabaseStorage(BUCKET)
+
+    def test_save_indexes_object(self):
+        name = self.storage.save('soil.jpg', ContentFile(b'soil'))
+
+        row = StoredObject.objects.get(bucket=BUCKET, name=name)
+        self.assertEqual((row.size, row.content_type), (4, 'image/jpeg'))
+        # Answered from the index; FakeStorageClient refuses to list
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.storage.size(name), 4)
+        self.assertFalse(self.storage.exists('missing.jpg'))
+
+    def test_delete_removes_index_row(self):
+        name = self.storage.save('soil.jpg', ContentFile(b'soil'))
+        self.storage.delete(name)
+
+        self.assertFalse(StoredObject.objects.filter(bucket=BUCKET, name=name).exists())
+        self.assertFalse(self.storage.exists(name))
+
+    def test_reconcile(self):
+        self.client.objects[(BUCKET, 'unindexed.jpg')] = (b'12345', 'image/jpeg')
+        self.client.objects[(BUCKET, 'resized.jpg')] = (b'123', 'image/jpeg')
+        StoredObject.objects.create(bucket=BUCKET, name='resized.jpg', size=99, content_type='image/jpeg')
+        StoredObject.objects.create(bucket=BUCKET, name='gone.jpg', size=1, content_type='image/jpeg')
+        # Saved while the listing runs; not in the listing but must be kept
+        self.client.during_walk = lambda: StoredObject.objects.create(
+            bucket=BUCKET, name='new.jpg', size=2, content_type='image/jpeg'
+        )
+
+        with mock.patch(
+            'apps.core.management.commands.reconcile_storage_index.get_storage_client',
+            lambda: self.client
+        ):
+            call_command('reconcile_storage_index', bucket=[BUCKET], stdout=io.StringIO())
+
+        self.assertEqual(
+            dict(StoredObject.objects.filter(bucket=BUCKET).values_list('name', 'size')),
+            {'unindexed.jpg': 5, 'resized.jpg': 3, 'new.jpg': 2}
+        )
+
+
+class DiskCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.cache = self.make_cache()
+        # Fills get increasing ages, oldest first
+        self.clock = time.time() - 1000
+
+        patch = mock.patch.object(storage_cache.logger, 'disabled', True)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def make_cache(self) -> DiskCache:
+        return DiskCache(self.directory, max_size=1000, low_water=0.7)
+
+    def fill(self, name, size=300, cache=None):
+        cache = cache or self.cache
+        cache.fill(BUCKET, name, io.BytesIO(b'x' * size)).close()
+        self.clock += 10
+        path = cache.path(BUCKET, name)
+        if os.path.exists(path):
+            os.utime(path, (self.clock, self.clock))
+
+    def cached(self):
+        return sorted(
+            name for name in ('a', 'b', 'c', 'd', 'e')
+            if os.path.exists(self.cache.path(BUCKET, name))
+        )
+
+    def test_evicts_oldest_to_low_water(self):
+        for name in 'abc':
+            self.fill(name)
+        self.assertEqual(self.cached(), ['a', 'b', 'c'])
+
+        self.fill('d')
+        # 1200 bytes > 1000: drop the oldest until <= 700
+        self.assertEqual(self.cached(), ['c', 'd'])
+        self.assertEqual(self.cache.stats()['size'], 600)
+
+    def test_hit_marks_recently_used(self):
+        for name in 'abc':
+            self.fill(name)
+        self.cache.open(BUCKET, 'a').close()
+
+        self.fill('d')
+        self.assertEqual(self.cached(), ['a', 'd'])
+
+    def test_processes_share_the_budget(self):
+        for name in 'abc':
+            self.fill(name)
+
+        # Another process on the same directory scans it before counting
+        self.fill('d', cache=self.make_cache())
+        self.assertEqual(self.cached(), ['c', 'd'])
+
+    def test_ignores_partial_files(self):
+        self.fill('a')
+        with open(self.cache.path(BUCKET, 'b') + '.123.456.part', 'wb') as f:
+            f.write(b'x' * 5000)
+        self.assertEqual(self.cache.stats()['objects'], 1)
+        self.fill('c')
+        self.assertEqual(self.cached(), ['a', 'c'])
+
+
+class ReadCacheStorageTests(StorageTestMixin, SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(
+            SUPABASE_STORAGE=dict(settings.SUPABASE_STORAGE, INDEX_ENABLED=False),
+            STORAGE_WRITE_BEHIND={'ENABLED': False},
+            STORAGE_READ_CACHE={'ENABLED': True, 'DIR': directory.name, 'MAX_OBJECT_SIZE': 10},
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        storage_cache.reset_read_cache()
+        self.addCleanup(storage_cache.reset_read_cache)
+
+        self.client = self.use_fake_client()
+        self.storage = SupabaseStorage(BUCKET)
+
+    def read(self, name) -> bytes:
+        f = self.storage.open(name)
+        try:
+            return f.read()
+        finally:
+            f.close()
+
+    def test_second_read_is_served_from_disk(self):
+        self.client.objects[(BUCKET, 'soil.jpg')] = (b'soil', 'image/jpeg')
+
+        self.assertEqual(self.read('soil.jpg'), b'soil')
+        self.assertEqual(self.read('soil.jpg'), b'soil')
+        self.assertEqual(self.client.downloads, 1)
+
+    def test_large_objects_are_not_cached(self):
+        self.client.objects[(BUCKET, 'large.jpg')] = (b'x' * 11, 'image/jpeg')
+
+        self.assertEqual(self.read('large.jpg'), b'x' * 11)
+        self.assertEqual(self.read('large.jpg'), b'x' * 11)
+        self.assertEqual(self.client.downloads, 2)
+
+    def test_save_exact_drops_cached_copy(self):
+        self.client.objects[(BUCKET, 'thumbs/soil.jpg')] = (b'old', 'image/jpeg')
+        self.assertEqual(self.read('thumbs/soil.jpg'), b'old')
+
+        self.storage.save_exact('thumbs/soil.jpg', ContentFile(b'new'))
+        self.assertEqual(self.read('thumbs/soil.jpg'), b'new')
@@ -0,0 +1,160 @@
+"""
+Write-behind upload queue: claims, requeues and spool file cleanup, with a
+fake storage client.
+"""
+
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.core import upload_queue
+from apps.core.models import PendingUpload
+from config.storage_client import StorageError
+
+BUCKET = 'soil-images'
+NAME = 'soil_images/2025/01/01/soil.jpg'
+
+
+class FakeStorageClient:
+    """Records uploaded bytes; during_upload runs while an upload is in flight."""
+
+    def __init__(self):
+        self.uploads = []
+        self.during_upload = None
+        self.error = None
+
+    def upload(self, bucket, name, f, content_type='', upsert=False):
+        if self.during_upload is not None:
+            self.during_upload()
+        if self.error is not None:
+            raise self.error
+        self.uploads.append((bucket, name, f.read()))
+
+
+class UploadQueueTests(TestCase):
+    def setUp(self):
+        spool_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(spool_dir.cleanup)
+        self.client = FakeStorageClient()
+
+        settings_override = override_settings(STORAGE_WRITE_BEHIND={
+            'ENABLED': True,
+            'SPOOL_DIR': spool_dir.name,
+            'MAX_ATTEMPTS': 2,
+            'RETRY_BACKOFF': 10,
+        })
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        patches = [
+            # No uploader threads; the tests drive the queue
+            mock.patch.object(upload_queue, '_worker', upload_queue.UploadQueueWorker(workers=0)),
+            mock.patch.object(upload_queue, 'get_storage_client', lambda: self.client),
+            mock.patch('config.supabase_storage.index_object'),
+            mock.patch.object(upload_queue.logger, 'disabled', True),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        self.path = upload_queue.spool_path(BUCKET, NAME)
+
+    def read_spool(self) -> bytes:
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def test_upload_removes_row_and_spool_file(self):
+        upload_queue.enqueue_upload(BUCKET, NAME, b'soil', 'image/jpeg')
+
+        self.assertEqual(upload_queue.run_pending_uploads(), 1)
+        self.assertEqual(self.client.uploads, [(BUCKET, NAME, b'soil')])
+        self.assertFalse(PendingUpload.objects.exists())
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_claim_is_exclusive(self):
+        upload_queue.enqueue_upload(BUCKET, NAME, b'soil', 'image/jpeg')
+
+        pk = upload_queue.claim_next_upload()
+        self.assertIsNotNone(pk)
+        self.assertIsNone(upload_queue.claim_next_upload())
+
+        # A claim older than stale_after is taken over
+        PendingUpload.objects.filter(pk=pk).update(updated_at=timezone.now() - timedelta(seconds=600))
+        self.assertEqual(upload_queue.claim_next_upload(stale_after=300), pk)
+
+    def test_name_already_queued(self):
+        upload_queue.enqueue_upload(BUCKET, NAME, b'soil', 'image/jpeg')
+        with self.assertRaises(FileExistsError):
+            upload_queue.enqueue_upload(BUCKET, NAME, b'other', 'image/jpeg')
+        self.assertEqual(self.read_spool(), b'soil')
+
+    def test_row_without_spool_file_keeps_no_orphan(self):
+        PendingUpload.objects.create(bucket=BUCKET, name=NAME, size=4)
+        with self.assertRaises(FileExistsError):
+            upload_queue.enqueue_upload(BUCKET, NAME, b'soil', 'image/jpeg')
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_failed_row_insert_removes_spool_file(self):
+        with mock.patch.object(PendingUpload.objects, 'create', side_effect=DatabaseError('connection lost')):
+            with self.assertRaises(DatabaseError):
+                upload_queue.enqueue_upload(BUCKET, NAME, b'soil', 'image/jpeg')
+        self.assertFalse(os.path.exists(self.path))
+
+        with mock.patch.object(PendingUpload.objects, 'update_or_create', side_effect=DatabaseError('connection lost')):
+            with self.assertRaises(DatabaseError):
+                upload_queue.enqueue_upload(BUCKET, NAME, b'soil', 'image/jpeg', replace=True)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_replaced_during_upload_is_requeued(self):
+        upload_queue.enqueue_upload(BUCKET, NAME, b'old', 'image/jpeg')
+        self.client.during_upload = lambda: upload_queue.enqueue_upload(
+            BUCKET, NAME, b'new', 'image/jpeg', replace=True
+        )
+
+        pk = upload_queue.claim_next_upload()
+        self.assertEqual(upload_queue.process_upload(pk), 'requeued')
+        self.assertEqual(PendingUpload.objects.get().status, PendingUpload.STATUS_PENDING)
+        self.assertEqual(self.read_spool(), b'new')
+
+        self.client.during_upload = None
+        upload_queue.run_pending_uploads()
+        self.assertEqual(self.client.uploads[-1], (BUCKET, NAME, b'new'))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_replaced_after_row_delete_keeps_new_spool_file(self):
+        upload_queue.enqueue_upload(BUCKET, NAME, b'old', 'image/jpeg')
+
+        def replace_spool_file(*args):
+            # enqueue_upload(replace=True) between its file move and its row insert
+            tmp_path = f'{self.path}.part'
+            with open(tmp_path, 'wb') as f:
+                f.write(b'new')
+            os.replace(tmp_path, self.path)
+
+        pk = upload_queue.claim_next_upload()
+        with mock.patch('config.supabase_storage.index_object', side_effect=replace_spool_file):
+            self.assertEqual(upload_queue.process_upload(pk), 'uploaded')
+        self.assertEqual(self.read_spool(), b'new')
+
+    def test_failed_upload_is_retried_then_failed(self):
+        upload_queue.enqueue_upload(BUCKET, NAME, b'soil', 'image/jpeg')
+        self.client.error = StorageError('503 from storage')
+
+        before = timezone.now()
+        upload_queue.run_pending_uploads()
+        row = PendingUpload.objects.get()
+        self.assertEqual((row.status, row.attempts), (PendingUpload.STATUS_PENDING, 1))
+        self.assertGreaterEqual(row.next_attempt_at, before + timedelta(seconds=10))
+        self.assertIsNone(upload_queue.claim_next_upload())
+
+        PendingUpload.objects.update(next_attempt_at=timezone.now())
+        upload_queue.run_pending_uploads()
+        row = PendingUpload.objects.get()
+        self.assertEqual((row.status, row.attempts), (PendingUpload.STATUS_FAILED, 2))
+        # Still served from the spool until retried
+        self.assertEqual(self.read_spool(), b'soil')
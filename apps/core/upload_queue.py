@@ -0,0 +1,435 @@
+"""
+Write-behind Image Uploads
+==========================
+With settings.STORAGE_WRITE_BEHIND['ENABLED'], SupabaseStorage._save()
+writes the file to a local spool directory under its final object name,
+records a PendingUpload row and returns immediately. The request no longer
+waits on Supabase.
+
+Until the upload lands, SupabaseStorage serves the name from the spool file
+(url() points at core:spooled_upload, _open() reads the local copy). Worker
+threads push spooled files to the bucket with bounded concurrency (WORKERS),
+then delete the row and the spool file; from then on the same name resolves
+to Supabase. Model rows never need rewriting because the name does not
+change.
+
+Spooling never replaces a queued name unless asked to (save_exact()):
+enqueue_upload() raises FileExistsError and SupabaseStorage._save() picks
+another name. A name re-queued while its upload is in flight keeps the
+claim; the uploader sees the row changed (updated_at) and hands it back to
+the queue instead of deleting it, so the newer content is uploaded next.
+The uploader only removes the spool file it uploaded, never a newer one
+written under the same name meanwhile.
+
+The PendingUpload table is the queue, claimed with an atomic status update
+like the soil job queue (apps/predictions/soil_jobs.py), so pending uploads
+survive restarts and can also be drained by `manage.py process_upload_queue`.
+Failed attempts are retried with exponential backoff; after MAX_ATTEMPTS the
+row is marked FAILED and shown on /admin-panel/uploads/ for a manual retry.
+
+All processes that run uploaders must see the same SPOOL_DIR (one host, or
+a shared volume).
+"""
+
+import logging
+import os
+import threading
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Count, Min, Q, Sum
+from django.utils import timezone
+from django.utils._os import safe_join
+
+from config.storage_client import StorageError, get_storage_client
+
+from .models import PendingUpload
+
+logger = logging.getLogger(__name__)
+
+# Length of PendingUpload.last_error kept per attempt
+_MAX_ERROR_LENGTH = 1000
+
+
+def get_write_behind_config() -> Dict:
+    """settings.STORAGE_WRITE_BEHIND with defaults."""
+    config = {
+        'ENABLED': False,
+        'SPOOL_DIR': str(Path(settings.BASE_DIR) / 'upload_spool'),
+        'WORKERS': 2,
+        'POLL_INTERVAL': 5.0,
+        'STALE_AFTER': 300,
+        'MAX_ATTEMPTS': 10,
+        'RETRY_BACKOFF': 10.0,
+        'MAX_BACKOFF': 3600.0,
+    }
+    config.update(getattr(settings, 'STORAGE_WRITE_BEHIND', {}))
+    return config
+
+
+def spool_path(bucket: str, name: str) -> str:
+    """Local path of a spooled object (raises SuspiciousFileOperation on '..')."""
+    return safe_join(get_write_behind_config()['SPOOL_DIR'], bucket, name)
+
+
+def is_spooled(bucket: str, name: str) -> bool:
+    """True while the object is waiting in the spool directory."""
+    try:
+        return os.path.isfile(spool_path(bucket, name))
+    except (SuspiciousFileOperation, ValueError):
+        return False
+
+
+def enqueue_upload(bucket: str, name: str, content, content_type: str, replace: bool = False) -> str:
+    """
+    Spool content to local disk and queue its upload.
+
+    Args:
+        bucket: Target bucket
+        name: Final object name
+        content: Django File or bytes
+        content_type: MIME type stored with the object
+        replace: Replace an upload of the same name that is still queued
+
+    Returns:
+        name
+
+    Raises:
+        FileExistsError: name is already queued and replace is False
+    """
+    path = spool_path(bucket, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Write to a temp file first so a crash never leaves a truncated spool file
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+    size = 0
+    try:
+        with open(tmp_path, 'wb') as f:
+            for chunk in [content] if isinstance(content, (bytes, bytearray)) else content.chunks():
+                f.write(chunk)
+                size += len(chunk)
+        if replace:
+            os.replace(tmp_path, path)
+        else:
+            # Unlike replace(), link() fails if the name is already spooled
+            os.link(tmp_path, path)
+    finally:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+    try:
+        _queue_row(bucket, name, size, content_type, replace)
+    except Exception as e:
+        # Without a row nothing would ever upload or remove the spool file
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        if isinstance(e, IntegrityError):
+            # Queued without a spool file (e.g. removed by hand); keep the row
+            raise FileExistsError(f"{bucket}/{name} is already queued")
+        raise
+
+    get_upload_queue_worker().notify()
+    return name
+
+
+def _queue_row(bucket: str, name: str, size: int, content_type: str, replace: bool):
+    """Insert (or with replace, reset) the PendingUpload row of a spooled file."""
+    now = timezone.now()
+    fields = {
+        'size': size,
+        'content_type': content_type,
+        'attempts': 0,
+        'last_error': '',
+        'next_attempt_at': now,
+    }
+    if replace:
+        # An upload in flight keeps its claim and requeues the row when it
+        # finishes (see process_upload), so the new content goes up after it
+        in_flight = PendingUpload.objects.filter(
+            bucket=bucket, name=name, status=PendingUpload.STATUS_UPLOADING
+        ).update(updated_at=now, **fields)
+        if not in_flight:
+            PendingUpload.objects.update_or_create(
+                bucket=bucket, name=name,
+                defaults=dict(fields, status=PendingUpload.STATUS_PENDING)
+            )
+    else:
+        with transaction.atomic():
+            PendingUpload.objects.create(bucket=bucket, name=name, **fields)
+
+
+def cancel_upload(bucket: str, name: str) -> bool:
+    """Drop a queued upload and its spool file; True if it was queued."""
+    deleted, _ = PendingUpload.objects.filter(bucket=bucket, name=name).delete()
+    try:
+        os.remove(spool_path(bucket, name))
+    except OSError:
+        pass
+    return bool(deleted)
+
+
+def claim_next_upload(stale_after: float = 300) -> Optional[int]:
+    """
+    Atomically move the oldest due upload to UPLOADING.
+
+    Returns:
+        The claimed PendingUpload pk, or None if nothing is due
+    """
+    now = timezone.now()
+    runnable = Q(status=PendingUpload.STATUS_PENDING, next_attempt_at__lte=now) | Q(
+        status=PendingUpload.STATUS_UPLOADING,
+        updated_at__lt=now - timedelta(seconds=stale_after)
+    )
+    candidates = (
+        PendingUpload.objects.filter(runnable)
+        .order_by('next_attempt_at')
+        .values_list('pk', 'status', 'updated_at')[:10]
+    )
+    for pk, status, updated_at in candidates:
+        # Only one process wins the update for a given (status, updated_at)
+        claimed = PendingUpload.objects.filter(
+            pk=pk, status=status, updated_at=updated_at
+        ).update(status=PendingUpload.STATUS_UPLOADING, updated_at=now)
+        if claimed:
+            return pk
+    return None
+
+
+def process_upload(pk: int) -> str:
+    """
+    Push one claimed upload to Supabase Storage.
+
+    Returns:
+        'uploaded', 'cancelled' (row deleted meanwhile), 'requeued' (name
+        saved again meanwhile), or the row's new status after a failed
+        attempt
+    """
+    try:
+        upload = PendingUpload.objects.get(pk=pk)
+    except PendingUpload.DoesNotExist:
+        return 'cancelled'
+
+    path = spool_path(upload.bucket, upload.name)
+    client = get_storage_client()
+    try:
+        if client is None:
+            raise StorageError("Supabase storage is not configured")
+        f = open(path, 'rb')
+    except (StorageError, OSError) as e:
+        return _record_failure(upload, e)
+
+    # Kept open until the spool file is removed, so its inode cannot be reused
+    with f:
+        try:
+            # upsert: an earlier attempt may have landed before the process died
+            client.upload(upload.bucket, upload.name, f, content_type=upload.content_type, upsert=True)
+        except (StorageError, OSError) as e:
+            return _record_failure(upload, e)
+
+        # updated_at changes when the name is saved again during the upload (or
+        # a stale claim is taken over); that row and spool file are not ours
+        deleted, _ = PendingUpload.objects.filter(pk=pk, updated_at=upload.updated_at).delete()
+        if not deleted:
+            # Never remove the remote object here: it may be another uploader's copy
+            return _requeue_superseded(upload)
+
+        from config.supabase_storage import index_object
+        index_object(upload.bucket, upload.name, upload.size, upload.content_type)
+
+        _remove_uploaded_file(path, f)
+    logger.info(f"[INFO] Uploaded {upload.bucket}/{upload.name} (attempt {upload.attempts + 1})")
+    return 'uploaded'
+
+
+def _remove_uploaded_file(path: str, uploaded) -> bool:
+    """
+    Remove the spool file at path if it is still the open file we uploaded.
+
+    enqueue_upload(replace=True) may have moved a newer file into place
+    after the row was deleted; that file is left for its own row.
+    """
+    try:
+        current = os.stat(path)
+    except OSError:
+        return False
+    ours = os.fstat(uploaded.fileno())
+    if (current.st_dev, current.st_ino) != (ours.st_dev, ours.st_ino):
+        return False
+    try:
+        os.remove(path)
+    except OSError:
+        return False
+    return True
+
+
+def _record_failure(upload: PendingUpload, error: Exception) -> str:
+    """Schedule a retry with exponential backoff, or mark the upload FAILED."""
+    config = get_write_behind_config()
+    attempts = upload.attempts + 1
+    status = PendingUpload.STATUS_FAILED if attempts >= config['MAX_ATTEMPTS'] else PendingUpload.STATUS_PENDING
+    delay = min(config['RETRY_BACKOFF'] * (2 ** (attempts - 1)), config['MAX_BACKOFF'])
+    now = timezone.now()
+
+    recorded = PendingUpload.objects.filter(pk=upload.pk, updated_at=upload.updated_at).update(
+        status=status,
+        attempts=attempts,
+        last_error=str(error)[:_MAX_ERROR_LENGTH],
+        next_attempt_at=now + timedelta(seconds=delay),
+        updated_at=now
+    )
+    if not recorded:
+        return _requeue_superseded(upload)
+    if status == PendingUpload.STATUS_FAILED:
+        logger.error(f"[ERROR] Upload of {upload.bucket}/{upload.name} failed after {attempts} attempts: {error}")
+    else:
+        logger.warning(f"[WARNING] Upload of {upload.bucket}/{upload.name} failed (attempt {attempts}), retrying in {delay:.0f}s: {error}")
+    return status
+
+
+def _requeue_superseded(upload: PendingUpload) -> str:
+    """Release a row that changed during our attempt so it is uploaded again."""
+    now = timezone.now()
+    requeued = PendingUpload.objects.filter(
+        pk=upload.pk, status=PendingUpload.STATUS_UPLOADING
+    ).update(status=PendingUpload.STATUS_PENDING, next_attempt_at=now, updated_at=now)
+    if not requeued:
+        # storage.delete() removed the row meanwhile
+        return 'cancelled'
+    logger.info(f"[INFO] {upload.bucket}/{upload.name} changed during upload, requeued")
+    return 'requeued'
+
+
+def run_pending_uploads(stale_after: float = 300, limit: Optional[int] = None) -> int:
+    """Claim and process uploads until none are due (or limit is reached)."""
+    processed = 0
+    while limit is None or processed < limit:
+        pk = claim_next_upload(stale_after)
+        if pk is None:
+            break
+        process_upload(pk)
+        processed += 1
+    return processed
+
+
+def retry_uploads(pks: Optional[List[int]] = None) -> int:
+    """Requeue FAILED uploads (all, or the given pks) with a fresh attempt budget."""
+    rows = PendingUpload.objects.filter(status=PendingUpload.STATUS_FAILED)
+    if pks is not None:
+        rows = rows.filter(pk__in=pks)
+    count = rows.update(
+        status=PendingUpload.STATUS_PENDING, attempts=0,
+        next_attempt_at=timezone.now(), updated_at=timezone.now()
+    )
+    if count:
+        get_upload_queue_worker().notify()
+    return count
+
+
+def get_queue_status() -> Dict:
+    """Backlog, retry and failure numbers for the admin status page."""
+    totals = PendingUpload.objects.aggregate(
+        total=Count('pk'),
+        pending=Count('pk', filter=Q(status=PendingUpload.STATUS_PENDING)),
+        uploading=Count('pk', filter=Q(status=PendingUpload.STATUS_UPLOADING)),
+        failed=Count('pk', filter=Q(status=PendingUpload.STATUS_FAILED)),
+        retrying=Count('pk', filter=Q(status=PendingUpload.STATUS_PENDING, attempts__gt=0)),
+        failed_attempts=Sum('attempts'),
+        backlog_bytes=Sum('size'),
+        oldest=Min('created_at'),
+    )
+    config = get_write_behind_config()
+    return dict(
+        totals,
+        failed_attempts=totals['failed_attempts'] or 0,
+        backlog_bytes=totals['backlog_bytes'] or 0,
+        oldest_age=(timezone.now() - totals['oldest']).total_seconds() if totals['oldest'] else None,
+        enabled=config['ENABLED'],
+        workers=config['WORKERS'],
+        workers_alive=get_upload_queue_worker().alive(),
+        spool_dir=config['SPOOL_DIR'],
+        max_attempts=config['MAX_ATTEMPTS'],
+    )
+
+
+class UploadQueueWorker:
+    """In-process uploader threads that drain the PendingUpload table."""
+
+    def __init__(self, workers: int = 2, poll_interval: float = 5.0, stale_after: float = 300):
+        # 0: no in-process threads, uploads are left to `manage.py process_upload_queue`
+        self.workers = max(int(workers), 0)
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+
+        self._wakeup = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._threads_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def notify(self):
+        """Wake the uploaders after a file was spooled (starting them if needed)."""
+        self.start()
+        self._wakeup.set()
+
+    def alive(self) -> int:
+        """Uploader threads running in this process."""
+        if self._threads_pid != os.getpid():
+            return 0
+        return sum(t.is_alive() for t in self._threads)
+
+    def start(self):
+        """Start the uploader threads (again after a fork, e.g. gunicorn preload)."""
+        pid = os.getpid()
+        if self._threads_pid == pid and all(t.is_alive() for t in self._threads):
+            return
+
+        with self._lock:
+            if self._threads_pid == pid and all(t.is_alive() for t in self._threads):
+                return
+            if self._threads_pid != pid:
+                self._threads = []
+                self._wakeup = threading.Event()
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for i in range(len(self._threads), self.workers):
+                thread = threading.Thread(target=self._run, name=f'storage-uploads-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            self._threads_pid = pid
+
+    def _run(self):
+        """Uploader loop: drain due uploads, then sleep until notified or polled."""
+        while True:
+            close_old_connections()
+            try:
+                run_pending_uploads(self.stale_after)
+            except Exception as e:
+                logger.error(f"[ERROR] Upload queue worker error: {e}")
+            finally:
+                close_old_connections()
+
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+
+# Singleton instance
+_worker: Optional[UploadQueueWorker] = None
+
+
+def get_upload_queue_worker() -> UploadQueueWorker:
+    """Get or create the upload queue worker singleton."""
+    global _worker
+    if _worker is None:
+        config = get_write_behind_config()
+        _worker = UploadQueueWorker(
+            workers=config['WORKERS'],
+            poll_interval=config['POLL_INTERVAL'],
+            stale_after=config['STALE_AFTER']
+        )
+    return _worker
@@ -8,4 +8,5 @@ urlpatterns = [
     path('dashboard/', views.dashboard, name='dashboard'),
     path('about/', views.about, name='about'),
     path('contact/', views.contact, name='contact'),
+    path('media/spool/<str:bucket>/<path:name>', views.spooled_upload, name='spooled_upload'),
 ]
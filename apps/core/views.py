@@ -1,5 +1,12 @@
-from django.shortcuts import render
+import mimetypes
+
+from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404
+
+from config.storage_client import get_storage_client
+from .upload_queue import spool_path
 
 
 def landing_page(request):
@@ -23,6 +30,26 @@ def contact(request):
     return render(request, 'core/contact.html')
 
 
+def spooled_upload(request, bucket, name):
+    """
+    Serve an upload that is still waiting in the write-behind spool.
+
+    SupabaseStorage.url() points here until the background upload lands;
+    afterwards the same link redirects to the Supabase public URL.
+    """
+    try:
+        path = spool_path(bucket, name)
+        response = FileResponse(open(path, 'rb'), content_type=mimetypes.guess_type(name)[0])
+    except (SuspiciousFileOperation, FileNotFoundError, IsADirectoryError):
+        client = get_storage_client()
+        if client is None:
+            raise Http404("File not found")
+        return redirect(client.public_url(bucket, name))
+    # The URL changes to Supabase once uploaded, so don't let it be cached
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
 def error_404(request, exception):
     """Custom 404 error page."""
     return render(request, 'core/404.html', status=404)
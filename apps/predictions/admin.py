@@ -33,10 +33,10 @@ class CropPredictionAdmin(admin.ModelAdmin):
 class SoilClassificationAdmin(admin.ModelAdmin):
     """Admin for Soil Classifications."""
 
-    list_display = ('user', 'soil_type', 'confidence_score', 'location', 'created_at')
-    list_filter = ('soil_type', 'created_at')
+    list_display = ('user', 'status', 'soil_type', 'confidence_score', 'location', 'created_at')
+    list_filter = ('status', 'soil_type', 'created_at')
     search_fields = ('user__username', 'location')
-    readonly_fields = ('created_at',)
+    readonly_fields = ('created_at', 'updated_at')
 
 
 @admin.register(FertilizerRecommendation)
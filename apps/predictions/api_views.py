@@ -0,0 +1,245 @@
+"""
+Crop Prediction JSON API
+========================
+JSON endpoints for integrations that do not need the HTML form flow:
+
+- POST /predictions/api/crop/       one feature object
+- POST /predictions/api/crop/bulk/  {"rows": [feature objects]}, up to
+  settings.CROP_API['MAX_BULK_ROWS'] rows
+- POST /predictions/api/crop/score-file/  multipart 'file' (CSV or
+  Parquet); streams back a CSV with the top-3 crops appended (see
+  crop_scoring.py)
+- POST /predictions/api/crop/stream/  NDJSON feature records (chunked
+  bodies welcome); streams back one NDJSON result per record
+
+Rows are scored with CropPredictor.predict_batch() (single predictions go
+through the micro-batcher), and results use the same structure as
+CropPrediction.top_3_crops. Predictions are stored like the form view's
+unless the query string has ?persist=false.
+
+The file and stream endpoints answer 503 when the crop model is not
+loaded, instead of streaming mock predictions.
+
+Session authentication; POSTs need the CSRF token (X-CSRFToken header).
+"""
+
+import json
+import re
+from functools import wraps
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
+
+from .crop_scoring import (
+    FeatureChunks,
+    FeatureError,
+    ScoringInputError,
+    get_file_format,
+    iter_scored_csv,
+    iter_scored_ndjson,
+    parse_feature_rows,
+)
+from .models import CropPrediction, PredictionHistory
+from .ml_services.batching import get_crop_batcher
+from .ml_services.crop_predictor import FEATURE_KEYS, get_crop_predictor
+
+
+def get_crop_api_config() -> Dict:
+    """settings.CROP_API with defaults."""
+    config = {
+        'MAX_BULK_ROWS': 1000,
+        'FILE_CHUNK_ROWS': 5000,
+        'STREAM_BATCH_SIZE': 256,
+        'STREAM_MAX_WAIT_MS': 50,
+    }
+    config.update(getattr(settings, 'CROP_API', {}))
+    return config
+
+
+def api_login_required(view):
+    """Like login_required, but answers 401 JSON instead of redirecting."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def _model_unavailable() -> Optional[JsonResponse]:
+    """503 response when the crop model cannot be loaded, else None."""
+    if get_crop_predictor().load():
+        return None
+    return JsonResponse({'error': 'Crop prediction model is not available'}, status=503)
+
+
+def _load_json(request):
+    """Parsed request body, or None when it is not valid JSON."""
+    try:
+        return json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _request_stream(request):
+    """
+    Binary stream of the request body.
+
+    Django reads a WSGI body only up to CONTENT_LENGTH, so a chunked body
+    (no Content-Length) is read from wsgi.input directly when the server
+    marks it as terminated (gunicorn does). Under ASGI the request itself
+    already covers the whole body.
+    """
+    environ = getattr(request, 'environ', None)
+    if environ and 'CONTENT_LENGTH' not in environ and environ.get('wsgi.input_terminated'):
+        return environ['wsgi.input']
+    return request
+
+
+def _persist_requested(request) -> bool:
+    return request.GET.get('persist', 'true').lower() not in ('false', '0', 'no')
+
+
+def _save_predictions(user, X: np.ndarray, locations, results: List[Dict]) -> List[int]:
+    """Store predictions and their history entries in one transaction."""
+    predictions = [
+        CropPrediction(
+            user=user,
+            **dict(zip(FEATURE_KEYS, row)),
+            location=location,
+            predicted_crop=result['predicted_crop'],
+            confidence_score=result['confidence_score'],
+            top_3_crops=result['top_3_crops'],
+        )
+        for row, location, result in zip(X.tolist(), locations, results)
+    ]
+    history = [
+        PredictionHistory(
+            user=user,
+            prediction_type='crop',
+            result_summary=f"Predicted crop: {result['predicted_crop']} (Confidence: {result['confidence_score']})"
+        )
+        for result in results
+    ]
+    with transaction.atomic():
+        CropPrediction.objects.bulk_create(predictions)
+        PredictionHistory.objects.bulk_create(history)
+    return [prediction.pk for prediction in predictions]
+
+
+def _serialize(result: Dict, pk: Optional[int]) -> Dict:
+    """API representation of one prediction."""
+    return {
+        'id': pk,
+        'predicted_crop': result['predicted_crop'],
+        'confidence_score': result['confidence_score'],
+        'top_3_crops': result['top_3_crops'],
+    }
+
+
+@api_login_required
+@require_POST
+def crop_predict_api_view(request):
+    """Predict crops for one feature object."""
+    data = _load_json(request)
+    if not isinstance(data, dict):
+        return JsonResponse({'error': 'Expected a JSON object'}, status=400)
+    try:
+        X, locations = parse_feature_rows([data], prefix='')
+    except FeatureError as e:
+        return JsonResponse({'error': 'Invalid input', 'fields': e.errors}, status=400)
+
+    # Concurrent single predictions are coalesced into one batch when enabled
+    result = get_crop_batcher().predict(dict(zip(FEATURE_KEYS, X[0].tolist())))
+
+    persist = _persist_requested(request)
+    pk = _save_predictions(request.user, X, locations, [result])[0] if persist else None
+
+    return JsonResponse(dict(_serialize(result, pk), persisted=persist))
+
+
+@api_login_required
+@require_POST
+def crop_predict_bulk_api_view(request):
+    """Predict crops for {"rows": [...]} in a single batched forward pass."""
+    data = _load_json(request)
+    rows = data.get('rows') if isinstance(data, dict) else None
+    if not isinstance(rows, list) or not rows:
+        return JsonResponse({'error': 'Expected {"rows": [...]} with at least one row'}, status=400)
+
+    max_rows = get_crop_api_config()['MAX_BULK_ROWS']
+    if len(rows) > max_rows:
+        return JsonResponse(
+            {'error': f'Too many rows ({len(rows)}); the limit is {max_rows}'}, status=400
+        )
+
+    try:
+        X, locations = parse_feature_rows(rows)
+    except FeatureError as e:
+        return JsonResponse({'error': 'Invalid input', 'fields': e.errors}, status=400)
+
+    results = get_crop_predictor().predict_batch(X)
+
+    persist = _persist_requested(request)
+    pks = _save_predictions(request.user, X, locations, results) if persist else [None] * len(results)
+
+    return JsonResponse({
+        'count': len(results),
+        'persisted': persist,
+        'results': [_serialize(result, pk) for result, pk in zip(results, pks)],
+    })
+
+
+@api_login_required
+@require_POST
+def crop_score_file_api_view(request):
+    """Score an uploaded CSV / Parquet file and stream back a scored CSV."""
+    uploaded = request.FILES.get('file')
+    if uploaded is None:
+        return JsonResponse({'error': "Upload the file as multipart field 'file'"}, status=400)
+
+    try:
+        fmt = get_file_format(uploaded.name, request.POST.get('format', ''))
+        # Reads and validates the header before the response starts
+        chunks = FeatureChunks(uploaded, fmt, get_crop_api_config()['FILE_CHUNK_ROWS'])
+    except ScoringInputError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    unavailable = _model_unavailable()
+    if unavailable is not None:
+        return unavailable
+
+    response = StreamingHttpResponse(
+        iter_scored_csv(chunks, get_crop_predictor()), content_type='text/csv'
+    )
+    filename = re.sub(r'[^\w.-]', '_', Path(uploaded.name).stem) or 'crops'
+    response['Content-Disposition'] = f'attachment; filename="{filename}_scored.csv"'
+    return response
+
+
+@api_login_required
+@require_POST
+def crop_predict_stream_api_view(request):
+    """Score NDJSON feature records as they arrive and stream NDJSON results back."""
+    unavailable = _model_unavailable()
+    if unavailable is not None:
+        return unavailable
+
+    config = get_crop_api_config()
+    response = StreamingHttpResponse(
+        iter_scored_ndjson(
+            _request_stream(request),
+            get_crop_predictor(),
+            batch_size=config['STREAM_BATCH_SIZE'],
+            max_wait=config['STREAM_MAX_WAIT_MS'] / 1000.0
+        ),
+        content_type='application/x-ndjson'
+    )
+    # Ask nginx not to buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,25 @@
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class PredictionsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.predictions'
+
+    def ready(self):
+        """Warm the ML models and start the soil job workers once serving."""
+        from apps.core.serving import on_serving_start
+        on_serving_start(start_ml_services)
+
+
+def start_ml_services():
+    """Optionally warm the ML models and start the soil job workers."""
+    from .ml_services.warmup import get_warmup_config, start_warmup
+    config = get_warmup_config()
+    if config['ENABLED']:
+        start_warmup(background=config['BACKGROUND'])
+
+    # Pick up jobs left pending by a previous process
+    if getattr(settings, 'SOIL_ASYNC_JOBS', {}).get('ENABLED', False):
+        from .soil_jobs import get_soil_job_worker
+        get_soil_job_worker().start()
@@ -0,0 +1,165 @@
+"""
+Async Prediction Views
+======================
+ASGI-native variants of the crop prediction and soil classification views,
+served under /predictions/async/. Pages, forms and results are the same as
+the sync views in views.py.
+
+Under an ASGI server (uvicorn config.asgi:application) a request that is
+waiting on inference, storage or the database holds no thread, so one
+worker can keep many slow mobile uploads in flight:
+
+- inference runs on the crop batcher / soil inference executor threads and
+  is awaited
+- image hashing and resizing run in worker threads
+- database work (including storage writes, which update the metadata index
+  and upload queue) runs on Django's sync thread, through the async ORM API
+  (asave / acreate) or sync_to_async, so connections are managed as usual
+
+Under WSGI these views still work, but gain nothing over the sync ones.
+"""
+
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import redirect, render
+from django.views.decorators.http import require_http_methods
+
+from .forms import CropPredictionForm, SoilClassificationForm
+from .models import PredictionHistory
+from .ml_services.batching import get_crop_batcher
+from .ml_services.inference_executor import InferenceQueueFull, get_soil_executor
+from .ml_services.soil_classifier import get_soil_classifier
+from .soil_derivatives import prepare_derivatives, store_derivatives
+from .soil_jobs import get_soil_job_worker
+from .soil_uploads import hash_soil_upload, plan_soil_upload
+
+# Template rendering touches request.user and the session (sync ORM)
+_render = sync_to_async(render)
+
+
+def async_login_required(view):
+    """login_required for async views (Django 5.0's decorator is sync-only)."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def _predict_crop(features):
+    """Crop prediction, run off the event loop (loads the model on first use)."""
+    return get_crop_batcher().predict(features)
+
+
+def _classify_soil(source):
+    """Soil classification, run on the inference executor."""
+    return get_soil_classifier().classify(source)
+
+
+@async_login_required
+@require_http_methods(["GET", "POST"])
+async def crop_prediction_view(request):
+    """Async view for crop prediction."""
+    if request.method == 'POST':
+        form = CropPredictionForm(request.POST)
+        if await sync_to_async(form.is_valid)():
+            prediction = form.save(commit=False)
+            prediction.user = request.user
+
+            features = {
+                'nitrogen': prediction.nitrogen,
+                'phosphorus': prediction.phosphorus,
+                'potassium': prediction.potassium,
+                'temperature': prediction.temperature,
+                'humidity': prediction.humidity,
+                'ph_value': prediction.ph_value,
+                'rainfall': prediction.rainfall,
+            }
+
+            # The batcher blocks its caller until the batch is scored, so
+            # wait for it in a worker thread rather than on the event loop
+            result = await sync_to_async(_predict_crop, thread_sensitive=False)(features)
+
+            prediction.predicted_crop = result['predicted_crop']
+            prediction.confidence_score = result['confidence_score']
+            prediction.top_3_crops = result['top_3_crops']
+            await prediction.asave()
+
+            await PredictionHistory.objects.acreate(
+                user=request.user,
+                prediction_type='crop',
+                result_summary=f"Predicted crop: {result['predicted_crop']} (Confidence: {result['confidence_score']})"
+            )
+
+            messages.success(request, f"Prediction successful! Recommended crop: {result['predicted_crop']}")
+            return redirect('predictions:crop_result', pk=prediction.pk)
+        else:
+            messages.error(request, "Please correct the errors below.")
+    else:
+        form = CropPredictionForm()
+
+    return await _render(request, 'predictions/crop_prediction.html', {'form': form})
+
+
+@async_login_required
+@require_http_methods(["GET", "POST"])
+async def soil_classification_view(request):
+    """Async view for soil classification."""
+    if request.method == 'POST':
+        form = SoilClassificationForm(request.POST, request.FILES)
+        if await sync_to_async(form.is_valid)():
+            uploaded_file = request.FILES['soil_image']
+            classification = form.save(commit=False)
+            classification.user = request.user
+
+            # Hashing is CPU only; the duplicate lookup queries the database
+            await sync_to_async(hash_soil_upload, thread_sensitive=False)(classification, uploaded_file)
+            plan = await sync_to_async(plan_soil_upload)(classification)
+            if plan.background:
+                # Saving the row also writes the upload to storage
+                await classification.asave()
+                get_soil_job_worker().notify()
+
+                messages.info(request, "Your soil image is being classified. This page will update automatically.")
+                return redirect('predictions:soil_result', pk=classification.pk)
+
+            derivatives = None
+            if plan.needs_derivatives:
+                derivatives = await sync_to_async(prepare_derivatives, thread_sensitive=False)(uploaded_file)
+            result = plan.result
+            if result is None:
+                # With derivatives on, the classifier reuses the derivatives' decode
+                source = derivatives.classifier_input if derivatives else uploaded_file
+                try:
+                    result = await get_soil_executor().arun(_classify_soil, source)
+                except InferenceQueueFull:
+                    messages.error(request, "The classifier is busy right now. Please try again in a moment.")
+                    return await _render(request, 'predictions/soil_classification.html', {'form': form}, status=503)
+
+            classification.soil_type = result['soil_type']
+            classification.confidence_score = result['confidence_score']
+            classification.all_predictions = result['all_predictions']
+            await classification.asave()
+            if derivatives is not None:
+                await sync_to_async(store_derivatives)(classification, derivatives)
+
+            await PredictionHistory.objects.acreate(
+                user=request.user,
+                prediction_type='soil',
+                result_summary=f"Classified as: {classification.get_soil_type_display()} (Confidence: {result['confidence_score']*100:.1f}%)"
+            )
+
+            messages.success(request, f"Classification successful! Soil type: {classification.get_soil_type_display()}")
+            return redirect('predictions:soil_result', pk=classification.pk)
+        else:
+            messages.error(request, "Please correct the errors below.")
+    else:
+        form = SoilClassificationForm()
+
+    return await _render(request, 'predictions/soil_classification.html', {'form': form})
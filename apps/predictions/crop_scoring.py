@@ -0,0 +1,480 @@
+"""
+Streaming Crop Scoring
+======================
+Input validation and streaming scoring behind the crop JSON API.
+
+Files: scores CSV or Parquet files of soil tests (the columns written by
+scripts/training/extract_test_samples.py: nitrogen, phosphorus, ...,
+rainfall) and produces a CSV with the top-3 crops appended to every row.
+The input is parsed settings.CROP_API['FILE_CHUNK_ROWS'] rows at a time,
+each chunk is scored with one vectorized CropPredictor.predict_batch() call,
+and the output CSV is yielded chunk by chunk, so memory use does not grow
+with the number of rows. Rows with missing or non-numeric features are
+passed through with an 'error' column instead of failing the whole file.
+
+NDJSON: reads newline-delimited feature records from a request stream,
+micro-batches them (STREAM_BATCH_SIZE records or STREAM_MAX_WAIT_MS) and
+yields one NDJSON result line per record as each batch is scored.
+"""
+
+import csv
+import io
+import json
+import math
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .ml_services.crop_predictor import FEATURE_KEYS
+
+# Appended to every output row
+SCORE_COLUMNS = ('crop_1', 'score_1', 'crop_2', 'score_2', 'crop_3', 'score_3', 'error')
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+
+# Matches CropPrediction.location
+_LOCATION_MAX_LENGTH = 200
+
+# Marks the end of the stream in iter_ndjson_batches()' line queue
+_END_OF_STREAM = object()
+
+# Longest accepted NDJSON record; longer lines are skipped with an error
+MAX_RECORD_BYTES = 65536
+
+
+class FeatureError(ValueError):
+    """Invalid prediction input; errors maps field paths to messages."""
+
+    def __init__(self, errors: Dict[str, str]):
+        super().__init__(f"{len(errors)} invalid field(s)")
+        self.errors = errors
+
+
+class ScoringInputError(ValueError):
+    """The uploaded file cannot be scored (format, header or columns)."""
+
+
+def parse_feature_rows(rows, prefix: str = 'rows') -> Tuple[np.ndarray, List[Optional[str]]]:
+    """
+    Validate feature objects and stack them into an N x 7 matrix.
+
+    Every FEATURE_KEYS value must be a finite number (numeric strings are
+    accepted); 'location' is an optional string.
+
+    Returns:
+        (X in FEATURE_KEYS order, per-row locations)
+
+    Raises:
+        FeatureError: With every invalid field, e.g. {'rows[3].ph_value': ...}
+    """
+    errors = {}
+    X = np.empty((len(rows), len(FEATURE_KEYS)), dtype=np.float64)
+    locations = []
+
+    for i, row in enumerate(rows):
+        path = f'{prefix}[{i}]' if prefix else ''
+        if not isinstance(row, dict):
+            errors[path or 'body'] = 'Expected a JSON object'
+            locations.append(None)
+            continue
+
+        for j, key in enumerate(FEATURE_KEYS):
+            field = f'{path}.{key}' if path else key
+            value = row.get(key)
+            if value is None:
+                errors[field] = 'This field is required'
+                continue
+            try:
+                if isinstance(value, bool):
+                    raise TypeError
+                X[i, j] = float(value)
+            except (TypeError, ValueError):
+                errors[field] = 'Expected a number'
+                continue
+            if not math.isfinite(X[i, j]):
+                errors[field] = 'Expected a finite number'
+
+        location = row.get('location') or None
+        if location is not None and (
+            not isinstance(location, str) or len(location) > _LOCATION_MAX_LENGTH
+        ):
+            errors[f'{path}.location' if path else 'location'] = (
+                f'Expected a string of at most {_LOCATION_MAX_LENGTH} characters'
+            )
+        locations.append(location)
+
+    if errors:
+        raise FeatureError(errors)
+    return X, locations
+
+
+def get_file_format(filename: str, requested: str = '') -> str:
+    """'csv' or 'parquet', from an explicit format or the file extension."""
+    fmt = (requested or '').lower()
+    if not fmt:
+        fmt = 'parquet' if Path(filename or '').suffix.lower() in PARQUET_EXTENSIONS else 'csv'
+    if fmt not in ('csv', 'parquet'):
+        raise ScoringInputError(f"Unsupported format '{fmt}' (expected csv or parquet)")
+    return fmt
+
+
+def _feature_positions(columns: Sequence[str]) -> List[int]:
+    """Index of each FEATURE_KEYS column (matched case-insensitively)."""
+    normalized = {name.strip().lower(): i for i, name in enumerate(columns)}
+    missing = [key for key in FEATURE_KEYS if key not in normalized]
+    if missing:
+        raise ScoringInputError(f"Missing required column(s): {', '.join(missing)}")
+    return [normalized[key] for key in FEATURE_KEYS]
+
+
+def _to_matrix(values: List[List]) -> np.ndarray:
+    """Parse feature values; unparseable or empty cells become NaN."""
+    try:
+        return np.array(values, dtype=np.float64).reshape(-1, len(FEATURE_KEYS))
+    except (TypeError, ValueError):
+        pass
+
+    # Slow path for chunks with bad cells
+    X = np.full((len(values), len(FEATURE_KEYS)), np.nan)
+    for i, row in enumerate(values):
+        for j, value in enumerate(row):
+            try:
+                X[i, j] = float(value)
+            except (TypeError, ValueError):
+                pass
+    return X
+
+
+class FeatureChunks:
+    """
+    Chunked reader over a CSV or Parquet file.
+
+    The header is read (and validated) on construction; iterating yields
+    (rows, X) per chunk, where rows are the input rows as lists and X is the
+    matching N x 7 feature matrix (NaN for invalid cells).
+    """
+
+    def __init__(self, fileobj: BinaryIO, fmt: str, chunk_rows: int = 5000):
+        self.fileobj = fileobj
+        self.fmt = fmt
+        self.chunk_rows = max(int(chunk_rows), 1)
+
+        if fmt == 'parquet':
+            self._open_parquet()
+        else:
+            self._open_csv()
+        self.positions = _feature_positions(self.columns)
+
+    def _open_csv(self):
+        self.fileobj.seek(0)
+        self._text = io.TextIOWrapper(self.fileobj, encoding='utf-8-sig', newline='')
+        self._reader = csv.reader(self._text)
+        try:
+            self.columns = next(self._reader)
+        except StopIteration:
+            raise ScoringInputError("The file is empty")
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise ScoringInputError(f"Not a valid UTF-8 CSV file: {e}")
+
+    def _open_parquet(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ScoringInputError("Parquet support requires pyarrow")
+
+        self.fileobj.seek(0)
+        try:
+            self._parquet = pq.ParquetFile(self.fileobj)
+        except Exception as e:
+            raise ScoringInputError(f"Not a valid Parquet file: {e}")
+        self.columns = self._parquet.schema_arrow.names
+
+    def __iter__(self) -> Iterator[Tuple[List[List], np.ndarray]]:
+        if self.fmt == 'parquet':
+            return self._iter_parquet()
+        return self._iter_csv()
+
+    def _iter_csv(self):
+        width = len(self.columns)
+        positions = self.positions
+        try:
+            while True:
+                rows = []
+                for row in self._reader:
+                    if not row:
+                        continue
+                    if len(row) < width:
+                        row += [''] * (width - len(row))
+                    rows.append(row)
+                    if len(rows) == self.chunk_rows:
+                        break
+                if not rows:
+                    return
+                yield rows, _to_matrix([[row[i] for i in positions] for row in rows])
+        finally:
+            # Leave the upload open for Django to close
+            self._text.detach()
+
+    def _iter_parquet(self):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        for batch in self._parquet.iter_batches(batch_size=self.chunk_rows):
+            rows = [list(row) for row in zip(*(column.to_pylist() for column in batch.columns))]
+            features = []
+            for i in self.positions:
+                try:
+                    column = pc.cast(batch.column(i), pa.float64())
+                except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                    # e.g. a string column with some non-numeric cells
+                    column = pa.array(
+                        _to_matrix([[v] for v in batch.column(i).to_pylist()])[:, 0]
+                    )
+                features.append(column.to_numpy(zero_copy_only=False))
+            yield rows, np.column_stack(features).astype(np.float64)
+
+
+def score_matrix(predictor, X: np.ndarray) -> Tuple[List[List[str]], List[List[float]]]:
+    """
+    Top-3 crop names and scores for the valid rows of X.
+
+    Returns:
+        (names, scores) with one list per row of X (empty for invalid rows)
+
+    Raises:
+        RuntimeError: If the crop model is not loaded (no mock scores are
+            written to files)
+    """
+    valid = np.isfinite(X).all(axis=1)
+    names = [[] for _ in range(len(X))]
+    scores = [[] for _ in range(len(X))]
+    if not valid.any():
+        return names, scores
+
+    rows = np.flatnonzero(valid)
+    top_idx, top_scores = predictor.predict_batch(X[valid], return_arrays=True)
+    labels = np.array([crop.capitalize() for crop in predictor.crops_list])
+    row_names = labels[top_idx].tolist()
+    row_scores = top_scores.tolist()
+
+    for i, row_name, row_score in zip(rows.tolist(), row_names, row_scores):
+        names[i] = row_name
+        scores[i] = row_score
+    return names, scores
+
+
+def iter_scored_csv(chunks: FeatureChunks, predictor, stats: Optional[Dict] = None) -> Iterator[str]:
+    """
+    Yield the scored CSV (header first, then one string per input chunk).
+
+    Args:
+        chunks: Open FeatureChunks reader
+        predictor: CropPredictor
+        stats: Optional dict updated with 'rows' and 'errors' counts
+    """
+    stats = stats if stats is not None else {}
+    stats.update(rows=0, errors=0)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(list(chunks.columns) + list(SCORE_COLUMNS))
+    yield buffer.getvalue()
+
+    for rows, X in chunks:
+        names, scores = score_matrix(predictor, X)
+
+        buffer.seek(0)
+        buffer.truncate()
+        for row, row_names, row_scores in zip(rows, names, scores):
+            if row_names:
+                extra = []
+                for k in range(3):
+                    if k < len(row_names):
+                        extra += [row_names[k], f'{row_scores[k]:.4f}']
+                    else:
+                        extra += ['', '']
+                extra.append('')
+            else:
+                extra = [''] * 6 + ['invalid or missing feature values']
+                stats['errors'] += 1
+            writer.writerow(row + extra)
+        stats['rows'] += len(rows)
+        yield buffer.getvalue()
+
+
+def _read_ndjson_lines(stream: BinaryIO, lines: queue.Queue, stop: threading.Event):
+    """
+    Reader thread of iter_ndjson_batches(): queue the stream's non-blank
+    lines (None for an oversized line), then a read error if any, then
+    _END_OF_STREAM. Stops early once stop is set.
+    """
+    def put(item) -> bool:
+        # A bounded queue keeps a fast sender from buffering the whole body
+        while not stop.is_set():
+            try:
+                lines.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    try:
+        while not stop.is_set():
+            line = stream.readline(MAX_RECORD_BYTES + 1)
+            if not line:
+                break
+            if len(line) > MAX_RECORD_BYTES:
+                while line and not line.endswith(b'\n'):
+                    line = stream.readline(MAX_RECORD_BYTES + 1)
+                line = None
+            elif not line.strip():
+                continue
+            if not put(line):
+                return
+    except Exception as e:
+        # e.g. the client disconnected; re-raised by the consumer
+        put(e)
+    put(_END_OF_STREAM)
+
+
+def iter_ndjson_batches(stream: BinaryIO, batch_size: int = 256, max_wait: float = 0.05) -> Iterator[List]:
+    """
+    Group the lines of a binary NDJSON stream into micro-batches.
+
+    A batch is emitted once it holds batch_size lines, once max_wait seconds
+    have passed since its first line, and at the end of the stream. Blank
+    lines are skipped; lines longer than MAX_RECORD_BYTES are drained and
+    reported as None.
+
+    The stream is read in a background thread, so a partial batch is
+    flushed on time even while the sender is idle.
+    """
+    batch_size = max(int(batch_size), 1)
+    lines = queue.Queue(maxsize=2 * batch_size)
+    stop = threading.Event()
+    reader = threading.Thread(
+        target=_read_ndjson_lines, args=(stream, lines, stop), name='ndjson-reader', daemon=True
+    )
+    reader.start()
+
+    batch = []
+    deadline = 0.0
+    try:
+        while True:
+            try:
+                item = lines.get(timeout=max(deadline - time.monotonic(), 0) if batch else None)
+            except queue.Empty:
+                yield batch
+                batch = []
+                continue
+            if item is _END_OF_STREAM:
+                break
+            if isinstance(item, Exception):
+                raise item
+
+            if not batch:
+                deadline = time.monotonic() + max_wait
+            batch.append(item)
+            if len(batch) >= batch_size or time.monotonic() >= deadline:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+    finally:
+        # The reader may stay blocked in readline() until the client sends
+        # or disconnects; it exits without touching the stream afterwards
+        stop.set()
+
+
+def _parse_records(lines: List) -> Tuple[List[Dict], List[int], List[Dict]]:
+    """
+    Decode and validate one batch of NDJSON lines.
+
+    Returns:
+        (outputs, valid, records): outputs has one dict per line (filled in
+        with an error for invalid lines), valid lists the indices of valid
+        lines and records their decoded objects.
+    """
+    outputs = [{} for _ in lines]
+    valid, records = [], []
+    for i, line in enumerate(lines):
+        if line is None:
+            outputs[i]['error'] = f'Record longer than {MAX_RECORD_BYTES} bytes'
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            outputs[i]['error'] = 'Invalid JSON'
+            continue
+        if isinstance(record, dict) and 'id' in record:
+            outputs[i]['id'] = record['id']
+        valid.append(i)
+        records.append(record)
+    return outputs, valid, records
+
+
+def iter_scored_ndjson(
+    stream: BinaryIO,
+    predictor,
+    batch_size: int = 256,
+    max_wait: float = 0.05,
+    stats: Optional[Dict] = None
+) -> Iterator[str]:
+    """
+    Yield NDJSON results for an NDJSON stream of feature records.
+
+    Every input record gets one output line, in input order:
+    {"seq": n, "id": <echoed if given>, "predicted_crop": ...,
+    "confidence_score": ..., "top_3_crops": [...]}, or {"seq": n,
+    "error": ..., "fields": {...}} for invalid records.
+
+    Args:
+        stream: Binary stream with a readline(size) method
+        predictor: CropPredictor
+        batch_size: Records scored per predict_batch() call
+        max_wait: Seconds a partial batch may wait for more records
+        stats: Optional dict updated with 'records', 'errors', 'batches'
+    """
+    stats = stats if stats is not None else {}
+    stats.update(records=0, errors=0, batches=0)
+    seq = 0
+
+    for lines in iter_ndjson_batches(stream, batch_size, max_wait):
+        outputs, valid, records = _parse_records(lines)
+
+        try:
+            X, _ = parse_feature_rows(records, prefix='')
+            scored = valid
+        except FeatureError:
+            # Validate record by record to report each one's fields
+            rows, scored = [], []
+            for i, record in zip(valid, records):
+                try:
+                    rows.append(parse_feature_rows([record], prefix='')[0])
+                    scored.append(i)
+                except FeatureError as e:
+                    outputs[i].update(error='Invalid input', fields=e.errors)
+            X = np.concatenate(rows) if rows else None
+
+        if scored:
+            for i, result in zip(scored, predictor.predict_batch(X)):
+                outputs[i].update(
+                    predicted_crop=result['predicted_crop'],
+                    confidence_score=result['confidence_score'],
+                    top_3_crops=result['top_3_crops'],
+                )
+
+        chunk = []
+        for output in outputs:
+            if 'error' in output:
+                stats['errors'] += 1
+            chunk.append(json.dumps(dict(seq=seq, **output), separators=(',', ':')))
+            seq += 1
+        stats['records'] += len(outputs)
+        stats['batches'] += 1
+        yield '\n'.join(chunk) + '\n'
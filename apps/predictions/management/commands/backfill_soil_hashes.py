@@ -0,0 +1,52 @@
+"""
+Compute content and perceptual hashes for existing soil classifications.
+
+Rows created before duplicate detection was enabled have empty hashes and
+are invisible to it until backfilled; rows hashed before colour signatures
+were added only match byte-identical uploads until backfilled. Images are
+read from storage.
+
+Usage:
+    python manage.py backfill_soil_hashes
+    python manage.py backfill_soil_hashes --limit 500
+"""
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.predictions.models import SoilClassification
+from apps.predictions.soil_dedup import compute_image_hashes
+
+
+class Command(BaseCommand):
+    help = 'Fill content_hash / perceptual_hash / color_signature for soil classifications that lack them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, help='Maximum number of rows to process')
+
+    def handle(self, *args, **options):
+        rows = SoilClassification.objects.filter(
+            Q(perceptual_hash='') | Q(color_signature='')
+        ).order_by('pk')
+        if options['limit']:
+            rows = rows[:options['limit']]
+
+        updated = failed = 0
+        for classification in rows.iterator():
+            try:
+                with classification.soil_image.open('rb') as f:
+                    content_hash, phash, color = compute_image_hashes(f.read())
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(f"#{classification.pk}: {e}"))
+                failed += 1
+                continue
+
+            # updated_at lets running processes pick the hash up (PerceptualHashIndex)
+            SoilClassification.objects.filter(pk=classification.pk).update(
+                content_hash=content_hash, perceptual_hash=phash, color_signature=color,
+                updated_at=timezone.now()
+            )
+            updated += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Hashed {updated} classification(s), {failed} failed"))
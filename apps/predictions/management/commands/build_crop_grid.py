@@ -0,0 +1,141 @@
+"""
+Build the precomputed top-3 crop lookup grid.
+
+Evaluates the live crop model over a regular grid spanning FEATURE_RANGES
+and reports how far grid answers drift from the live model. The grid is
+only written if its top-1 agreement on every measured input set reaches
+--min-top1-agreement (default CROP_LOOKUP_GRID MIN_TOP1_AGREEMENT).
+
+Usage:
+    python manage.py build_crop_grid --bins 10
+    python manage.py build_crop_grid --bins 12,10,10,8,8,10,12 --min-top1-agreement 0.9
+"""
+
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.predictions.ml_services.crop_predictor import (
+    CropPredictor,
+    FEATURE_KEYS,
+    FEATURE_RANGES,
+    get_model_dir,
+    get_sample_features,
+)
+from apps.predictions.ml_services.lookup_grid import LookupGrid
+
+
+class Command(BaseCommand):
+    help = 'Precompute top-3 crop recommendations over a grid of input values'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bins', default='8',
+            help='Grid points per feature: one number, or 7 comma-separated '
+                 '(N,P,K,temperature,humidity,ph,rainfall)'
+        )
+        parser.add_argument(
+            '--output',
+            help='Output directory (default: CROP_LOOKUP_GRID PATH or crop-prediction-models/crop_grid)'
+        )
+        parser.add_argument(
+            '--samples', type=int, default=20000,
+            help='Random in-range inputs used to measure drift from the live model'
+        )
+        parser.add_argument(
+            '--min-top1-agreement', type=float,
+            help='Refuse to write the grid if top-1 agreement with the live model is lower '
+                 'on any input set (0-1, default: CROP_LOOKUP_GRID MIN_TOP1_AGREEMENT)'
+        )
+
+    def handle(self, *args, **options):
+        bins = [int(b) for b in options['bins'].split(',')]
+        if len(bins) == 1:
+            bins = bins * len(FEATURE_KEYS)
+        if len(bins) != len(FEATURE_KEYS):
+            raise CommandError(f"--bins needs 1 or {len(FEATURE_KEYS)} values")
+
+        config = getattr(settings, 'CROP_LOOKUP_GRID', {})
+        output = options['output'] or config.get('PATH') or get_model_dir() / 'crop_grid'
+        min_agreement = options['min_top1_agreement']
+        if min_agreement is None:
+            min_agreement = config.get('MIN_TOP1_AGREEMENT', 0.8)
+
+        predictor = CropPredictor()
+        predictor._load_model()
+        if not predictor.is_trained:
+            raise CommandError("Crop model could not be loaded")
+        # Always tabulate the live model, never an existing grid
+        predictor.grid = None
+
+        total = int(np.prod(bins))
+        self.stdout.write(
+            f"Evaluating {predictor.backend} model {predictor.model_version} "
+            f"over {total:,} grid points {tuple(bins)}..."
+        )
+
+        start = time.perf_counter()
+        grid = LookupGrid.build(
+            predictor._predict_proba,
+            FEATURE_RANGES,
+            bins,
+            predictor.model_version,
+            progress=lambda done, total: self.stdout.write(f"  {done:,}/{total:,}", ending='\r')
+        )
+        self.stdout.write(f"\nBuilt in {time.perf_counter() - start:.1f}s")
+
+        grid.stats = self._measure_drift(predictor, grid, options['samples'])
+        agreement = grid.min_top1_agreement
+        if agreement is None or agreement < min_agreement:
+            raise CommandError(
+                f"Top-1 agreement {(agreement or 0) * 100:.2f}% is below the required "
+                f"{min_agreement * 100:.2f}%; grid not written. Use more --bins."
+            )
+        grid.save(output)
+
+        size_mb = (grid.indices.nbytes + grid.scores.nbytes) / 1024 / 1024
+        self.stdout.write(self.style.SUCCESS(f"Lookup grid saved to {output} ({size_mb:.1f} MB)"))
+
+    def _measure_drift(self, predictor, grid, samples):
+        """Compare grid answers with the live model and report the drift."""
+        rng = np.random.default_rng(42)
+        low, high = np.array(FEATURE_RANGES).T
+        datasets = {'random': rng.uniform(low, high, size=(samples, len(FEATURE_KEYS)))}
+
+        test_csv = get_sample_features()
+        if test_csv is not None:
+            datasets['test_samples'] = test_csv
+
+        stats = {}
+        for name, X in datasets.items():
+            inside = grid.contains(X)
+            X_in = X[inside]
+            if not len(X_in):
+                continue
+
+            live_idx, live_scores = predictor._top_k(predictor._predict_proba(X_in), grid.top_k)
+            grid_idx, grid_scores = grid.lookup(X_in)
+
+            result = {
+                'rows': int(len(X)),
+                'inside_grid': float(inside.mean()),
+                'top1_agreement': float((live_idx[:, 0] == grid_idx[:, 0]).mean()),
+                'top3_set_agreement': float(np.mean([
+                    set(a) == set(b) for a, b in zip(live_idx.tolist(), grid_idx.tolist())
+                ])),
+                'top1_in_grid_top3': float((grid_idx == live_idx[:, :1]).any(axis=1).mean()),
+                'mean_abs_top1_score_diff': float(np.abs(live_scores[:, 0] - grid_scores[:, 0]).mean()),
+            }
+            stats[name] = result
+
+            self.stdout.write(
+                f"Drift on {name} ({result['rows']} rows, "
+                f"{result['inside_grid'] * 100:.1f}% inside grid): "
+                f"top-1 agreement {result['top1_agreement'] * 100:.2f}%, "
+                f"live top-1 in grid top-3 {result['top1_in_grid_top3'] * 100:.2f}%, "
+                f"top-3 set agreement {result['top3_set_agreement'] * 100:.2f}%, "
+                f"mean |top-1 score diff| {result['mean_abs_top1_score_diff']:.3f}"
+            )
+        return stats
@@ -0,0 +1,51 @@
+"""
+Build resized derivatives for existing soil classification images.
+
+Rows created before derivatives were enabled (or before a size was added to
+SOIL_DERIVATIVES['SIZES']) would otherwise get them one by one on first
+view. Images are read from storage and decoded once per row.
+
+Usage:
+    python manage.py build_soil_derivatives
+    python manage.py build_soil_derivatives --limit 500
+    python manage.py build_soil_derivatives --force    # rebuild all, e.g. after changing FORMAT
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.predictions.models import SoilClassification
+from apps.predictions.soil_derivatives import build_derivatives, ensure_derivatives, store_derivatives
+
+
+class Command(BaseCommand):
+    help = 'Build resized soil image derivatives for classifications that lack them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, help='Maximum number of rows to process')
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Rebuild every derivative instead of only missing sizes'
+        )
+
+    def handle(self, *args, **options):
+        rows = SoilClassification.objects.exclude(soil_image='').order_by('pk')
+        if options['limit']:
+            rows = rows[:options['limit']]
+
+        built = failed = 0
+        for classification in rows.iterator():
+            try:
+                if options['force']:
+                    with classification.soil_image.open('rb') as f:
+                        derivatives = build_derivatives(f.read())
+                    classification.image_derivatives = {}
+                    store_derivatives(classification, derivatives)
+                else:
+                    ensure_derivatives(classification)
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(f"#{classification.pk}: {e}"))
+                failed += 1
+                continue
+            built += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {built} classification(s), {failed} failed"))
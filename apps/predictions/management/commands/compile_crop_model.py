@@ -0,0 +1,85 @@
+"""
+Compile the crop Random Forest into a flat array-backed evaluator.
+
+Usage:
+    python manage.py compile_crop_model
+    python manage.py compile_crop_model --samples 50000 --tolerance 1e-9
+"""
+
+import time
+
+import joblib
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.predictions.ml_services.compiled_forest import CompiledForest
+from apps.predictions.ml_services.crop_predictor import (
+    COMPILED_MODEL_FILENAME,
+    get_model_dir,
+    get_source_hashes,
+)
+
+
+class Command(BaseCommand):
+    help = 'Export random_forest_model.pkl as a compiled NumPy forest and verify it against sklearn'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            help=f'Output path (default: crop-prediction-models/{COMPILED_MODEL_FILENAME})'
+        )
+        parser.add_argument(
+            '--samples', type=int, default=10000,
+            help='Number of random inputs used to verify the compiled model'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=1e-9,
+            help='Maximum allowed absolute probability difference'
+        )
+
+    def handle(self, *args, **options):
+        model_dir = get_model_dir()
+        model_path = model_dir / 'random_forest_model.pkl'
+        output = options['output'] or model_dir / COMPILED_MODEL_FILENAME
+
+        if not model_path.exists():
+            raise CommandError(f"Model not found at {model_path}")
+
+        self.stdout.write(f"Loading {model_path}...")
+        model = joblib.load(str(model_path))
+        model.verbose = 0
+
+        compiled = CompiledForest.from_sklearn(model)
+        self.stdout.write(
+            f"Compiled {len(compiled.roots)} trees, {len(compiled.left)} nodes, "
+            f"max depth {compiled.max_depth}"
+        )
+
+        # Verify on random inputs in scaled feature space
+        rng = np.random.default_rng(42)
+        X = rng.normal(0.0, 1.5, size=(options['samples'], compiled.n_features_in_))
+
+        start = time.perf_counter()
+        expected = model.predict_proba(X)
+        sklearn_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = compiled.predict_proba(X)
+        compiled_time = time.perf_counter() - start
+
+        max_diff = float(np.abs(expected - actual).max())
+        self.stdout.write(
+            f"Max abs probability difference: {max_diff:.3e} "
+            f"(sklearn {sklearn_time:.3f}s, compiled {compiled_time:.3f}s "
+            f"for {len(X)} rows)"
+        )
+        if max_diff > options['tolerance']:
+            raise CommandError(
+                f"Compiled model differs from sklearn by {max_diff:.3e} "
+                f"(tolerance {options['tolerance']:.1e})"
+            )
+
+        # Lets CropPredictor notice a retrained model.pkl / scaler / encoder
+        compiled.sources = get_source_hashes(model_dir)
+        compiled.save(output)
+        self.stdout.write(self.style.SUCCESS(f"Compiled model saved to {output}"))
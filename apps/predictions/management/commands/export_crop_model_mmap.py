@@ -0,0 +1,45 @@
+"""
+Export the compiled/fused crop models in a memory-mappable layout.
+
+Each .npz artifact gets a sibling directory of uncompressed .npy files
+(e.g. crop_model_fused.mmap/) that CropPredictor maps with mmap_mode='r'
+when CROP_MODEL_MMAP=True. The export records the sha256 of its .npz;
+re-run this command whenever the .npz files are rebuilt.
+
+Usage:
+    python manage.py export_crop_model_mmap
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.predictions.ml_services.compiled_forest import CompiledForest, MMAP_SUFFIX
+from apps.predictions.ml_services.soil_classifier import file_sha256
+from apps.predictions.ml_services.crop_predictor import (
+    COMPILED_MODEL_FILENAME,
+    FUSED_MODEL_FILENAME,
+    get_model_dir,
+)
+
+
+class Command(BaseCommand):
+    help = 'Write memory-mappable .npy exports of the compiled and fused crop models'
+
+    def handle(self, *args, **options):
+        model_dir = get_model_dir()
+        exported = 0
+
+        for filename in (FUSED_MODEL_FILENAME, COMPILED_MODEL_FILENAME):
+            npz_path = model_dir / filename
+            if not npz_path.exists():
+                continue
+
+            mmap_dir = npz_path.with_suffix(MMAP_SUFFIX)
+            CompiledForest.load(npz_path).save_mmap(mmap_dir, source_sha256=file_sha256(npz_path))
+            self.stdout.write(self.style.SUCCESS(f"Exported {npz_path.name} -> {mmap_dir}"))
+            exported += 1
+
+        if not exported:
+            raise CommandError(
+                "No compiled crop model found. Run compile_crop_model "
+                "(and fuse_crop_model) first."
+            )
@@ -0,0 +1,162 @@
+"""
+Export the soil classifier as a frozen, CPU-optimized TorchScript graph.
+
+Traces the eager ResNet18 and freezes it (folds BatchNorm into the
+preceding convolutions, inlines weights, drops Dropout). The frozen graph
+is saved; torch.jit.optimize_for_inference (conv/linear + ReLU fusion) is
+applied when it is loaded, since its prepacked ops cannot be serialized.
+The reloaded export is verified against the eager model on the sample
+images and benchmarked at several batch sizes.
+
+Usage:
+    python manage.py export_soil_model
+    python manage.py export_soil_model --batch-sizes 1,8,32 --runs 20
+"""
+
+import json
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.predictions.ml_services.soil_classifier import (
+    SCRIPTED_META_FILENAME,
+    SCRIPTED_MODEL_FILENAME,
+    SoilClassifier,
+    build_soil_model,
+    build_soil_transform,
+    file_sha256,
+    get_model_dir,
+    load_scripted_model,
+)
+
+# Bump when the export layout changes
+FORMAT_VERSION = 1
+
+
+class Command(BaseCommand):
+    help = 'Export model.pth as a frozen TorchScript graph, verify it and benchmark it'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--image-dir',
+            default=str(Path(settings.BASE_DIR) / 'datasets' / 'test_samples' / 'soil_images'),
+            help='Images used to verify the export against the eager model'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=1e-4,
+            help='Maximum allowed absolute probability difference'
+        )
+        parser.add_argument(
+            '--batch-sizes', default='1,8,32',
+            help='Comma-separated batch sizes to benchmark'
+        )
+        parser.add_argument(
+            '--runs', type=int, default=10,
+            help='Timed forward passes per batch size'
+        )
+        parser.add_argument(
+            '--threads', type=int, default=0,
+            help='torch.set_num_threads for the benchmark (0 = torch default)'
+        )
+        parser.add_argument(
+            '--no-optimize', action='store_true',
+            help='Only freeze; do not apply torch.jit.optimize_for_inference on load'
+        )
+
+    def handle(self, *args, **options):
+        import torch
+
+        model_dir = get_model_dir()
+        model_path = model_dir / 'model.pth'
+        metadata_path = model_dir / 'metadata.json'
+        if not model_path.exists():
+            raise CommandError(f"Model not found at {model_path}")
+
+        with open(metadata_path) as f:
+            metadata = json.load(f)
+        img_size = metadata.get('img_size', 224)
+        num_classes = metadata.get('num_classes', 4)
+
+        if options['threads']:
+            torch.set_num_threads(options['threads'])
+
+        self.stdout.write(f"Loading {model_path}...")
+        eager = build_soil_model(num_classes=num_classes)
+        eager.load_state_dict(torch.load(model_path, map_location='cpu'))
+        eager.eval()
+
+        example = torch.zeros(1, 3, img_size, img_size)
+        with torch.no_grad():
+            frozen = torch.jit.freeze(torch.jit.trace(eager, example))
+
+        # Verify and benchmark exactly what SoilClassifier will load
+        output = model_dir / SCRIPTED_MODEL_FILENAME
+        optimize = not options['no_optimize']
+        torch.jit.save(frozen, str(output))
+        scripted = load_scripted_model(output, optimize=optimize)
+
+        # Verify on real images
+        transform = build_soil_transform(img_size)
+        images = sorted(Path(options['image_dir']).glob('*.jpg'))
+        if not images:
+            raise CommandError(f"No .jpg images found in {options['image_dir']}")
+        batch = torch.stack([
+            transform(SoilClassifier._open_image(str(path))) for path in images
+        ])
+
+        with torch.no_grad():
+            expected = torch.softmax(eager(batch), dim=1)
+            actual = torch.softmax(scripted(batch), dim=1)
+        max_diff = float((expected - actual).abs().max())
+        same_top1 = bool((expected.argmax(dim=1) == actual.argmax(dim=1)).all())
+
+        self.stdout.write(
+            f"Max abs probability difference: {max_diff:.3e} over {len(images)} images "
+            f"(top-1 {'identical' if same_top1 else 'DIFFERS'})"
+        )
+        if max_diff > options['tolerance'] or not same_top1:
+            output.unlink()
+            raise CommandError(
+                f"Exported model differs from eager by {max_diff:.3e} "
+                f"(tolerance {options['tolerance']:.1e})"
+            )
+
+        # Benchmark
+        benchmark = {}
+        self.stdout.write(f"{'batch':>5}  {'eager ms':>9}  {'script ms':>9}  {'speedup':>7}")
+        for batch_size in (int(b) for b in options['batch_sizes'].split(',')):
+            inputs = torch.randn(batch_size, 3, img_size, img_size)
+            eager_ms = self._time(eager, inputs, options['runs'])
+            scripted_ms = self._time(scripted, inputs, options['runs'])
+            benchmark[batch_size] = {'eager_ms': round(eager_ms, 2), 'torchscript_ms': round(scripted_ms, 2)}
+            self.stdout.write(
+                f"{batch_size:>5}  {eager_ms:9.2f}  {scripted_ms:9.2f}  {eager_ms / scripted_ms:6.2f}x"
+            )
+
+        export_meta = {
+            'format_version': FORMAT_VERSION,
+            'source_sha256': file_sha256(model_path),
+            'torch_version': torch.__version__,
+            'optimize_on_load': optimize,
+            'max_abs_diff': max_diff,
+            'torch_threads': torch.get_num_threads(),
+            'benchmark_ms_per_batch': benchmark,
+        }
+        with open(model_dir / SCRIPTED_META_FILENAME, 'w') as f:
+            json.dump(export_meta, f, indent=2)
+
+        self.stdout.write(self.style.SUCCESS(f"TorchScript model saved to {output}"))
+
+    @staticmethod
+    def _time(model, inputs, runs: int) -> float:
+        """Mean milliseconds per forward pass after two warmup passes."""
+        import torch
+        with torch.no_grad():
+            for _ in range(2):
+                model(inputs)
+            start = time.perf_counter()
+            for _ in range(runs):
+                model(inputs)
+        return (time.perf_counter() - start) / max(runs, 1) * 1000
@@ -0,0 +1,101 @@
+"""
+Fold the StandardScaler into the compiled crop forest.
+
+Writes a single scaler-free artifact (forest + labels) that reads raw
+N/P/K/temperature/humidity/ph/rainfall values. The fused model is checked
+against scaler + forest on random, integer, form-style and dataset inputs
+and is only written if every top-1 crop matches.
+
+A compiled model that was built from a different random_forest_model.pkl
+is ignored and the forest is compiled again from the .pkl.
+
+Usage:
+    python manage.py fuse_crop_model
+    python manage.py fuse_crop_model --samples 50000
+"""
+
+import joblib
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.predictions.ml_services.compiled_forest import CompiledForest
+from apps.predictions.ml_services.crop_predictor import (
+    COMPILED_MODEL_FILENAME,
+    FUSED_MODEL_FILENAME,
+    check_model_sources,
+    get_model_dir,
+    get_parity_inputs,
+    get_source_hashes,
+)
+
+
+class Command(BaseCommand):
+    help = 'Fuse scaler.pkl, the Random Forest and label_encoder.pkl into one scaler-free model'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            help=f'Output path (default: crop-prediction-models/{FUSED_MODEL_FILENAME})'
+        )
+        parser.add_argument(
+            '--samples', type=int, default=10000,
+            help='Inputs per generated set (random, integer, form) used to verify the fused model'
+        )
+
+    def handle(self, *args, **options):
+        model_dir = get_model_dir()
+        compiled_path = model_dir / COMPILED_MODEL_FILENAME
+        model_path = model_dir / 'random_forest_model.pkl'
+        output = options['output'] or model_dir / FUSED_MODEL_FILENAME
+
+        scaler = joblib.load(str(model_dir / 'scaler.pkl'))
+        label_encoder = joblib.load(str(model_dir / 'label_encoder.pkl'))
+
+        # Reference: the sklearn forest itself when available
+        model = joblib.load(str(model_path)) if model_path.exists() else None
+
+        compiled = None
+        if compiled_path.exists():
+            self.stdout.write(f"Loading {compiled_path}...")
+            compiled = CompiledForest.load(compiled_path)
+            problem = check_model_sources(compiled_path, compiled)
+            if problem:
+                self.stdout.write(self.style.WARNING(f"{problem}; not using it"))
+                compiled = None
+
+        if compiled is None:
+            if model is None:
+                raise CommandError(f"No usable crop model found in {model_dir}")
+            self.stdout.write(f"Compiling {model_path}...")
+            compiled = CompiledForest.from_sklearn(model)
+
+        if compiled.scaler_fused:
+            raise CommandError(f"{compiled_path} already has a fused scaler")
+
+        labels = label_encoder.classes_[compiled.classes_]
+        fused = compiled.fuse_scaler(scaler, labels=labels)
+
+        # Verify against scaler + forest on raw inputs; any flipped crop fails
+        reference = model if model is not None else compiled
+        failed = []
+        for name, X in get_parity_inputs(options['samples']).items():
+            expected = reference.predict_proba(scaler.transform(X))
+            actual = fused.predict_proba(X)
+
+            agreement = float((expected.argmax(axis=1) == actual.argmax(axis=1)).mean())
+            max_diff = float(np.abs(expected - actual).max())
+            self.stdout.write(
+                f"{name}: top-1 agreement {agreement * 100:.3f}% "
+                f"(max abs diff {max_diff:.3e}, {len(X)} rows)"
+            )
+            if agreement < 1.0:
+                failed.append(name)
+
+        if failed:
+            raise CommandError(
+                f"Fused model disagrees with the unfused model on {', '.join(failed)} inputs; not saved"
+            )
+
+        fused.sources = get_source_hashes(model_dir)
+        fused.save(output)
+        self.stdout.write(self.style.SUCCESS(f"Fused model saved to {output}"))
@@ -0,0 +1,52 @@
+"""
+Process queued asynchronous soil classification jobs.
+
+Runs the same DB-backed queue as the in-process workers started in each
+serving process, so classification can be moved to a dedicated
+process (or host) and off the web workers entirely.
+
+Usage:
+    python manage.py process_soil_jobs            # run until interrupted
+    python manage.py process_soil_jobs --once     # drain the queue and exit
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.predictions.soil_jobs import get_soil_jobs_config, run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = 'Classify pending soil images queued by the asynchronous upload mode'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Process every pending job, then exit'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float,
+            help='Seconds between queue checks (default: SOIL_ASYNC_JOBS POLL_INTERVAL)'
+        )
+
+    def handle(self, *args, **options):
+        config = get_soil_jobs_config()
+        poll_interval = options['poll_interval'] or config['POLL_INTERVAL']
+
+        if options['once']:
+            processed = run_pending_jobs(config['STALE_AFTER'])
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} soil classification job(s)"))
+            return
+
+        self.stdout.write(f"Waiting for soil classification jobs (polling every {poll_interval}s)...")
+        try:
+            while True:
+                close_old_connections()
+                processed = run_pending_jobs(config['STALE_AFTER'])
+                if processed:
+                    self.stdout.write(f"Processed {processed} job(s)")
+                time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped")
@@ -0,0 +1,313 @@
+"""
+Build a statically quantized INT8 soil classifier.
+
+Rebuilds the ResNet18 with torchvision's quantizable blocks, fuses
+conv+bn+relu (and linear+relu in the head), calibrates activation ranges on
+a folder of soil images and converts weights and activations to INT8. The
+result is saved next to model.pth as a frozen TorchScript graph with its
+own metadata: agreement with the FP32 model, and INT8 vs FP32 accuracy on
+the labelled --eval-dir (the held-out validation split) alongside the FP32
+val_accuracy from training. The evaluation set is required, and the model
+is not written if INT8 accuracy drops by more than --max-accuracy-drop.
+
+Select it with SOIL_MODEL_BACKEND=int8.
+
+Usage:
+    python manage.py quantize_soil_model --eval-dir path/to/val
+    python manage.py quantize_soil_model --calibration-dir path/to/images --eval-dir path/to/val
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.predictions.ml_services.soil_classifier import (
+    QUANTIZED_META_FILENAME,
+    QUANTIZED_MODEL_FILENAME,
+    SoilClassifier,
+    build_soil_head,
+    build_soil_model,
+    build_soil_transform,
+    file_sha256,
+    get_model_dir,
+)
+
+# Bump when the export layout changes
+FORMAT_VERSION = 1
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Images per forward pass during calibration and evaluation
+_CHUNK_SIZE = 16
+
+
+def list_images(directory: Path) -> List[Path]:
+    """All images below a directory, sorted."""
+    return sorted(
+        p for p in directory.rglob('*') if p.suffix.lower() in IMAGE_EXTENSIONS
+    )
+
+
+class Command(BaseCommand):
+    help = 'Quantize model.pth to INT8 (static, calibrated) and report accuracy against FP32'
+
+    def add_arguments(self, parser):
+        config = getattr(settings, 'SOIL_QUANTIZATION', {})
+        parser.add_argument(
+            '--calibration-dir',
+            default=config.get('CALIBRATION_DIR', 'datasets/test_samples/soil_images'),
+            help='Images used to calibrate activation ranges (relative to BASE_DIR or absolute)'
+        )
+        parser.add_argument(
+            '--eval-dir',
+            default=config.get('EVAL_DIR') or None,
+            help='Held-out labelled images (the validation split), one subfolder per class '
+                 '(class name or metadata class_mapping key), used to compare INT8 and FP32 '
+                 'accuracy; required (default: SOIL_QUANTIZATION EVAL_DIR)'
+        )
+        parser.add_argument(
+            '--engine', default=config.get('ENGINE', 'fbgemm'),
+            help="Quantized engine: 'fbgemm'/'x86' (x86) or 'qnnpack' (ARM)"
+        )
+        parser.add_argument(
+            '--min-agreement', type=float, default=0.9,
+            help='Minimum top-1 agreement with FP32 on the calibration images'
+        )
+        parser.add_argument(
+            '--max-accuracy-drop', type=float, default=1.0,
+            help='Largest accepted INT8 accuracy loss vs FP32 on --eval-dir, in percentage points'
+        )
+        parser.add_argument(
+            '--runs', type=int, default=10,
+            help='Timed forward passes per batch size in the benchmark'
+        )
+
+    def handle(self, *args, **options):
+        import torch
+
+        model_dir = get_model_dir()
+        model_path = model_dir / 'model.pth'
+        if not model_path.exists():
+            raise CommandError(f"Model not found at {model_path}")
+        with open(model_dir / 'metadata.json') as f:
+            metadata = json.load(f)
+
+        engine = options['engine']
+        if engine not in torch.backends.quantized.supported_engines:
+            raise CommandError(
+                f"Quantized engine '{engine}' is not supported here "
+                f"(available: {', '.join(torch.backends.quantized.supported_engines)})"
+            )
+        torch.backends.quantized.engine = engine
+
+        img_size = metadata.get('img_size', 224)
+        class_names = metadata.get('class_names', ['black', 'clay', 'loamy', 'sandy'])
+        transform = build_soil_transform(img_size)
+
+        # Check the evaluation set before spending time on calibration
+        if not options['eval_dir']:
+            raise CommandError(
+                "An evaluation set is required: pass --eval-dir (or set "
+                "SOIL_QUANTIZATION_EVAL_DIR) to the held-out validation split"
+            )
+        eval_dir = self._resolve(options['eval_dir'])
+        eval_paths, eval_labels = self._labelled_images(eval_dir, metadata, class_names)
+
+        state_dict = torch.load(model_path, map_location='cpu')
+
+        calibration_dir = self._resolve(options['calibration_dir'])
+        calibration_images = list_images(calibration_dir)
+        if not calibration_images:
+            raise CommandError(f"No images found in {calibration_dir}")
+        if len(calibration_images) < 32:
+            self.stdout.write(self.style.WARNING(
+                f"Only {len(calibration_images)} calibration images; "
+                f"activation ranges may be poorly estimated"
+            ))
+        calibration = self._load_batch(calibration_images, transform)
+        if set(calibration_images) & set(eval_paths):
+            self.stdout.write(self.style.WARNING(
+                "Calibration and evaluation images overlap; INT8 accuracy may be optimistic"
+            ))
+
+        fp32 = build_soil_model(num_classes=len(class_names))
+        fp32.load_state_dict(state_dict)
+        fp32.eval()
+
+        self.stdout.write(f"Calibrating on {len(calibration_images)} images from {calibration_dir}...")
+        int8 = self._quantize(state_dict, len(class_names), engine, calibration)
+
+        example = torch.zeros(1, 3, img_size, img_size)
+        with torch.no_grad():
+            int8 = torch.jit.freeze(torch.jit.trace(int8, example))
+
+        # Agreement with FP32 on the calibration images
+        fp32_proba = self._predict(fp32, calibration)
+        int8_proba = self._predict(int8, calibration)
+        agreement = float((fp32_proba.argmax(dim=1) == int8_proba.argmax(dim=1)).float().mean())
+        max_diff = float((fp32_proba - int8_proba).abs().max())
+        self.stdout.write(
+            f"Top-1 agreement with FP32: {agreement * 100:.1f}% "
+            f"(max abs probability diff {max_diff:.3e})"
+        )
+        if agreement < options['min_agreement']:
+            raise CommandError(
+                f"INT8 model agrees with FP32 on only {agreement * 100:.1f}% of images "
+                f"(minimum {options['min_agreement'] * 100:.1f}%)"
+            )
+
+        evaluation = self._evaluate(fp32, int8, eval_dir, eval_paths, eval_labels, transform)
+
+        fp32_val_accuracy = metadata.get('val_accuracy')
+        if fp32_val_accuracy is not None:
+            self.stdout.write(
+                f"FP32 val_accuracy (training metadata): {fp32_val_accuracy:.2f}%, "
+                f"INT8 accuracy: {evaluation['int8_accuracy']:.2f}%"
+            )
+        if -evaluation['accuracy_change'] > options['max_accuracy_drop']:
+            raise CommandError(
+                f"INT8 accuracy is {-evaluation['accuracy_change']:.2f} pts below FP32 "
+                f"(maximum drop {options['max_accuracy_drop']:.2f} pts); model not written"
+            )
+
+        # Latency
+        benchmark = {}
+        self.stdout.write(f"{'batch':>5}  {'fp32 ms':>9}  {'int8 ms':>9}  {'speedup':>7}")
+        for batch_size in (1, 8, 32):
+            inputs = torch.randn(batch_size, 3, img_size, img_size)
+            fp32_ms = self._time(fp32, inputs, options['runs'])
+            int8_ms = self._time(int8, inputs, options['runs'])
+            benchmark[batch_size] = {'fp32_ms': round(fp32_ms, 2), 'int8_ms': round(int8_ms, 2)}
+            self.stdout.write(
+                f"{batch_size:>5}  {fp32_ms:9.2f}  {int8_ms:9.2f}  {fp32_ms / int8_ms:6.2f}x"
+            )
+
+        output = model_dir / QUANTIZED_MODEL_FILENAME
+        torch.jit.save(int8, str(output))
+        quantized_meta = {
+            'format_version': FORMAT_VERSION,
+            'source_sha256': file_sha256(model_path),
+            'quantization': 'static',
+            'engine': engine,
+            'torch_version': torch.__version__,
+            'calibration_dir': str(calibration_dir),
+            'calibration_images': len(calibration_images),
+            'fp32_val_accuracy': fp32_val_accuracy,
+            'int8_accuracy': evaluation['int8_accuracy'],
+            'fp32_accuracy': evaluation['fp32_accuracy'],
+            'top1_agreement_with_fp32': agreement,
+            'max_abs_diff_vs_fp32': max_diff,
+            'evaluation': evaluation,
+            'benchmark_ms_per_batch': benchmark,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        with open(model_dir / QUANTIZED_META_FILENAME, 'w') as f:
+            json.dump(quantized_meta, f, indent=2)
+
+        size_mb = output.stat().st_size / 1e6
+        fp32_mb = model_path.stat().st_size / 1e6
+        self.stdout.write(self.style.SUCCESS(
+            f"INT8 model saved to {output} ({size_mb:.1f} MB vs {fp32_mb:.1f} MB FP32)"
+        ))
+
+    @staticmethod
+    def _resolve(path: str) -> Path:
+        path = Path(path)
+        return path if path.is_absolute() else Path(settings.BASE_DIR) / path
+
+    @staticmethod
+    def _load_batch(paths: List[Path], transform):
+        import torch
+        return torch.stack([transform(SoilClassifier._open_image(str(p))) for p in paths])
+
+    @staticmethod
+    def _predict(model, batch):
+        """Softmax probabilities, evaluated _CHUNK_SIZE images at a time."""
+        import torch
+        with torch.no_grad():
+            return torch.cat([
+                torch.softmax(model(batch[i:i + _CHUNK_SIZE]), dim=1)
+                for i in range(0, len(batch), _CHUNK_SIZE)
+            ])
+
+    def _quantize(self, state_dict, num_classes: int, engine: str, calibration):
+        """Fuse, calibrate and convert a quantizable copy of the model."""
+        import torch
+        from torch.ao.quantization import convert, fuse_modules, get_default_qconfig, prepare
+        from torchvision.models import quantization as quantized_models
+
+        model = quantized_models.resnet18(weights=None, quantize=False)
+        model.fc = build_soil_head(model.fc.in_features, num_classes)
+        model.load_state_dict(state_dict)
+        model.eval()
+
+        # conv+bn+relu in the backbone, linear+relu in the head
+        model.fuse_model()
+        fuse_modules(model.fc, [['0', '1'], ['3', '4']], inplace=True)
+
+        model.qconfig = get_default_qconfig(engine)
+        prepare(model, inplace=True)
+        self._predict(model, calibration)
+        convert(model, inplace=True)
+        return model
+
+    def _labelled_images(self, eval_dir: Path, metadata, class_names) -> Tuple[List[Path], List[int]]:
+        """Image paths and class indices of a folder-per-class labelled set."""
+        if not eval_dir.is_dir():
+            raise CommandError(f"Evaluation directory {eval_dir} does not exist")
+
+        folder_to_class = {name.lower(): name for name in class_names}
+        folder_to_class.update({
+            folder.lower(): name for folder, name in metadata.get('class_mapping', {}).items()
+        })
+
+        paths, labels = [], []
+        for folder in sorted(p for p in eval_dir.iterdir() if p.is_dir()):
+            class_name = folder_to_class.get(folder.name.lower())
+            if class_name is None:
+                self.stdout.write(self.style.WARNING(f"Skipping unknown class folder {folder.name}"))
+                continue
+            images = list_images(folder)
+            paths.extend(images)
+            labels.extend([class_names.index(class_name)] * len(images))
+
+        if not paths:
+            raise CommandError(f"No labelled images found in {eval_dir}")
+        return paths, labels
+
+    def _evaluate(self, fp32, int8, eval_dir: Path, paths: List[Path], labels: List[int], transform) -> dict:
+        """FP32 and INT8 accuracy on the labelled evaluation set."""
+        import torch
+
+        batch = self._load_batch(paths, transform)
+        labels = torch.tensor(labels)
+        fp32_accuracy = float((self._predict(fp32, batch).argmax(dim=1) == labels).float().mean()) * 100
+        int8_accuracy = float((self._predict(int8, batch).argmax(dim=1) == labels).float().mean()) * 100
+
+        self.stdout.write(
+            f"Accuracy on {len(paths)} labelled images: FP32 {fp32_accuracy:.2f}%, "
+            f"INT8 {int8_accuracy:.2f}% ({int8_accuracy - fp32_accuracy:+.2f} pts)"
+        )
+        return {
+            'dir': str(eval_dir),
+            'images': len(paths),
+            'fp32_accuracy': fp32_accuracy,
+            'int8_accuracy': int8_accuracy,
+            'accuracy_change': int8_accuracy - fp32_accuracy,
+        }
+
+    @staticmethod
+    def _time(model, inputs, runs: int) -> float:
+        """Mean milliseconds per forward pass after two warmup passes."""
+        import torch
+        with torch.no_grad():
+            for _ in range(2):
+                model(inputs)
+            start = time.perf_counter()
+            for _ in range(runs):
+                model(inputs)
+        return (time.perf_counter() - start) / max(runs, 1) * 1000
@@ -0,0 +1,61 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("predictions", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="soilclassification",
+            name="error_message",
+            field=models.TextField(blank=True, verbose_name="Error Message"),
+        ),
+        migrations.AddField(
+            model_name="soilclassification",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("processing", "Processing"),
+                    ("completed", "Completed"),
+                    ("failed", "Failed"),
+                ],
+                db_index=True,
+                default="completed",
+                max_length=20,
+                verbose_name="Status",
+            ),
+        ),
+        migrations.AddField(
+            model_name="soilclassification",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name="soilclassification",
+            name="confidence_score",
+            field=models.FloatField(
+                blank=True, null=True, verbose_name="Confidence Score"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="soilclassification",
+            name="soil_type",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("black", "Black Soil"),
+                    ("clay", "Clay Soil"),
+                    ("loamy", "Loamy Soil"),
+                    ("sandy", "Sandy Soil"),
+                ],
+                max_length=20,
+                verbose_name="Soil Type",
+            ),
+        ),
+    ]
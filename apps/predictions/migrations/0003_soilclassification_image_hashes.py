@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("predictions", "0002_soilclassification_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="soilclassification",
+            name="content_hash",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                max_length=64,
+                verbose_name="Content Hash (SHA-256)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="soilclassification",
+            name="perceptual_hash",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                max_length=16,
+                verbose_name="Perceptual Hash",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0003_soilclassification_image_hashes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='soilclassification',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Image Derivatives'),
+        ),
+    ]
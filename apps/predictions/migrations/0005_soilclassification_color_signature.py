@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0004_soilclassification_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='soilclassification',
+            name='color_signature',
+            field=models.CharField(blank=True, max_length=24, verbose_name='Color Signature'),
+        ),
+    ]
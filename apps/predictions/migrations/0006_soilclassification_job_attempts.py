@@ -0,0 +1,24 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0005_soilclassification_color_signature'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='soilclassification',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, verbose_name='Attempts'),
+        ),
+        migrations.AddField(
+            model_name='soilclassification',
+            name='next_attempt_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Next Attempt'),
+        ),
+    ]
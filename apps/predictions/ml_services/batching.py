@@ -0,0 +1,249 @@
+"""
+Crop Prediction Micro-Batching
+==============================
+Coalesces concurrent crop prediction requests into a single batched
+forward pass through CropPredictor.predict_batch().
+
+Requests are collected for at most MAX_WAIT_MS (or until MAX_BATCH_SIZE
+requests are queued), scored together, and each caller receives its own
+result. Configured through settings.CROP_BATCHING.
+
+A caller never waits on the batching thread indefinitely: if the thread has
+died (or was lost in a fork) or has not picked the request up within
+TIMEOUT_MS, the caller scores it inline with predict_batch(). Each request
+is claimed exactly once, by the thread or by its caller.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from .crop_predictor import CropPredictor, get_crop_predictor
+
+logger = logging.getLogger(__name__)
+
+# How often a waiting caller checks that the batching thread is alive
+_LIVENESS_INTERVAL = 0.1
+
+
+class _PendingPrediction:
+    """A single queued prediction waiting for its batch to run."""
+
+    __slots__ = ('features', 'result', 'error', 'done', '_claim')
+
+    def __init__(self, features: Dict[str, float]):
+        self.features = features
+        self.result = None
+        self.error: Optional[Exception] = None
+        self.done = threading.Event()
+        self._claim = threading.Lock()
+
+    def claim(self) -> bool:
+        """True for the one thread (batcher or caller) that gets to score this request."""
+        return self._claim.acquire(blocking=False)
+
+
+class CropPredictionBatcher:
+    """
+    Request coalescer in front of a CropPredictor.
+
+    predict() has the same signature and return value as
+    CropPredictor.predict(), so it can be used as a drop-in replacement.
+    """
+
+    def __init__(
+        self,
+        predictor: CropPredictor,
+        enabled: bool = True,
+        max_wait_ms: float = 5.0,
+        max_batch_size: int = 64,
+        timeout_ms: float = 1000.0
+    ):
+        self.predictor = predictor
+        self.enabled = enabled
+        self.max_wait = max(max_wait_ms, 0) / 1000.0
+        self.max_batch_size = max(int(max_batch_size), 1)
+        self.timeout = max(timeout_ms, 0) / 1000.0
+
+        self._queue: queue.Queue = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+        # Metrics
+        self._requests_total = 0
+        self._batches_total = 0
+        self._batch_sizes = Counter()
+        self._max_queue_depth = 0
+        self._inline_total = 0
+
+    def predict(self, features: Dict[str, float]) -> Dict:
+        """
+        Queue a prediction and block until its batch has been scored.
+
+        Args:
+            features: Same dictionary accepted by CropPredictor.predict()
+
+        Returns:
+            Same result dictionary as CropPredictor.predict()
+        """
+        if not self.enabled:
+            return self.predictor.predict(features)
+
+        # Cache hits skip the queue entirely
+        cached = self.predictor.get_cached(features)
+        if cached is not None:
+            return cached
+
+        self._ensure_worker()
+
+        pending = _PendingPrediction(features)
+        self._queue.put(pending)
+
+        depth = self._queue.qsize()
+        if depth > self._max_queue_depth:
+            self._max_queue_depth = depth
+
+        deadline = time.monotonic() + self.timeout
+        while not pending.done.wait(min(_LIVENESS_INTERVAL, max(deadline - time.monotonic(), 0))):
+            alive = self._worker_alive()
+            if alive and time.monotonic() < deadline:
+                continue
+            if pending.claim():
+                # The thread never took this request; score it here instead
+                logger.warning(
+                    f"[WARNING] Crop batcher {'timed out' if alive else 'thread is not running'}, "
+                    f"scoring inline"
+                )
+                with self._lock:
+                    self._inline_total += 1
+                self._ensure_worker()
+                return self.predictor.predict_batch([features], cache_lookup=False)[0]
+            # The thread is scoring it; its result always arrives
+            pending.done.wait()
+            break
+
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _worker_alive(self) -> bool:
+        """True if this process's batching thread is running."""
+        worker = self._worker
+        return worker is not None and self._worker_pid == os.getpid() and worker.is_alive()
+
+    def _ensure_worker(self):
+        """Start the batching thread (again after a fork, e.g. gunicorn preload)."""
+        pid = os.getpid()
+        if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+            return
+
+        with self._lock:
+            if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+                return
+            if self._worker_pid != pid:
+                # Queue inherited from the parent process is unusable
+                self._queue = queue.Queue()
+            self._worker = threading.Thread(
+                target=self._run,
+                name='crop-prediction-batcher',
+                daemon=True
+            )
+            self._worker_pid = pid
+            self._worker.start()
+
+    def _run(self):
+        """Worker loop: collect a batch, score it, hand back results."""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # Requests whose caller gave up waiting were scored inline
+            batch = [p for p in batch if p.claim()]
+            if batch:
+                self._process(batch)
+
+    def _process(self, batch):
+        """Score one batch and release every waiting caller."""
+        try:
+            try:
+                # Cache was already checked in predict(); results are still stored
+                results = self.predictor.predict_batch(
+                    [p.features for p in batch], cache_lookup=False
+                )
+            except Exception as e:
+                logger.error(f"[ERROR] Batched crop prediction failed: {e}")
+                # predict() falls back to mock predictions on failure
+                results = [self.predictor.predict(p.features) for p in batch]
+
+            for pending, result in zip(batch, results):
+                pending.result = result
+        except Exception as e:
+            logger.error(f"[ERROR] Crop prediction fallback failed: {e}")
+            for pending in batch:
+                pending.error = e
+        finally:
+            for pending in batch:
+                pending.done.set()
+
+        with self._lock:
+            self._requests_total += len(batch)
+            self._batches_total += 1
+            self._batch_sizes[len(batch)] += 1
+
+    def get_metrics(self) -> Dict:
+        """Return queue depth and batch size statistics."""
+        with self._lock:
+            batches = self._batches_total
+            return {
+                'enabled': self.enabled,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'max_batch_size': self.max_batch_size,
+                'timeout_ms': self.timeout * 1000.0,
+                'worker_alive': self._worker_alive(),
+                'inline_total': self._inline_total,
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self._max_queue_depth,
+                'requests_total': self._requests_total,
+                'batches_total': batches,
+                'avg_batch_size': (self._requests_total / batches) if batches else 0.0,
+                'batch_size_histogram': dict(sorted(self._batch_sizes.items())),
+            }
+
+
+# Singleton instance
+_batcher: Optional[CropPredictionBatcher] = None
+
+
+def get_crop_batcher() -> CropPredictionBatcher:
+    """
+    Get or create the crop prediction batcher singleton.
+
+    Returns:
+        CropPredictionBatcher wrapping get_crop_predictor()
+    """
+    global _batcher
+    if _batcher is None:
+        from django.conf import settings
+        config = getattr(settings, 'CROP_BATCHING', {})
+        _batcher = CropPredictionBatcher(
+            get_crop_predictor(),
+            enabled=config.get('ENABLED', False),
+            max_wait_ms=config.get('MAX_WAIT_MS', 5.0),
+            max_batch_size=config.get('MAX_BATCH_SIZE', 64),
+            timeout_ms=config.get('TIMEOUT_MS', 1000.0)
+        )
+    return _batcher
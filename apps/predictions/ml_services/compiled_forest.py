@@ -0,0 +1,436 @@
+"""
+Compiled Random Forest Evaluator
+================================
+Flattens every tree of a fitted scikit-learn RandomForestClassifier into
+contiguous NumPy arrays and evaluates the whole forest with vectorized
+indexing over a batch.
+
+The compiled model is a drop-in replacement for the forest's
+predict_proba() and avoids sklearn's per-call overhead (input validation,
+joblib dispatch over estimators) on small inputs.
+
+A StandardScaler applied before the forest can be folded into the split
+thresholds (fuse_scaler), giving a single model that reads raw features.
+Each folded threshold is the largest raw value that the scaler + float32
+tree comparison still sends left, so fused and unfused splits agree on
+every input, not just approximately.
+
+Models can also be exported as a directory of raw .npy files
+(save_mmap) and loaded with mmap_mode='r', so every worker process maps
+the same page-cache copy instead of holding a private one.
+
+Saved models carry the sha256 of the files they were built from
+(sources), so a loader can tell when they are out of date.
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import numpy as np
+
+# Bump when the on-disk layout changes
+FORMAT_VERSION = 1
+
+# Directory suffix for the memory-mappable export of a .npz model
+MMAP_SUFFIX = '.mmap'
+
+# Rows evaluated at once; keeps the (rows x trees) node matrix cache-sized
+_CHUNK_SIZE = 128
+
+# Up to this many rows, gathering all leaves at once beats a per-tree loop
+_SMALL_BATCH = 16
+
+_SIGN_BIT = np.int64(-0x8000000000000000)
+_MAGNITUDE = np.int64(0x7FFFFFFFFFFFFFFF)
+
+
+def _to_ordered(x: np.ndarray) -> np.ndarray:
+    """float64 -> int64 keys in the same order (adjacent floats differ by 1)."""
+    bits = x.view(np.int64)
+    return np.where(bits < 0, -(bits & _MAGNITUDE), bits)
+
+
+def _from_ordered(key: np.ndarray) -> np.ndarray:
+    """Inverse of _to_ordered."""
+    bits = np.where(key < 0, (-key) | _SIGN_BIT, key)
+    return bits.view(np.float64)
+
+
+def fold_thresholds(
+    threshold: np.ndarray, mean: np.ndarray, scale: np.ndarray
+) -> np.ndarray:
+    """
+    Raw-value thresholds equivalent to scaled float32 tree splits.
+
+    A tree behind StandardScaler sends x left when
+    float32((x - mean) / scale) <= threshold. That is monotone in x, so
+    there is a largest float64 raw value T with the same answer, and
+    x <= T is the identical split. threshold * scale + mean lands within a
+    few ulps of T; the exact value is found by bisecting over adjacent
+    float64 values.
+
+    Args:
+        threshold, mean, scale: Per-split arrays of the same shape
+    """
+    threshold = np.asarray(threshold, dtype=np.float64)
+    mean = np.asarray(mean, dtype=np.float64)
+    scale = np.asarray(scale, dtype=np.float64)
+
+    def goes_left(x):
+        # Same arithmetic as StandardScaler.transform, then the tree's float32 cast
+        return ((x - mean) / scale).astype(np.float32) <= threshold
+
+    guess = threshold * scale + mean
+    margin = (np.abs(guess) + np.abs(mean) + scale) * 1e-4
+    lo = _to_ordered(guess - margin)
+    hi = _to_ordered(guess + margin)
+    if not (goes_left(_from_ordered(lo)).all() and not goes_left(_from_ordered(hi)).any()):
+        raise ValueError("Could not bracket the folded split thresholds")
+
+    # Invariant: lo goes left, hi goes right
+    while (hi - lo > 1).any():
+        mid = lo + (hi - lo) // 2
+        left = goes_left(_from_ordered(mid))
+        lo = np.where(left, mid, lo)
+        hi = np.where(left, hi, mid)
+    return _from_ordered(lo)
+
+
+class CompiledForest:
+    """
+    Array-backed random forest.
+
+    All trees share one set of node arrays. Node ids are global; roots[i]
+    is the root node of tree i. Leaf nodes point to themselves so every
+    row can take the same number of steps without masking.
+    """
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        max_depth: int,
+        classes: np.ndarray,
+        n_features: int,
+        labels: Optional[np.ndarray] = None,
+        scaler_fused: bool = False,
+        children: Optional[np.ndarray] = None,
+        fused_exact: bool = False,
+        sources: Optional[Dict[str, str]] = None
+    ):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        self.n_features_in_ = int(n_features)
+        self.n_classes_ = value.shape[1]
+        self.labels = labels
+        self.scaler_fused = bool(scaler_fused)
+        # False for models fused before fold_thresholds (threshold * scale + mean)
+        self.fused_exact = bool(fused_exact)
+        # File name -> sha256 of the artifacts this model was built from
+        self.sources = dict(sources or {})
+        self.is_leaf = left == np.arange(len(left))
+
+        # Interleaved children: node 2*i is the left child of i, 2*i + 1 the
+        # right child, so one gather picks the branch. Views (no copies) when
+        # the arrays are already stored in this layout, e.g. memory-mapped.
+        if children is None:
+            children = np.stack([left, right], axis=1).astype(np.intp)
+        self._children = children.reshape(-1)
+        self._feature = feature.astype(np.intp, copy=False)
+        self._roots = roots.astype(np.intp, copy=False)
+
+    @classmethod
+    def from_sklearn(cls, model) -> 'CompiledForest':
+        """
+        Compile a fitted RandomForestClassifier.
+
+        Args:
+            model: Fitted sklearn RandomForestClassifier
+
+        Returns:
+            CompiledForest producing the same probabilities
+        """
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(offset, offset + n_nodes)
+            leaf = tree.children_left == -1
+
+            lefts.append(np.where(leaf, node_ids, tree.children_left + offset))
+            rights.append(np.where(leaf, node_ids, tree.children_right + offset))
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(np.where(leaf, np.inf, tree.threshold))
+
+            # Per-tree leaf class distribution, as in DecisionTree.predict_proba
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n_nodes
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.int32),
+            right=np.concatenate(rights).astype(np.int32),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            classes=np.asarray(model.classes_),
+            n_features=model.n_features_in_
+        )
+
+    def fuse_scaler(self, scaler, labels: Optional[np.ndarray] = None) -> 'CompiledForest':
+        """
+        Fold a fitted StandardScaler into the split thresholds.
+
+        A split on the scaled value, (x - mean) / scale <= t, becomes a
+        split on the raw value, x <= T, with T from fold_thresholds(). The
+        fused model compares raw float64 inputs, so it returns exactly the
+        probabilities of scaler.transform() + this forest.
+
+        Args:
+            scaler: Fitted sklearn StandardScaler used before the forest
+            labels: Optional class names to store with the model
+
+        Returns:
+            New CompiledForest that takes unscaled inputs
+        """
+        if self.scaler_fused:
+            raise ValueError("Scaler is already fused into this model")
+
+        n_features = self.n_features_in_
+        mean = scaler.mean_ if getattr(scaler, 'with_mean', True) else None
+        scale = scaler.scale_ if getattr(scaler, 'with_std', True) else None
+        mean = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+        scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+
+        split = ~self.is_leaf
+        threshold = np.full(len(self.threshold), np.inf)
+        threshold[split] = fold_thresholds(
+            self.threshold[split], mean[self.feature[split]], scale[self.feature[split]]
+        )
+
+        return CompiledForest(
+            feature=self.feature,
+            threshold=threshold,
+            left=self.left,
+            right=self.right,
+            value=self.value,
+            roots=self.roots,
+            max_depth=self.max_depth,
+            classes=self.classes_,
+            n_features=n_features,
+            labels=self.labels if labels is None else np.asarray(labels),
+            scaler_fused=True,
+            fused_exact=True
+        )
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Average leaf class distributions over all trees.
+
+        Args:
+            X: N x n_features array
+
+        Returns:
+            N x n_classes probability matrix
+        """
+        # sklearn trees compare float32 inputs against their thresholds; fused
+        # thresholds are exact for raw float64 inputs (fold_thresholds)
+        X = np.asarray(X, dtype=np.float64 if self.scaler_fused else np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"Expected {self.n_features_in_} features per row, got {X.shape[1]}"
+            )
+
+        if len(X) <= _CHUNK_SIZE:
+            return self._predict_chunk(X)
+
+        return np.concatenate([
+            self._predict_chunk(X[start:start + _CHUNK_SIZE])
+            for start in range(0, len(X), _CHUNK_SIZE)
+        ])
+
+    def _predict_chunk(self, X: np.ndarray) -> np.ndarray:
+        """Walk all trees for a chunk of rows at once."""
+        n_rows = len(X)
+        n_trees = len(self._roots)
+
+        # Offsets into the flattened input, one per row
+        row_offset = (np.arange(n_rows, dtype=np.intp) * X.shape[1])[:, None]
+        X_flat = X.ravel()
+        node = np.broadcast_to(self._roots, (n_rows, n_trees)).copy()
+
+        for _ in range(self.max_depth):
+            x = np.take(X_flat, row_offset + np.take(self._feature, node))
+            go_right = x > np.take(self.threshold, node)
+            node = np.take(self._children, 2 * node + go_right)
+            if np.take(self.is_leaf, node).all():
+                break
+
+        if n_rows <= _SMALL_BATCH:
+            return self.value[node].mean(axis=1)
+
+        # Accumulate per tree to avoid a (rows x trees x classes) temporary
+        proba = np.zeros((n_rows, self.n_classes_))
+        for tree in range(n_trees):
+            proba += np.take(self.value, node[:, tree], axis=0)
+        return proba / n_trees
+
+    def save(self, path: Union[str, Path]):
+        """Save the compiled arrays as an uncompressed .npz file."""
+        extra = {}
+        if self.labels is not None:
+            extra['labels'] = np.asarray(self.labels, dtype=str)
+        if self.sources:
+            extra['sources'] = np.asarray(json.dumps(self.sources, sort_keys=True))
+
+        np.savez(
+            path,
+            **extra,
+            format_version=np.int32(FORMAT_VERSION),
+            scaler_fused=np.bool_(self.scaler_fused),
+            fused_exact=np.bool_(self.fused_exact),
+            feature=self.feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            value=self.value,
+            roots=self.roots,
+            max_depth=np.int32(self.max_depth),
+            classes=self.classes_,
+            n_features=np.int32(self.n_features_in_)
+        )
+
+    def save_mmap(self, directory: Union[str, Path], source_sha256: Optional[str] = None):
+        """
+        Save the model as a directory of uncompressed .npy files.
+
+        Arrays are stored in the exact layout used at inference time, so
+        load(directory, mmap_mode='r') maps them without any copies.
+
+        Args:
+            directory: Output directory
+            source_sha256: sha256 of the .npz this export was made from,
+                recorded in meta.json so loaders can detect a stale export
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        arrays = {
+            'feature': self._feature,
+            'threshold': np.ascontiguousarray(self.threshold, dtype=np.float64),
+            'children': self._children.reshape(-1, 2),
+            'value': np.ascontiguousarray(self.value, dtype=np.float64),
+            'roots': self._roots,
+            'classes': np.asarray(self.classes_),
+        }
+        if self.labels is not None:
+            arrays['labels'] = np.asarray(self.labels, dtype=str)
+
+        for name, array in arrays.items():
+            np.save(directory / f'{name}.npy', array, allow_pickle=False)
+
+        meta = {
+            'format_version': FORMAT_VERSION,
+            'max_depth': self.max_depth,
+            'n_features': self.n_features_in_,
+            'scaler_fused': self.scaler_fused,
+            'fused_exact': self.fused_exact,
+            'sources': self.sources,
+            'source_sha256': source_sha256,
+        }
+        with open(directory / 'meta.json', 'w') as f:
+            json.dump(meta, f, indent=2)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], mmap_mode: Optional[str] = None) -> 'CompiledForest':
+        """
+        Load a forest written by save() (.npz) or save_mmap() (directory).
+
+        Args:
+            path: .npz file or save_mmap() directory
+            mmap_mode: Passed to np.load for directory exports, e.g. 'r'
+        """
+        path = Path(path)
+        if path.is_dir():
+            return cls._load_dir(path, mmap_mode)
+
+        with np.load(path, allow_pickle=False) as data:
+            version = int(data['format_version'])
+            if version != FORMAT_VERSION:
+                raise ValueError(
+                    f"Unsupported compiled forest format {version} "
+                    f"(expected {FORMAT_VERSION})"
+                )
+            return cls(
+                feature=data['feature'],
+                threshold=data['threshold'],
+                left=data['left'],
+                right=data['right'],
+                value=data['value'],
+                roots=data['roots'],
+                max_depth=int(data['max_depth']),
+                classes=data['classes'],
+                n_features=int(data['n_features']),
+                labels=data['labels'] if 'labels' in data.files else None,
+                scaler_fused=bool(data['scaler_fused']) if 'scaler_fused' in data.files else False,
+                fused_exact=bool(data['fused_exact']) if 'fused_exact' in data.files else False,
+                sources=json.loads(str(data['sources'])) if 'sources' in data.files else None
+            )
+
+    @classmethod
+    def _load_dir(cls, directory: Path, mmap_mode: Optional[str]) -> 'CompiledForest':
+        """Load a save_mmap() export, optionally memory-mapped."""
+        with open(directory / 'meta.json') as f:
+            meta = json.load(f)
+        if meta['format_version'] != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported compiled forest format {meta['format_version']} "
+                f"(expected {FORMAT_VERSION})"
+            )
+
+        def _load(name):
+            # np.asarray drops the memmap subclass but keeps the mapping
+            return np.asarray(np.load(directory / f'{name}.npy', mmap_mode=mmap_mode))
+
+        children = _load('children')
+        labels_path = directory / 'labels.npy'
+
+        return cls(
+            feature=_load('feature'),
+            threshold=_load('threshold'),
+            left=children[:, 0],
+            right=children[:, 1],
+            value=_load('value'),
+            roots=_load('roots'),
+            max_depth=meta['max_depth'],
+            classes=_load('classes'),
+            n_features=meta['n_features'],
+            labels=np.load(labels_path) if labels_path.exists() else None,
+            scaler_fused=meta['scaler_fused'],
+            children=children,
+            fused_exact=meta.get('fused_exact', False),
+            sources=meta.get('sources')
+        )
@@ -6,13 +6,238 @@ Provides Top-3 crop recommendations with confidence scores.
 """
 
 import numpy as np
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import copy
+import csv
+import hashlib
+import json
 import os
+import threading
 from pathlib import Path
 
 # Lazy imports for ML libraries (loaded only when needed)
 _joblib = None
 
+# Feature order expected by the model (matches training column order)
+FEATURE_KEYS = (
+    'nitrogen', 'phosphorus', 'potassium', 'temperature',
+    'humidity', 'ph_value', 'rainfall'
+)
+
+# Typical input ranges (training data / form help text), in FEATURE_KEYS order
+FEATURE_RANGES = (
+    (0.0, 140.0),    # nitrogen
+    (5.0, 145.0),    # phosphorus
+    (5.0, 205.0),    # potassium
+    (8.0, 45.0),     # temperature
+    (14.0, 100.0),   # humidity
+    (3.5, 9.9),      # ph_value
+    (20.0, 300.0),   # rainfall
+)
+
+# Artifact written by `manage.py compile_crop_model`
+COMPILED_MODEL_FILENAME = 'random_forest_compiled.npz'
+
+# Scaler-free artifact (scaler + forest + labels) written by `manage.py fuse_crop_model`
+FUSED_MODEL_FILENAME = 'crop_model_fused.npz'
+
+# Training outputs the compiled/fused artifacts are built from
+SOURCE_FILENAMES = ('random_forest_model.pkl', 'scaler.pkl', 'label_encoder.pkl')
+
+
+def get_model_dir() -> Path:
+    """Directory holding the crop prediction model artifacts."""
+    base_dir = Path(__file__).resolve().parent.parent.parent.parent
+    return base_dir / 'crop-prediction-models'
+
+
+def get_sample_features() -> Optional[np.ndarray]:
+    """Feature matrix from datasets/test_samples/test_samples_real.csv, if present."""
+    base_dir = Path(__file__).resolve().parent.parent.parent.parent
+    path = base_dir / 'datasets' / 'test_samples' / 'test_samples_real.csv'
+    if not path.exists():
+        return None
+    with open(path, newline='') as f:
+        rows = [[float(row[key]) for key in FEATURE_KEYS] for row in csv.DictReader(f)]
+    return np.array(rows) if rows else None
+
+
+def get_parity_inputs(samples: int = 10000, seed: int = 42) -> Dict[str, np.ndarray]:
+    """
+    Raw input sets for checking that an optimized model matches sklearn.
+
+    Continuous random values rarely land on a split threshold; real inputs
+    do, because N/P/K are whole numbers and the rest is entered with one
+    decimal. So besides 'random' this includes 'integer' (every feature a
+    whole number), 'form' (whole N/P/K, one-decimal rest) and the
+    'dataset' rows when the sample CSV is present.
+    """
+    rng = np.random.default_rng(seed)
+    low, high = np.array(FEATURE_RANGES).T
+    shape = (samples, len(FEATURE_RANGES))
+
+    form = np.round(rng.uniform(low, high, size=shape), 1)
+    form[:, :3] = rng.integers(low[:3], high[:3], size=(samples, 3), endpoint=True)
+
+    inputs = {
+        'random': rng.uniform(low, high, size=shape),
+        'integer': rng.integers(np.ceil(low), np.floor(high), size=shape, endpoint=True).astype(np.float64),
+        'form': form,
+    }
+    dataset = get_sample_features()
+    if dataset is not None:
+        inputs['dataset'] = dataset
+    return inputs
+
+
+def get_source_hashes(model_dir: Path) -> Dict[str, str]:
+    """sha256 of each SOURCE_FILENAMES file present in model_dir."""
+    from .soil_classifier import file_sha256
+
+    return {
+        name: file_sha256(model_dir / name)
+        for name in SOURCE_FILENAMES
+        if (model_dir / name).exists()
+    }
+
+
+def check_model_sources(path: Path, model) -> Optional[str]:
+    """
+    Check that a compiled/fused model was built from the files next to it.
+
+    Compares the sha256 recorded in the model with the current .pkl files
+    in the same directory, so a retrained forest, scaler or label encoder
+    is noticed. Sources missing from the directory are not checked.
+
+    Returns:
+        None when the model is current, else a description of the problem
+    """
+    from .soil_classifier import file_sha256
+
+    if not model.sources:
+        return f"{path.name} does not record the model files it was built from"
+
+    for name, digest in sorted(model.sources.items()):
+        source = path.parent / name
+        if source.exists() and file_sha256(source) != digest:
+            return f"{path.name} was built from a different {name}"
+    return None
+
+
+def _get_setting(name: str, default):
+    """Read a Django setting, falling back to default outside Django."""
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+def _get_model_backend() -> str:
+    """Configured forest backend: 'auto', 'fused', 'compiled' or 'sklearn'."""
+    return _get_setting('CROP_MODEL_BACKEND', 'auto')
+
+
+def _load_compiled_model(npz_path: Path):
+    """
+    Load a compiled/fused forest, memory-mapped when CROP_MODEL_MMAP is set.
+
+    The mmap export (manage.py export_crop_model_mmap) lives next to the
+    .npz file; all workers then share one page-cache copy of the arrays.
+    The model version is derived from the .npz, so an export made from a
+    different .npz is never used.
+    """
+    from .compiled_forest import CompiledForest, MMAP_SUFFIX
+
+    if _get_setting('CROP_MODEL_MMAP', False):
+        mmap_dir = npz_path.with_suffix(MMAP_SUFFIX)
+        problem = _check_mmap_export(mmap_dir, npz_path)
+        if problem is None:
+            print(f"[INFO] Memory-mapping crop model from {mmap_dir}...")
+            return CompiledForest.load(mmap_dir, mmap_mode='r')
+        print(f"[WARNING] {problem}, run manage.py export_crop_model_mmap; loading {npz_path.name}")
+
+    return CompiledForest.load(npz_path)
+
+
+def _check_mmap_export(mmap_dir: Path, npz_path: Path) -> Optional[str]:
+    """
+    Check that an mmap export was made from npz_path.
+
+    Returns:
+        None when the export is usable, else a description of the problem
+    """
+    from .soil_classifier import file_sha256
+
+    meta_path = mmap_dir / 'meta.json'
+    if not meta_path.exists():
+        return f"{mmap_dir} not found"
+
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta.get('source_sha256') != file_sha256(npz_path):
+        return f"{mmap_dir.name} was exported from a different {npz_path.name}"
+    return None
+
+
+def _load_lookup_grid(model_version: str):
+    """
+    Load the precomputed top-3 grid if CROP_LOOKUP_GRID is enabled.
+
+    A grid built from different model artifacts, or whose recorded top-1
+    agreement with the live model is below MIN_TOP1_AGREEMENT, is ignored.
+    """
+    config = _get_setting('CROP_LOOKUP_GRID', {})
+    if not config.get('ENABLED', False):
+        return None
+
+    from .lookup_grid import LookupGrid
+
+    grid_path = Path(config.get('PATH') or get_model_dir() / 'crop_grid')
+    if not (grid_path / 'grid.json').exists():
+        print(f"[WARNING] Lookup grid not found at {grid_path}, run manage.py build_crop_grid")
+        return None
+
+    grid = LookupGrid.load(grid_path)
+    if grid.model_version != model_version:
+        print(
+            f"[WARNING] Lookup grid was built for model {grid.model_version}, "
+            f"loaded model is {model_version}; ignoring grid"
+        )
+        return None
+
+    min_agreement = config.get('MIN_TOP1_AGREEMENT', 0.8)
+    agreement = grid.min_top1_agreement
+    if agreement is None or agreement < min_agreement:
+        measured = 'not measured' if agreement is None else f"{agreement * 100:.2f}%"
+        print(
+            f"[WARNING] Lookup grid top-1 agreement with the live model is {measured}, "
+            f"below the required {min_agreement * 100:.2f}%; ignoring grid"
+        )
+        return None
+
+    print(f"[OK] Lookup grid loaded ({int(np.prod(grid.bins))} points)")
+    return grid
+
+
+def _artifact_fingerprint(paths: Sequence[Path]) -> str:
+    """
+    Short version id for a set of model files.
+
+    Combines metadata.json's model_version with each file's name, size and
+    mtime, so replacing any artifact yields a new version.
+    """
+    digest = hashlib.sha1()
+    metadata_path = get_model_dir() / 'metadata.json'
+    if metadata_path.exists():
+        with open(metadata_path) as f:
+            digest.update(str(json.load(f).get('model_version', '')).encode())
+
+    for path in paths:
+        stat = path.stat()
+        digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:12]
+
 
 def _load_ml_libraries():
     """Lazy load ML libraries to improve startup time."""
@@ -35,52 +260,127 @@ class CropPredictor:
     - 99% test accuracy, 100% Top-3 accuracy
     """
 
-    def __init__(self):
-        """Initialize the crop predictor with trained model."""
+    def __init__(self, cache=None):
+        """
+        Initialize the crop predictor with trained model.
+
+        Args:
+            cache: Optional PredictionCache for exact-input result caching
+        """
         self.model = None
         self.scaler = None
         self.label_encoder = None
         self.is_trained = False
         self.num_crops = 22
         self.crops_list = []
+        self.backend = None
+        self.model_version = None
+        self.cache = cache
+        self.grid = None
+        self._class_names = None
 
         # Lazy loading - load model on first prediction
         self._model_loaded = False
+        self._load_lock = threading.Lock()
 
     def _load_model(self):
         """Load the trained Random Forest model and preprocessing artifacts."""
         if self._model_loaded:
             return
 
+        # Warmup thread and first request may race to load the model
+        with self._load_lock:
+            if self._model_loaded:
+                return
+            self._load_model_artifacts()
+
+    def _load_model_artifacts(self):
+        """Read model files from disk (called once, under the load lock)."""
         try:
             # Load ML libraries
             joblib = _load_ml_libraries()
 
-            # Get base directory
-            base_dir = Path(__file__).resolve().parent.parent.parent.parent
-            model_dir = base_dir / 'crop-prediction-models'
+            model_dir = get_model_dir()
 
             # Check if models exist
             model_path = model_dir / 'random_forest_model.pkl'
+            compiled_path = model_dir / COMPILED_MODEL_FILENAME
+            fused_path = model_dir / FUSED_MODEL_FILENAME
             scaler_path = model_dir / 'scaler.pkl'
             encoder_path = model_dir / 'label_encoder.pkl'
 
-            if not model_path.exists():
-                raise FileNotFoundError(f"Model not found at {model_path}")
-
-            # Load model
-            print(f"[INFO] Loading Random Forest model from {model_path}...")
-            self.model = joblib.load(str(model_path))
-            print("[OK] Random Forest model loaded successfully")
-
-            # Load preprocessing artifacts
-            self.scaler = joblib.load(str(scaler_path))
-            self.label_encoder = joblib.load(str(encoder_path))
+            backend = _get_model_backend()
+            if backend == 'fused' and not fused_path.exists():
+                raise FileNotFoundError(f"Fused model not found at {fused_path}")
+            if backend == 'compiled' and not compiled_path.exists():
+                raise FileNotFoundError(f"Compiled model not found at {compiled_path}")
+
+            fused = None
+            if backend in ('auto', 'fused') and fused_path.exists():
+                print(f"[INFO] Loading fused crop model from {fused_path}...")
+                fused = _load_compiled_model(fused_path)
+                problem = check_model_sources(fused_path, fused)
+                if problem is None and not fused.fused_exact:
+                    # Folded as threshold * scale + mean: differs from sklearn near splits
+                    problem = f"{fused_path.name} predates exact threshold folding"
+                if problem:
+                    message = f"{problem}, rerun manage.py fuse_crop_model"
+                    if backend == 'fused':
+                        raise ValueError(message)
+                    print(f"[WARNING] {message}; using the unfused model")
+                    fused = None
+
+            compiled = None
+            if fused is None and backend in ('auto', 'compiled') and compiled_path.exists():
+                print(f"[INFO] Loading compiled Random Forest from {compiled_path}...")
+                compiled = _load_compiled_model(compiled_path)
+                problem = check_model_sources(compiled_path, compiled)
+                if problem:
+                    message = f"{problem}, rerun manage.py compile_crop_model"
+                    if backend == 'compiled':
+                        raise ValueError(message)
+                    print(f"[WARNING] {message}; using the sklearn model")
+                    compiled = None
+
+            if fused is not None:
+                # Single artifact: reads raw features, carries its own labels
+                self.model = fused
+                self.scaler = None
+                self._class_names = self.model.labels
+                self.backend = 'fused'
+                artifacts = [fused_path]
+                print("[OK] Fused crop model loaded successfully")
+            elif compiled is not None:
+                # Flat array evaluator, same probabilities as the sklearn forest
+                self.model = compiled
+                self.backend = 'compiled'
+                artifacts = [compiled_path, scaler_path, encoder_path]
+                print("[OK] Compiled Random Forest loaded successfully")
+            else:
+                if not model_path.exists():
+                    raise FileNotFoundError(f"Model not found at {model_path}")
+
+                # Load model
+                print(f"[INFO] Loading Random Forest model from {model_path}...")
+                self.model = joblib.load(str(model_path))
+                self.backend = 'sklearn'
+                artifacts = [model_path, scaler_path, encoder_path]
+                print("[OK] Random Forest model loaded successfully")
+
+            if self.backend != 'fused':
+                # Load preprocessing artifacts
+                self.scaler = joblib.load(str(scaler_path))
+                self.label_encoder = joblib.load(str(encoder_path))
+                self._class_names = self.label_encoder.classes_[self.model.classes_]
 
             # Get crop list
-            self.crops_list = self.label_encoder.classes_.tolist()
+            self.crops_list = self._class_names.tolist()
             self.num_crops = len(self.crops_list)
 
+            # Cache keys include this, so new artifacts never hit old results
+            self.model_version = _artifact_fingerprint(artifacts)
+            self.grid = _load_lookup_grid(self.model_version)
+
             self.is_trained = True
             self._model_loaded = True
 
@@ -121,52 +421,231 @@ class CropPredictor:
             return self._mock_prediction(features)
 
         try:
-            # Extract 7 original features (NO engineering!)
-            N = features.get('nitrogen', 0)
-            P = features.get('phosphorus', 0)
-            K = features.get('potassium', 0)
-            temperature = features.get('temperature', 0)
-            humidity = features.get('humidity', 0)
-            ph = features.get('ph_value', 0)
-            rainfall = features.get('rainfall', 0)
-
-            # Create feature array (7 features only)
-            X = np.array([[N, P, K, temperature, humidity, ph, rainfall]])
-
-            # Scale features
-            X_scaled = self.scaler.transform(X)
-
-            # Predict probabilities
-            proba = self.model.predict_proba(X_scaled)[0]
-
-            # Get top 3 predictions
-            top3_idx = np.argsort(proba)[-3:][::-1]
-            top3_crops = self.label_encoder.inverse_transform(top3_idx)
-            top3_conf = proba[top3_idx]
-
-            # Format results
-            top_3 = [
-                {
-                    'crop': crop.capitalize(),
-                    'score': float(conf),
-                    'confidence_percent': float(conf * 100)
-                }
-                for crop, conf in zip(top3_crops, top3_conf)
-            ]
-
-            return {
-                'predicted_crop': top_3[0]['crop'],
-                'confidence_score': top_3[0]['score'],
-                'confidence_percent': top_3[0]['confidence_percent'],
-                'top_3_crops': top_3,
-                'num_total_crops': self.num_crops,
-                'all_crops_available': self.crops_list
-            }
+            return self.predict_batch([features])[0]
 
         except Exception as e:
             print(f"[ERROR] Prediction failed: {e}")
             return self._mock_prediction(features)
 
+    def predict_batch(
+        self,
+        features: Union[np.ndarray, Sequence[Dict[str, float]]],
+        top_k: int = 3,
+        return_arrays: bool = False,
+        cache_lookup: bool = True
+    ) -> Union[List[Dict], Tuple[np.ndarray, np.ndarray]]:
+        """
+        Predict crops for many inputs with a single forward pass.
+
+        Args:
+            features: Either an N x 7 array in FEATURE_KEYS order or a
+                list of feature dictionaries (same keys as predict()).
+            top_k: Number of recommendations per row.
+            return_arrays: If True, skip building per-row dictionaries and
+                return (top_k_indices, top_k_scores) arrays of shape
+                N x top_k. Indices map into self.crops_list.
+            cache_lookup: Check the result cache before running the model
+                (results are stored either way when a cache is set).
+
+        Returns:
+            List of result dictionaries (same structure as predict()),
+            or a tuple of arrays when return_arrays is True.
+        """
+        if not self._model_loaded:
+            self._load_model()
+
+        X = self._to_feature_matrix(features)
+
+        if not self.is_trained or self.model is None:
+            if return_arrays:
+                raise RuntimeError("Crop prediction model not loaded")
+            return [
+                self._mock_prediction(dict(zip(FEATURE_KEYS, row)))
+                for row in X.tolist()
+            ]
+
+        if len(X) == 0:
+            # StandardScaler rejects 0-row input; answer the same on every backend
+            if return_arrays:
+                k = min(top_k, self.num_crops)
+                return np.empty((0, k), dtype=np.intp), np.empty((0, k), dtype=np.float64)
+            return []
+
+        if return_arrays:
+            return self._predict_top_k(X, top_k)
+
+        if self.cache is None:
+            return self._predict_rows(X, top_k)
+
+        return self._predict_rows_cached(X, top_k, cache_lookup)
+
+    def _predict_rows(self, X: np.ndarray, top_k: int) -> List[Dict]:
+        """Run the model on a feature matrix and format each row."""
+        top_idx, top_scores = self._predict_top_k(X, top_k)
+
+        # Map class indices to names for the whole batch at once
+        top_names = self._class_names[top_idx]
+
+        return [
+            self._format_result(names, scores)
+            for names, scores in zip(top_names.tolist(), top_scores.tolist())
+        ]
+
+    def _predict_rows_cached(self, X: np.ndarray, top_k: int, cache_lookup: bool) -> List[Dict]:
+        """Serve rows from the result cache; run the model only on unique misses."""
+        # Score the rounded values the key stands for, not whichever raw row came first
+        X = self.cache.round_features(X)
+        keys = self.cache.make_keys(X, self.model_version, top_k)
+
+        # First row index for every distinct key (batches often repeat rows)
+        first_row = {}
+        for i, key in enumerate(keys):
+            first_row.setdefault(key, i)
+
+        results = self.cache.get_many(first_row) if cache_lookup else {}
+
+        missing = [key for key in first_row if key not in results]
+        if missing:
+            computed = self._predict_rows(X[[first_row[key] for key in missing]], top_k)
+            fresh = dict(zip(missing, computed))
+            self.cache.set_many(fresh)
+            results.update(fresh)
+
+        # Repeated rows get their own copy, so editing one result changes no other
+        rows = []
+        for i, key in enumerate(keys):
+            result = results[key]
+            rows.append(result if first_row[key] == i else copy.deepcopy(result))
+        return rows
+
+    def get_cached(self, features: Dict[str, float], top_k: int = 3) -> Optional[Dict]:
+        """
+        Look up a single prediction in the result cache without running the model.
+
+        Returns:
+            Cached result dictionary, or None on a miss / when caching is off
+        """
+        if self.cache is None or not self._model_loaded or not self.is_trained:
+            return None
+        key = self.cache.make_keys(self._to_feature_matrix([features]), self.model_version, top_k)[0]
+        return self.cache.get_many([key]).get(key)
+
+    def _predict_top_k(self, X: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k per row, from the lookup grid where possible, else the live model."""
+        if self.grid is None or top_k > self.grid.top_k:
+            return self._top_k(self._predict_proba(X), top_k)
+
+        inside = self.grid.contains(X)
+        if inside.all():
+            top_idx, top_scores = self.grid.lookup(X)
+            return top_idx[:, :top_k], top_scores[:, :top_k]
+
+        top_idx = np.empty((len(X), top_k), dtype=np.intp)
+        top_scores = np.empty((len(X), top_k), dtype=np.float64)
+
+        if inside.any():
+            grid_idx, grid_scores = self.grid.lookup(X[inside])
+            top_idx[inside] = grid_idx[:, :top_k]
+            top_scores[inside] = grid_scores[:, :top_k]
+
+        outside = ~inside
+        top_idx[outside], top_scores[outside] = self._top_k(
+            self._predict_proba(X[outside]), top_k
+        )
+        return top_idx, top_scores
+
+    def _to_feature_matrix(
+        self,
+        features: Union[np.ndarray, Sequence[Dict[str, float]]]
+    ) -> np.ndarray:
+        """Convert an array or list of feature dicts into an N x 7 matrix."""
+        if isinstance(features, np.ndarray):
+            X = np.asarray(features, dtype=np.float64)
+            if X.ndim == 1:
+                X = X.reshape(1, -1)
+        else:
+            X = np.array(
+                [[row.get(key, 0) for key in FEATURE_KEYS] for row in features],
+                dtype=np.float64
+            ).reshape(-1, len(FEATURE_KEYS))
+
+        if X.shape[1] != len(FEATURE_KEYS):
+            raise ValueError(
+                f"Expected {len(FEATURE_KEYS)} features per row, got {X.shape[1]}"
+            )
+        return X
+
+    def _predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Scale a feature matrix and return class probabilities."""
+        if self.scaler is None:
+            # Fused model: scaling is folded into the split thresholds
+            return self.model.predict_proba(X)
+        X_scaled = self.scaler.transform(X)
+        return self.model.predict_proba(X_scaled)
+
+    @staticmethod
+    def _top_k(proba: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized top-k over each row of a probability matrix.
+
+        Returns:
+            (indices, scores) of shape N x k, sorted by descending score.
+        """
+        k = min(k, proba.shape[1])
+        # argpartition is O(n) per row; only the k winners get sorted
+        idx = np.argpartition(proba, -k, axis=1)[:, -k:]
+        scores = np.take_along_axis(proba, idx, axis=1)
+        order = np.argsort(-scores, axis=1, kind='stable')
+        return (
+            np.take_along_axis(idx, order, axis=1),
+            np.take_along_axis(scores, order, axis=1)
+        )
+
+    def _format_result(self, crops: Sequence[str], scores: Sequence[float]) -> Dict:
+        """Build the prediction dictionary returned by predict()."""
+        top_3 = [
+            {
+                'crop': crop.capitalize(),
+                'score': float(conf),
+                'confidence_percent': float(conf * 100)
+            }
+            for crop, conf in zip(crops, scores)
+        ]
+
+        return {
+            'predicted_crop': top_3[0]['crop'],
+            'confidence_score': top_3[0]['score'],
+            'confidence_percent': top_3[0]['confidence_percent'],
+            'top_3_crops': top_3,
+            'num_total_crops': self.num_crops,
+            'all_crops_available': self.crops_list
+        }
+
+    def load(self) -> bool:
+        """
+        Load the model if it is not loaded yet.
+
+        Returns:
+            True if the trained model is loaded, False in mock mode
+        """
+        self._load_model()
+        return self.is_trained
+
+    def warmup(self) -> bool:
+        """
+        Load the model and run a dummy batch to prime allocators and caches.
+
+        Returns:
+            True if the trained model is loaded, False in mock mode
+        """
+        if not self.load():
+            return False
+
+        # Midpoint of each typical input range
+        dummy = np.array([[(low + high) / 2 for low, high in FEATURE_RANGES]])
+        self.predict_batch(dummy)
+        return True
+
     def _mock_prediction(self, features: Dict[str, float]) -> Dict:
         """
         Fallback mock prediction when model is not available.
@@ -268,10 +747,21 @@ def get_crop_predictor() -> CropPredictor:
     """
     global _predictor
     if _predictor is None:
-        _predictor = CropPredictor()
+        from .prediction_cache import build_prediction_cache
+        _predictor = CropPredictor(cache=build_prediction_cache())
     return _predictor
 
 
+def _reset_load_lock_after_fork():
+    # A load running in another thread at fork time (background warmup under
+    # gunicorn --preload) never releases the lock in the child
+    if _predictor is not None and not _predictor._model_loaded:
+        _predictor._load_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_load_lock_after_fork)
+
+
 def get_all_crops() -> List[str]:
     """
     Get list of all available crops.
@@ -0,0 +1,281 @@
+"""
+Soil Inference Executor
+=======================
+Runs soil classification on a small pool of dedicated threads instead of
+the request thread, with pinned torch intra-op / inter-op thread counts and
+a bounded queue.
+
+Without pinning, every WSGI worker's torch calls try to use every core and
+the workers oversubscribe the CPU. Size the pool so that
+(WSGI workers x WORKERS x INTRA_OP_THREADS) does not exceed the cores.
+When the queue is full, callers get InferenceQueueFull instead of piling up
+behind a saturated CPU. Configured through settings.SOIL_INFERENCE.
+
+Async (ASGI) views use arun(), which awaits the result without holding a
+thread while the request waits for a queue slot or for inference.
+"""
+
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+from asgiref.sync import sync_to_async
+
+logger = logging.getLogger(__name__)
+
+# How often arun() retries a full queue while waiting for a slot
+_ASYNC_RETRY_INTERVAL = 0.01
+
+_threads_lock = threading.Lock()
+_interop_configured = False
+
+
+class InferenceQueueFull(RuntimeError):
+    """Raised when the inference queue has no free slot within the submit timeout."""
+
+
+def configure_torch_threads(intra_op_threads: int = 0, inter_op_threads: int = 0):
+    """
+    Pin torch's thread pools for the calling thread / process.
+
+    intra-op threads apply per calling thread, so executor threads call this
+    on start. The inter-op pool can only be sized once per process, before
+    any inter-op work has run. 0 keeps torch's default.
+    """
+    global _interop_configured
+    if not intra_op_threads and not inter_op_threads:
+        return
+
+    import torch
+    if intra_op_threads:
+        torch.set_num_threads(int(intra_op_threads))
+
+    if inter_op_threads:
+        with _threads_lock:
+            if _interop_configured:
+                return
+            _interop_configured = True
+            try:
+                torch.set_interop_threads(int(inter_op_threads))
+            except RuntimeError as e:
+                logger.warning(f"[WARNING] Could not set torch inter-op threads: {e}")
+
+
+class InferenceExecutor:
+    """
+    Fixed pool of inference threads fed by a bounded queue.
+
+    run() has the same return value as calling fn directly, so callers can
+    switch between executor and inline execution with the ENABLED flag.
+    """
+
+    def __init__(
+        self,
+        name: str = 'inference',
+        enabled: bool = True,
+        workers: int = 1,
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 0,
+        max_queue: int = 16,
+        submit_timeout: float = 2.0
+    ):
+        self.name = name
+        self.enabled = enabled
+        self.workers = max(int(workers), 1)
+        self.intra_op_threads = int(intra_op_threads)
+        self.inter_op_threads = int(inter_op_threads)
+        self.max_queue = max(int(max_queue), 1)
+        self.submit_timeout = submit_timeout
+
+        self._queue: queue.Queue = queue.Queue(maxsize=self.max_queue)
+        self._threads: List[threading.Thread] = []
+        self._threads_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+        # Metrics
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._busy = 0
+        self._max_queue_depth = 0
+
+    def run(self, fn: Callable, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) on an inference thread and wait for it.
+
+        Returns:
+            fn's return value (exceptions raised by fn propagate)
+
+        Raises:
+            InferenceQueueFull: No queue slot freed up within submit_timeout
+        """
+        if not self.enabled:
+            return fn(*args, **kwargs)
+        return self.submit(fn, *args, **kwargs).result()
+
+    async def arun(self, fn: Callable, *args, **kwargs):
+        """
+        Async variant of run() for ASGI views.
+
+        A full queue is retried with asyncio.sleep() rather than a blocking
+        put(), so the event loop keeps serving other requests. Cancelling
+        the awaiting task (e.g. the client disconnected) drops the call if
+        it has not started yet.
+
+        Raises:
+            InferenceQueueFull: No queue slot freed up within submit_timeout
+        """
+        if not self.enabled:
+            return await sync_to_async(fn, thread_sensitive=False)(*args, **kwargs)
+
+        deadline = time.monotonic() + self.submit_timeout
+        while True:
+            try:
+                future = self._enqueue(fn, args, kwargs, block=False)
+                break
+            except queue.Full:
+                if time.monotonic() >= deadline:
+                    raise self._reject()
+                await asyncio.sleep(_ASYNC_RETRY_INTERVAL)
+        return await asyncio.wrap_future(future)
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Queue fn(*args, **kwargs) and return a Future for its result."""
+        try:
+            return self._enqueue(fn, args, kwargs, block=True)
+        except queue.Full:
+            raise self._reject()
+
+    def _enqueue(self, fn: Callable, args, kwargs, block: bool) -> Future:
+        """Put a call on the queue (raises queue.Full when there is no slot)."""
+        self._ensure_threads()
+
+        future: Future = Future()
+        self._queue.put((future, fn, args, kwargs), block, self.submit_timeout)
+
+        with self._lock:
+            self._submitted += 1
+            depth = self._queue.qsize()
+            if depth > self._max_queue_depth:
+                self._max_queue_depth = depth
+        return future
+
+    def _reject(self) -> InferenceQueueFull:
+        """Count a rejected call and build the error for it."""
+        with self._lock:
+            self._rejected += 1
+        return InferenceQueueFull(
+            f"{self.name} queue is full ({self.max_queue} pending requests)"
+        )
+
+    def _ensure_threads(self):
+        """Start the pool (again after a fork, e.g. gunicorn preload)."""
+        pid = os.getpid()
+        if self._threads_pid == pid and all(t.is_alive() for t in self._threads):
+            return
+
+        with self._lock:
+            if self._threads_pid == pid and all(t.is_alive() for t in self._threads):
+                return
+            if self._threads_pid != pid:
+                # Queue and threads inherited from the parent process are unusable
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._threads = []
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for i in range(len(self._threads), self.workers):
+                thread = threading.Thread(
+                    target=self._run,
+                    name=f'{self.name}-{i}',
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            self._threads_pid = pid
+
+    def _run(self):
+        """Worker loop: pin torch threads once, then execute queued calls."""
+        try:
+            configure_torch_threads(self.intra_op_threads, self.inter_op_threads)
+        except ImportError:
+            pass
+
+        while True:
+            future, fn, args, kwargs = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            with self._lock:
+                self._busy += 1
+            failed = False
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+                failed = True
+            finally:
+                with self._lock:
+                    self._busy -= 1
+                    if failed:
+                        self._failed += 1
+                    else:
+                        self._completed += 1
+
+    def get_metrics(self) -> Dict:
+        """Return pool configuration, queue depth and request counters."""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'workers': self.workers,
+                'intra_op_threads': self.intra_op_threads,
+                'inter_op_threads': self.inter_op_threads,
+                'max_queue': self.max_queue,
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self._max_queue_depth,
+                'busy_workers': self._busy,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+            }
+
+
+def get_soil_inference_config() -> Dict:
+    """settings.SOIL_INFERENCE with defaults."""
+    from django.conf import settings
+    config = {
+        'ENABLED': False,
+        'WORKERS': 1,
+        'INTRA_OP_THREADS': 0,
+        'INTER_OP_THREADS': 0,
+        'MAX_QUEUE': 16,
+        'SUBMIT_TIMEOUT': 2.0,
+    }
+    config.update(getattr(settings, 'SOIL_INFERENCE', {}))
+    return config
+
+
+# Singleton instance
+_soil_executor: Optional[InferenceExecutor] = None
+
+
+def get_soil_executor() -> InferenceExecutor:
+    """Get or create the soil inference executor singleton."""
+    global _soil_executor
+    if _soil_executor is None:
+        config = get_soil_inference_config()
+        _soil_executor = InferenceExecutor(
+            name='soil-inference',
+            enabled=config['ENABLED'],
+            workers=config['WORKERS'],
+            intra_op_threads=config['INTRA_OP_THREADS'],
+            inter_op_threads=config['INTER_OP_THREADS'],
+            max_queue=config['MAX_QUEUE'],
+            submit_timeout=config['SUBMIT_TIMEOUT']
+        )
+    return _soil_executor
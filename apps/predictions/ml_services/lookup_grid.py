@@ -0,0 +1,175 @@
+"""
+Precomputed Crop Recommendation Grid
+====================================
+Evaluates the crop model once over a regular grid spanning the typical
+input ranges and stores the top-3 crops for every grid point in a compact,
+memory-mapped table. Inputs inside the grid are answered by snapping to the
+nearest grid point; everything else goes to the live model.
+
+Built with `manage.py build_crop_grid`; served when
+settings.CROP_LOOKUP_GRID['ENABLED'] is True.
+"""
+
+import json
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# Bump when the on-disk layout changes
+FORMAT_VERSION = 1
+
+# Grid points evaluated per model call while building
+_BUILD_CHUNK = 65536
+
+
+class LookupGrid:
+    """
+    Top-k crop table over a regular N-dimensional grid.
+
+    Point i along feature f sits at lows[f] + i * steps[f]; the table is
+    stored in C order over (bins[0], ..., bins[-1]).
+    """
+
+    def __init__(
+        self,
+        lows: np.ndarray,
+        highs: np.ndarray,
+        bins: np.ndarray,
+        indices: np.ndarray,
+        scores: np.ndarray,
+        model_version: str,
+        stats: Optional[Dict] = None
+    ):
+        self.lows = np.asarray(lows, dtype=np.float64)
+        self.highs = np.asarray(highs, dtype=np.float64)
+        self.bins = np.asarray(bins, dtype=np.intp)
+        self.steps = (self.highs - self.lows) / (self.bins - 1)
+        self.indices = indices
+        self.scores = scores
+        self.model_version = model_version
+        self.top_k = indices.shape[1]
+        self.stats = stats or {}
+
+    @classmethod
+    def build(
+        cls,
+        predict_proba: Callable[[np.ndarray], np.ndarray],
+        ranges: Sequence[Tuple[float, float]],
+        bins: Sequence[int],
+        model_version: str,
+        top_k: int = 3,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> 'LookupGrid':
+        """
+        Evaluate a model over every grid point.
+
+        Args:
+            predict_proba: Maps an N x n_features raw input matrix to class
+                probabilities (e.g. CropPredictor._predict_proba)
+            ranges: (low, high) per feature
+            bins: Grid points per feature (>= 2, endpoints included)
+            model_version: Version of the model being tabulated
+            top_k: Number of crops stored per grid point
+            progress: Optional callback(done_points, total_points)
+        """
+        lows, highs = np.asarray(ranges, dtype=np.float64).T
+        bins = np.asarray(bins, dtype=np.intp)
+        if (bins < 2).any():
+            raise ValueError("Every feature needs at least 2 grid points")
+
+        steps = (highs - lows) / (bins - 1)
+        total = int(np.prod(bins))
+
+        indices = np.empty((total, top_k), dtype=np.uint8)
+        scores = np.empty((total, top_k), dtype=np.float16)
+
+        for start in range(0, total, _BUILD_CHUNK):
+            flat = np.arange(start, min(start + _BUILD_CHUNK, total))
+            coords = np.stack(np.unravel_index(flat, bins), axis=1)
+            X = lows + coords * steps
+
+            proba = predict_proba(X)
+            if proba.shape[1] > np.iinfo(np.uint8).max + 1:
+                raise ValueError("Lookup grid stores class indices as uint8 (max 256 classes)")
+            top_idx = np.argpartition(proba, -top_k, axis=1)[:, -top_k:]
+            top_scores = np.take_along_axis(proba, top_idx, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind='stable')
+
+            indices[flat] = np.take_along_axis(top_idx, order, axis=1)
+            scores[flat] = np.take_along_axis(top_scores, order, axis=1)
+
+            if progress:
+                progress(int(flat[-1]) + 1, total)
+
+        return cls(lows, highs, bins, indices, scores, model_version)
+
+    @property
+    def min_top1_agreement(self) -> Optional[float]:
+        """Lowest top-1 agreement with the live model in stats, or None if unmeasured."""
+        values = [s['top1_agreement'] for s in self.stats.values() if 'top1_agreement' in s]
+        return min(values) if values else None
+
+    def contains(self, X: np.ndarray) -> np.ndarray:
+        """Boolean mask of rows that fall inside the grid ranges."""
+        return ((X >= self.lows) & (X <= self.highs)).all(axis=1)
+
+    def lookup(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k class indices and scores of the nearest grid point.
+
+        Args:
+            X: N x n_features rows inside the grid (see contains())
+
+        Returns:
+            (indices, scores) of shape N x top_k
+        """
+        coords = np.rint((X - self.lows) / self.steps).astype(np.intp)
+        np.clip(coords, 0, self.bins - 1, out=coords)
+        flat = np.ravel_multi_index(coords.T, self.bins)
+        return (
+            self.indices[flat].astype(np.intp),
+            self.scores[flat].astype(np.float64)
+        )
+
+    def save(self, directory: Union[str, Path]):
+        """Write the table as raw .npy files plus grid.json."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        np.save(directory / 'indices.npy', self.indices, allow_pickle=False)
+        np.save(directory / 'scores.npy', self.scores, allow_pickle=False)
+
+        meta = {
+            'format_version': FORMAT_VERSION,
+            'model_version': self.model_version,
+            'lows': self.lows.tolist(),
+            'highs': self.highs.tolist(),
+            'bins': self.bins.tolist(),
+            'top_k': self.top_k,
+            'stats': self.stats,
+        }
+        with open(directory / 'grid.json', 'w') as f:
+            json.dump(meta, f, indent=2)
+
+    @classmethod
+    def load(cls, directory: Union[str, Path], mmap_mode: Optional[str] = 'r') -> 'LookupGrid':
+        """Load a grid written by save(), memory-mapped by default."""
+        directory = Path(directory)
+        with open(directory / 'grid.json') as f:
+            meta = json.load(f)
+        if meta['format_version'] != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported lookup grid format {meta['format_version']} "
+                f"(expected {FORMAT_VERSION})"
+            )
+
+        return cls(
+            lows=meta['lows'],
+            highs=meta['highs'],
+            bins=meta['bins'],
+            indices=np.load(directory / 'indices.npy', mmap_mode=mmap_mode),
+            scores=np.load(directory / 'scores.npy', mmap_mode=mmap_mode),
+            model_version=meta['model_version'],
+            stats=meta.get('stats')
+        )
@@ -0,0 +1,161 @@
+"""
+Crop Prediction Result Cache
+============================
+Bounded LRU/TTL cache of crop prediction results, keyed on the rounded
+7-feature input vector plus the loaded model version.
+
+Two backends:
+- 'local': in-process LRU (per worker)
+- 'django': Django's cache framework (shared across workers when CACHES
+  points at a shared backend such as Redis or Memcached)
+
+The model version is a fingerprint of the model artifact files, so results
+from older artifacts are never served once a worker loads new ones.
+
+CropPredictor scores the rounded features the key is built from, so a
+cached answer does not depend on which of several nearby inputs filled it.
+Both backends store pickled results and every lookup returns a fresh copy;
+callers may modify what they get back.
+"""
+
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+KEY_PREFIX = 'crop_prediction'
+
+
+class PredictionCache:
+    """LRU/TTL result cache with hit/miss counters."""
+
+    def __init__(
+        self,
+        backend: str = 'local',
+        max_size: int = 10000,
+        ttl: float = 3600,
+        round_decimals: int = 2,
+        cache_alias: str = 'default'
+    ):
+        if backend not in ('local', 'django'):
+            raise ValueError(f"Unknown prediction cache backend: {backend}")
+
+        self.backend = backend
+        self.max_size = max(int(max_size), 1)
+        self.ttl = ttl
+        self.round_decimals = int(round_decimals)
+        self.cache_alias = cache_alias
+
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def round_features(self, X: np.ndarray) -> np.ndarray:
+        """Round a feature matrix to the precision cache keys are built from."""
+        # + 0.0 turns -0.0 into 0.0 so both round to the same key
+        return np.round(X, self.round_decimals) + 0.0
+
+    def make_keys(self, X: np.ndarray, model_version: str, top_k: int = 3) -> List[str]:
+        """Build one cache key per row of an N x 7 feature matrix."""
+        decimals = self.round_decimals
+        rounded = self.round_features(X)
+        prefix = f"{KEY_PREFIX}:{model_version}:{top_k}:"
+        return [
+            prefix + ','.join(f'{value:.{decimals}f}' for value in row)
+            for row in rounded.tolist()
+        ]
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        """Return cached results for the keys that are present."""
+        keys = list(keys)
+        if self.backend == 'django':
+            found = self._django_cache().get_many(keys)
+        else:
+            found = self._local_get_many(keys)
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, results: Dict[str, Dict]):
+        """Store results keyed by make_keys() keys."""
+        if not results:
+            return
+        if self.backend == 'django':
+            self._django_cache().set_many(results, timeout=self.ttl)
+        else:
+            self._local_set_many(results)
+
+    def clear(self):
+        """Drop every cached result (local backend) and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self) -> Dict:
+        """Return hit/miss counters and cache configuration."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': self.backend,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+                'size': len(self._entries) if self.backend == 'local' else None,
+                'max_size': self.max_size if self.backend == 'local' else None,
+                'ttl': self.ttl,
+                'round_decimals': self.round_decimals,
+            }
+
+    def _django_cache(self):
+        from django.core.cache import caches
+        return caches[self.cache_alias]
+
+    def _local_get_many(self, keys: List[str]) -> Dict[str, Dict]:
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                expires_at, value = entry
+                if expires_at < now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = value
+        # Unpickling gives every caller its own copy (as the django backend does)
+        return {key: pickle.loads(value) for key, value in found.items()}
+
+    def _local_set_many(self, results: Dict[str, Dict]):
+        expires_at = time.monotonic() + self.ttl
+        pickled = {key: pickle.dumps(value, pickle.HIGHEST_PROTOCOL) for key, value in results.items()}
+        with self._lock:
+            for key, value in pickled.items():
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+def build_prediction_cache() -> Optional[PredictionCache]:
+    """Create the cache configured in settings.CROP_PREDICTION_CACHE, if enabled."""
+    from django.conf import settings
+    config = getattr(settings, 'CROP_PREDICTION_CACHE', {})
+    if not config.get('ENABLED', False):
+        return None
+
+    return PredictionCache(
+        backend=config.get('BACKEND', 'local'),
+        max_size=config.get('MAX_SIZE', 10000),
+        ttl=config.get('TTL', 3600),
+        round_decimals=config.get('ROUND_DECIMALS', 2),
+        cache_alias=config.get('CACHE_ALIAS', 'default')
+    )
@@ -4,16 +4,124 @@ This module handles soil classification using PyTorch ResNet18 CNN model.
 """
 
 import os
+import io
 import json
+import hashlib
+import itertools
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional
+from typing import BinaryIO, Dict, Iterable, List, Optional, Union
 from PIL import Image
 import numpy as np
 
+# Image path, encoded image bytes, binary file-like object or PIL image
+ImageSource = Union[str, os.PathLike, bytes, BinaryIO, Image.Image]
+
+# Frozen TorchScript export written by `manage.py export_soil_model`
+SCRIPTED_MODEL_FILENAME = 'model_scripted.pt'
+SCRIPTED_META_FILENAME = 'model_scripted.json'
+
+# Statically quantized INT8 model written by `manage.py quantize_soil_model`
+QUANTIZED_MODEL_FILENAME = 'model_int8.pt'
+QUANTIZED_META_FILENAME = 'model_int8.json'
+
 logger = logging.getLogger(__name__)
 
 
+def get_model_dir() -> Path:
+    """Directory holding model.pth and metadata.json (settings.SOIL_MODEL_PATH)."""
+    from django.conf import settings
+    model_dir = getattr(settings, 'SOIL_MODEL_PATH', 'ml_models/soil_classifier/v1.0')
+    return Path(settings.BASE_DIR) / model_dir
+
+
+def build_soil_model(num_classes: int = 4):
+    """Create the eager ResNet18 architecture (must match training)."""
+    from torchvision import models
+
+    model = models.resnet18(pretrained=False)
+    model.fc = build_soil_head(model.fc.in_features, num_classes)
+    return model
+
+
+def build_soil_head(num_features: int, num_classes: int = 4):
+    """Create the 3-layer classification head that replaces resnet.fc."""
+    import torch.nn as nn
+
+    return nn.Sequential(
+        nn.Linear(num_features, 512),
+        nn.ReLU(inplace=True),
+        nn.Dropout(0.5),
+        nn.Linear(512, 256),
+        nn.ReLU(inplace=True),
+        nn.Dropout(0.3),
+        nn.Linear(256, num_classes)
+    )
+
+
+def build_soil_transform(img_size: int = 224):
+    """Create the preprocessing transform (must match training)."""
+    from torchvision import transforms
+
+    return transforms.Compose([
+        transforms.Resize((img_size, img_size)),
+        transforms.ToTensor(),
+        transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+    ])
+
+
+# ImageNet normalization used in training
+_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+
+def preprocess_array(img: Image.Image, img_size: int = 224) -> np.ndarray:
+    """
+    Single-pass equivalent of build_soil_transform() without torchvision.
+
+    Resizes once with the same antialiased bilinear filter as
+    transforms.Resize and folds ToTensor's 1/255 and Normalize into one
+    multiply-add on a float32 view of the resized pixels.
+
+    Returns:
+        img_size x img_size x 3 float32 array (HWC; permute for torch)
+    """
+    if img.size != (img_size, img_size):
+        img = img.resize((img_size, img_size), Image.BILINEAR)
+    arr = np.asarray(img, dtype=np.float32)
+    arr *= 1.0 / (255.0 * _STD)
+    arr -= _MEAN / _STD
+    return arr
+
+
+def load_scripted_model(path: Path, device=None, optimize: bool = False):
+    """
+    Load a TorchScript export in eval mode.
+
+    torch.jit.optimize_for_inference rewrites convolutions into prepacked
+    CPU ops that do not survive a save/load round trip, so exports store
+    the frozen graph and the optimization is applied here, once per process.
+    """
+    import torch
+
+    model = torch.jit.load(str(path), map_location=device)
+    model.eval()
+    if optimize:
+        model = torch.jit.optimize_for_inference(model)
+    return model
+
+
+def file_sha256(path: Path) -> str:
+    """Hex SHA-256 of a file, used to tie exports to their source weights."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
 class SoilClassifier:
     """Service class for soil classification using PyTorch ResNet18."""
 
@@ -31,6 +139,10 @@ class SoilClassifier:
         self.transform = None
         self.is_trained = False
         self.metadata = None
+        self.backend = None
+        self.quantization = None
+        self.img_size = 224
+        self.fast_preprocess = False
         self.class_names = ['black', 'clay', 'loamy', 'sandy']
 
         # Try to load model
@@ -44,17 +156,24 @@ class SoilClassifier:
         """Load the PyTorch model and metadata."""
         # Lazy imports - only import when needed
         import torch
-        from torchvision import models, transforms
-        import torch.nn as nn
-
-        # Get model path from settings or use default
         from django.conf import settings
-        model_dir = getattr(settings, 'SOIL_MODEL_PATH', 'ml_models/soil_classifier/v1.0')
+        from .inference_executor import configure_torch_threads, get_soil_inference_config
+
+        # Pin torch thread pools before the first torch op (inter-op can only
+        # be sized once per process)
+        inference_config = get_soil_inference_config()
+        configure_torch_threads(
+            inference_config['INTRA_OP_THREADS'], inference_config['INTER_OP_THREADS']
+        )
+
+        backend = getattr(settings, 'SOIL_MODEL_BACKEND', 'auto')
+        if backend not in ('auto', 'torchscript', 'eager', 'int8'):
+            raise ValueError(f"Unknown SOIL_MODEL_BACKEND: {backend}")
 
         # Build paths
-        base_dir = Path(settings.BASE_DIR)
-        model_path = base_dir / model_dir / 'model.pth'
-        metadata_path = base_dir / model_dir / 'metadata.json'
+        model_dir = get_model_dir()
+        model_path = model_dir / 'model.pth'
+        metadata_path = model_dir / 'metadata.json'
 
         # Check if files exist
         if not model_path.exists():
@@ -71,89 +190,322 @@ class SoilClassifier:
         # Set device
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 
-        # Create model architecture (must match training)
-        model = models.resnet18(pretrained=False)
-        num_features = model.fc.in_features
-        model.fc = nn.Sequential(
-            nn.Linear(num_features, 512),
-            nn.ReLU(inplace=True),
-            nn.Dropout(0.5),
-            nn.Linear(512, 256),
-            nn.ReLU(inplace=True),
-            nn.Dropout(0.3),
-            nn.Linear(256, 4)  # 4 soil classes
-        )
-
-        # Load trained weights
-        state_dict = torch.load(model_path, map_location=self.device)
-        model.load_state_dict(state_dict)
-        model.to(self.device)
-        model.eval()
+        model = None
+        if backend == 'int8':
+            model = self._load_quantized(model_dir, model_path)
+            self.backend = 'int8'
+        elif backend != 'eager':
+            model = self._load_scripted(model_dir, model_path, backend)
+            self.backend = 'torchscript'
+
+        if model is None:
+            # Create model architecture and load trained weights
+            model = build_soil_model(num_classes=len(self.class_names))
+            state_dict = torch.load(model_path, map_location=self.device)
+            model.load_state_dict(state_dict)
+            model.to(self.device)
+            model.eval()
+            self.backend = 'eager'
 
         self.model = model
-
-        # Define transforms (must match training)
-        self.transform = transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
-        ])
+        self.img_size = self.metadata.get('img_size', 224)
+        self.transform = build_soil_transform(self.img_size)
+        self.fast_preprocess = getattr(settings, 'SOIL_FAST_PREPROCESS', False)
 
         self.is_trained = True
         val_acc = self.metadata.get('val_accuracy', 0)
         logger.info(f"[SUCCESS] Soil classifier loaded! Validation accuracy: {val_acc:.2f}%")
 
-    def classify(self, image_path: str) -> Dict:
+    @staticmethod
+    def _check_export(export_path: Path, meta_path: Path, model_path: Path):
+        """
+        Read an export's metadata and check it was made from model_path.
+
+        Returns:
+            (problem, meta): problem is None when the export is usable
+        """
+        if not export_path.exists() or not meta_path.exists():
+            return f"{export_path.name} not found in {export_path.parent}", None
+
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if meta.get('source_sha256') != file_sha256(model_path):
+            return f"{export_path.name} was exported from a different model.pth", meta
+        return None, meta
+
+    def _load_scripted(self, model_dir: Path, model_path: Path, backend: str):
+        """
+        Load the frozen TorchScript export if settings select it.
+
+        SOIL_MODEL_BACKEND 'auto' uses the export when it exists, was made
+        from the current model.pth and the model runs on CPU; 'torchscript'
+        requires it.
+
+        Returns:
+            The loaded ScriptModule, or None to use the eager model
+        """
+        import torch
+
+        scripted_path = model_dir / SCRIPTED_MODEL_FILENAME
+        problem, meta = self._check_export(
+            scripted_path, model_dir / SCRIPTED_META_FILENAME, model_path
+        )
+        if problem is None and self.device.type != 'cpu':
+            problem = "TorchScript export is optimized for CPU inference"
+
+        if problem:
+            if backend == 'torchscript':
+                raise RuntimeError(f"{problem} (run: python manage.py export_soil_model)")
+            logger.info(f"[INFO] {problem}, using eager model")
+            return None
+
+        logger.info(f"[INFO] Loading TorchScript soil model from {scripted_path}")
+        return load_scripted_model(
+            scripted_path, self.device, optimize=meta.get('optimize_on_load', False)
+        )
+
+    def _load_quantized(self, model_dir: Path, model_path: Path):
+        """
+        Load the INT8 model selected with SOIL_MODEL_BACKEND='int8'.
+
+        Quantized kernels are CPU-only, so the classifier switches to CPU.
+        The export's metadata (accuracy vs FP32) is kept in
+        self.quantization for get_model_info().
+        """
+        import torch
+
+        quantized_path = model_dir / QUANTIZED_MODEL_FILENAME
+        problem, meta = self._check_export(
+            quantized_path, model_dir / QUANTIZED_META_FILENAME, model_path
+        )
+        if problem:
+            raise RuntimeError(f"{problem} (run: python manage.py quantize_soil_model)")
+
+        engine = meta.get('engine', 'fbgemm')
+        if engine not in torch.backends.quantized.supported_engines:
+            raise RuntimeError(f"Quantized engine '{engine}' is not supported on this CPU")
+        torch.backends.quantized.engine = engine
+
+        self.device = torch.device('cpu')
+        self.quantization = meta
+
+        logger.info(f"[INFO] Loading INT8 soil model from {quantized_path} ({engine})")
+        return load_scripted_model(quantized_path, self.device)
+
+    def classify(self, image: ImageSource) -> Dict:
         """
         Classify soil type from image.
 
         Args:
-            image_path: Path to the soil image
+            image: Path to the soil image, encoded image bytes, a binary
+                file-like object (e.g. a Django UploadedFile) or a PIL image
 
         Returns:
             Dictionary with soil_type, confidence_score, and all_predictions
         """
+        self._check_loaded()
+
+        # Load and preprocess image
+        img_tensor = self._load_tensor(image)
+
+        # Make prediction
+        probabilities = self._predict_tensors(img_tensor.unsqueeze(0))[0]
+        result = self._format_result(probabilities)
+
+        logger.info(
+            f"[PREDICTION] Soil type: {result['soil_type']} "
+            f"({result['confidence_score']*100:.2f}%)"
+        )
+        return result
+
+    def classify_batch(
+        self,
+        sources: Iterable[ImageSource],
+        chunk_size: Optional[int] = None,
+        decode_workers: Optional[int] = None
+    ) -> Dict:
+        """
+        Classify many soil images with batched forward passes.
+
+        Images are taken chunk_size at a time: each chunk is decoded and
+        preprocessed in parallel threads, stacked into one tensor and run
+        through the model before the next chunk is read, so memory stays
+        proportional to chunk_size rather than to the number of images.
+
+        Args:
+            sources: Image paths, encoded bytes, file-like objects or PIL
+                images (any iterable, e.g. a generator over a directory)
+            chunk_size: Images per forward pass (default: settings)
+            decode_workers: Decoding threads (default: settings)
+
+        Returns:
+            Dictionary with:
+                - results: One entry per input, in input order. Same keys
+                  as classify(), or {'error': message} if the image could
+                  not be decoded.
+                - count: Number of images classified successfully
+                - seconds: Total wall time
+                - images_per_sec: Throughput over the whole call
+        """
+        self._check_loaded()
+        import torch
+
+        config = self._get_batch_config()
+        chunk_size = max(int(chunk_size or config['CHUNK_SIZE']), 1)
+        decode_workers = max(int(decode_workers or config['DECODE_WORKERS']), 1)
+
+        start = time.perf_counter()
+
+        def _decode(source):
+            try:
+                return self._load_tensor(source)
+            except ValueError as e:
+                return e
+
+        results: List[Dict] = []
+        count = 0
+        sources = iter(sources)
+
+        # PIL releases the GIL while decoding, so threads decode in parallel
+        with ThreadPoolExecutor(max_workers=decode_workers) as executor:
+            while True:
+                chunk = list(itertools.islice(sources, chunk_size))
+                if not chunk:
+                    break
+                decoded = list(executor.map(_decode, chunk))
+                valid = [t for t in decoded if not isinstance(t, Exception)]
+                rows = iter(self._predict_tensors(torch.stack(valid)) if valid else [])
+                for item in decoded:
+                    if isinstance(item, Exception):
+                        results.append({'error': str(item)})
+                    else:
+                        results.append(self._format_result(next(rows)))
+                count += len(valid)
+
+        seconds = time.perf_counter() - start
+        images_per_sec = count / seconds if seconds > 0 else 0.0
+        logger.info(
+            f"[PREDICTION] Classified {count}/{len(results)} soil images "
+            f"in {seconds:.2f}s ({images_per_sec:.1f} images/sec)"
+        )
+
+        return {
+            'results': results,
+            'count': count,
+            'seconds': seconds,
+            'images_per_sec': images_per_sec,
+        }
+
+    def _check_loaded(self):
+        """Raise if the model is not available."""
         if not self.is_trained:
             raise RuntimeError(
                 "Soil classification model not loaded. "
                 "Please ensure model files exist at ml_models/soil_classifier/v1.0/"
             )
 
-        # Load and preprocess image
+    @staticmethod
+    def _get_batch_config() -> Dict:
+        """Batch classification settings with defaults."""
+        from django.conf import settings
+        config = {'CHUNK_SIZE': 16, 'DECODE_WORKERS': 4}
+        config.update(getattr(settings, 'SOIL_BATCH_CLASSIFICATION', {}))
+        return config
+
+    @staticmethod
+    def _open_image(source: ImageSource, draft_size: Optional[int] = None) -> Image.Image:
+        """
+        Decode any supported image source into an RGB PIL image.
+
+        File-like objects are decoded in place (no copy, no temp file) and
+        rewound afterwards so the caller can still save them.
+
+        Args:
+            source: Path, encoded bytes, file-like object or PIL image
+            draft_size: If set, JPEGs are decoded at the smallest DCT scale
+                (1/2, 1/4 or 1/8) that still covers draft_size x draft_size
+        """
         try:
-            img = Image.open(image_path).convert('RGB')
+            if isinstance(source, Image.Image):
+                return source if source.mode == 'RGB' else source.convert('RGB')
+
+            if isinstance(source, (bytes, bytearray, memoryview)):
+                # BytesIO shares an immutable bytes buffer instead of copying it
+                source = io.BytesIO(source)
+
+            rewind = hasattr(source, 'read') and hasattr(source, 'seek')
+            if rewind:
+                source.seek(0)
+            try:
+                img = Image.open(source)
+                if draft_size and img.format == 'JPEG':
+                    img.draft('RGB', (draft_size, draft_size))
+                img.load()
+                return img if img.mode == 'RGB' else img.convert('RGB')
+            finally:
+                if rewind:
+                    source.seek(0)
         except Exception as e:
             raise ValueError(f"Error loading image: {str(e)}")
 
-        # Preprocess
-        img_tensor = self.transform(img).unsqueeze(0).to(self.device)
+    def _load_tensor(self, source: ImageSource):
+        """Decode and preprocess one image source into a 3 x H x W tensor."""
+        if self.fast_preprocess:
+            return self._preprocess_fast(self._open_image(source, draft_size=self.img_size))
+        return self._preprocess(self._open_image(source))
 
-        # Make prediction
+    def _preprocess(self, img: Image.Image):
+        """Resize and normalize a PIL image into a 3 x 224 x 224 tensor."""
+        return self.transform(img)
+
+    def _preprocess_fast(self, img: Image.Image):
+        """preprocess_array() as a 3 x H x W tensor view (no extra copy)."""
+        import torch
+        return torch.from_numpy(preprocess_array(img, self.img_size)).permute(2, 0, 1)
+
+    def _predict_tensors(self, batch) -> np.ndarray:
+        """Run the model on an N x 3 x 224 x 224 tensor, return N x 4 probabilities."""
         import torch
         with torch.no_grad():
-            outputs = self.model(img_tensor)
-            probabilities = torch.softmax(outputs, dim=1)[0]
-            predicted_idx = torch.argmax(probabilities).item()
-            confidence = probabilities[predicted_idx].item()
+            outputs = self.model(batch.to(self.device))
+            probabilities = torch.softmax(outputs, dim=1)
+        return probabilities.cpu().numpy()
 
-        # Get predicted soil type
+    def _format_result(self, probabilities: np.ndarray) -> Dict:
+        """Build the classify() result dictionary from one probability row."""
+        predicted_idx = int(np.argmax(probabilities))
         predicted_soil = self.class_names[predicted_idx]
 
         # Create predictions dictionary
         all_predictions = {
-            soil: float(probabilities[i].item())
+            soil: float(probabilities[i])
             for i, soil in enumerate(self.class_names)
         }
 
-        logger.info(f"[PREDICTION] Soil type: {predicted_soil} ({confidence*100:.2f}%)")
-
         return {
             'soil_type': predicted_soil,
-            'confidence_score': confidence,
+            'confidence_score': float(probabilities[predicted_idx]),
             'all_predictions': all_predictions,
             'soil_type_label': self.SOIL_TYPES[predicted_soil]
         }
 
+    def warmup(self) -> bool:
+        """
+        Run a dummy forward pass to prime allocators and kernels.
+
+        Returns:
+            True if the model is loaded and warmed up
+        """
+        if not self.is_trained:
+            return False
+
+        import torch
+        dummy = torch.zeros(1, 3, self.img_size, self.img_size, device=self.device)
+        with torch.no_grad():
+            self.model(dummy)
+        logger.info("[INFO] Soil classifier warmed up")
+        return True
+
     def get_model_info(self) -> Dict:
         """Get information about the loaded model."""
         if not self.is_trained:
@@ -169,7 +521,9 @@ class SoilClassifier:
             'training_date': self.metadata.get('training_date', 'Unknown'),
             'num_classes': len(self.class_names),
             'classes': self.class_names,
-            'device': str(self.device)
+            'device': str(self.device),
+            'backend': self.backend,
+            'quantization': self.quantization
         }
 
 
@@ -0,0 +1,109 @@
+"""
+Model Warmup
+============
+Loads the crop predictor and soil classifier at process start and runs a
+dummy inference through each, so the first real request after a deploy or
+worker restart does not pay for model loading.
+
+Enabled with ML_WARMUP['ENABLED'] and started once per serving process
+(apps/core/serving.py: gunicorn's post_worker_init hook, else the first
+request), never in a --preload master. Readiness is reported by
+/predictions/health/ready/; with warmup disabled the process is ready at
+once (models load on first use).
+"""
+
+import logging
+import threading
+import time
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_state = {
+    'started': False,
+    'finished': False,
+    'models': {},
+}
+
+
+def get_warmup_config() -> Dict:
+    """settings.ML_WARMUP with defaults."""
+    from django.conf import settings
+    config = {'ENABLED': False, 'BACKGROUND': False}
+    config.update(getattr(settings, 'ML_WARMUP', {}))
+    return config
+
+
+def _warm(name: str, warm_fn) -> Dict:
+    """Run one model's warmup and record its outcome."""
+    start = time.perf_counter()
+    try:
+        loaded = warm_fn()
+        status = 'warm' if loaded else 'unavailable'
+        error = None
+    except Exception as e:
+        logger.error(f"[ERROR] Warmup of {name} failed: {e}")
+        status = 'error'
+        error = str(e)
+
+    result = {
+        'status': status,
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+    if error:
+        result['error'] = error
+    logger.info(f"[INFO] Warmup {name}: {status} in {result['seconds']}s")
+    return result
+
+
+def warmup_models():
+    """Load and warm both models (safe to call more than once)."""
+    with _lock:
+        if _state['started']:
+            return
+        _state['started'] = True
+
+    from .crop_predictor import get_crop_predictor
+    from .soil_classifier import get_soil_classifier
+
+    _state['models']['crop_predictor'] = _warm(
+        'crop_predictor', lambda: get_crop_predictor().warmup()
+    )
+    _state['models']['soil_classifier'] = _warm(
+        'soil_classifier', lambda: get_soil_classifier().warmup()
+    )
+    _state['finished'] = True
+
+
+def start_warmup(background: bool = False):
+    """Run warmup_models() inline or in a daemon thread."""
+    if background:
+        threading.Thread(target=warmup_models, name='ml-warmup', daemon=True).start()
+    else:
+        warmup_models()
+
+
+def get_readiness() -> Dict:
+    """
+    Report whether the process is ready to serve.
+
+    Without warmup the process is always ready. With warmup enabled (or
+    running), it is ready once warmup has completed; models that are
+    missing on disk ('unavailable') do not block readiness, since the
+    services fall back to their non-ML behaviour.
+    """
+    enabled = get_warmup_config()['ENABLED']
+    if not (enabled or _state['started']):
+        ready = True
+    else:
+        ready = _state['finished'] and all(
+            m['status'] in ('warm', 'unavailable') for m in _state['models'].values()
+        )
+    return {
+        'ready': ready,
+        'warmup_enabled': enabled,
+        'warmup_started': _state['started'],
+        'models': dict(_state['models']),
+    }
+
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from config.supabase_storage import SoilImageStorage
 
@@ -64,6 +65,18 @@ class SoilClassification(models.Model):
         ('sandy', 'Sandy Soil'),
     ]
 
+    # Classification job status (results are only set once COMPLETED)
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -77,20 +90,70 @@ class SoilClassification(models.Model):
     )
 
     # Results
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_COMPLETED,
+        db_index=True,
+        verbose_name=_('Status')
+    )
     soil_type = models.CharField(
         max_length=20,
         choices=SOIL_TYPES,
+        blank=True,
         verbose_name=_('Soil Type')
     )
-    confidence_score = models.FloatField(verbose_name=_('Confidence Score'))
+    confidence_score = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name=_('Confidence Score')
+    )
     all_predictions = models.JSONField(
         default=dict,
         blank=True,
         verbose_name=_('All Predictions')
     )
+    error_message = models.TextField(
+        blank=True,
+        verbose_name=_('Error Message')
+    )
+    # Failed job attempts; retried with backoff until SOIL_ASYNC_JOBS MAX_ATTEMPTS
+    attempts = models.PositiveIntegerField(default=0, verbose_name=_('Attempts'))
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        db_index=True,
+        verbose_name=_('Next Attempt')
+    )
+
+    # Image hashes for duplicate detection (apps/predictions/soil_dedup.py)
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        verbose_name=_('Content Hash (SHA-256)')
+    )
+    perceptual_hash = models.CharField(
+        max_length=16,
+        blank=True,
+        db_index=True,
+        verbose_name=_('Perceptual Hash')
+    )
+    color_signature = models.CharField(
+        max_length=24,
+        blank=True,
+        verbose_name=_('Color Signature')
+    )
+
+    # Resized copies of soil_image, {"<size>": name} (apps/predictions/soil_derivatives.py)
+    image_derivatives = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name=_('Image Derivatives')
+    )
 
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     location = models.CharField(
         max_length=200,
         blank=True,
@@ -104,7 +167,17 @@ class SoilClassification(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"{self.user.username} - {self.get_soil_type_display()} ({self.created_at.strftime('%Y-%m-%d')})"
+        result = self.get_soil_type_display() if self.is_completed else self.get_status_display()
+        return f"{self.user.username} - {result} ({self.created_at.strftime('%Y-%m-%d')})"
+
+    @property
+    def is_completed(self):
+        return self.status == self.STATUS_COMPLETED
+
+    @property
+    def is_finished(self):
+        """True once the job has completed or failed."""
+        return self.status in (self.STATUS_COMPLETED, self.STATUS_FAILED)
 
 
 class FertilizerRecommendation(models.Model):
@@ -0,0 +1,372 @@
+"""
+Soil Image Duplicate Detection
+==============================
+Users often re-upload the same soil photo, or re-compressed copies of it.
+Every classified upload stores two indexed hashes on SoilClassification:
+
+- content_hash: SHA-256 of the file bytes (byte-identical re-uploads)
+- perceptual_hash: 64-bit difference hash (dHash) of a 9x8 grayscale
+  thumbnail, as 16 hex digits; survives re-compression and resizing
+
+plus color_signature, the mean RGB of each quadrant (12 bytes as 24 hex
+digits). dHash only sees brightness gradients, so two photos of the same
+layout in different soil colours can share it; colour is what tells many
+soil types apart.
+
+A new upload that matches a completed classification of the same user
+reuses its soil_type / all_predictions without running ResNet18.
+Byte-identical uploads also reuse the stored file instead of uploading it
+again. Other users' classifications are never matched, so neither their
+files nor their results are shared.
+
+Matching order: exact content hash, then exact perceptual hash (both
+indexed lookups), then - if MAX_DISTANCE > 0 - the nearest perceptual hash
+within MAX_DISTANCE bits, found with an in-process index over the hash
+columns. Perceptual matches also need every colour channel within
+MAX_COLOR_DIFF; rows without a color_signature only match byte-identical
+uploads. Configured through settings.SOIL_DEDUP.
+"""
+
+import hashlib
+import io
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import BinaryIO, Dict, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from .models import SoilClassification
+
+logger = logging.getLogger(__name__)
+
+# dHash thumbnail: 9 columns give 8 horizontal gradients per row, 8 rows
+_DHASH_SIZE = (9, 8)
+
+# Colour signature: mean RGB over a 2x2 grid
+_COLOR_GRID = (2, 2)
+_COLOR_VALUES = _COLOR_GRID[0] * _COLOR_GRID[1] * 3
+
+# Index entry of a row without a color_signature; never within MAX_COLOR_DIFF
+_NO_COLOR = -1024
+
+# Rows with an identical perceptual hash checked for a colour match
+_MAX_SAME_HASH_ROWS = 20
+
+# Bits set in every byte value, for Hamming distances over uint64 arrays
+_POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+# Incremental index refreshes re-read rows updated this long before the last
+# refresh, so rows whose transaction committed late are not missed
+_REFRESH_OVERLAP = timedelta(seconds=60)
+
+# Full index rebuild interval; drops deleted rows and anything else missed
+_REBUILD_INTERVAL = timedelta(minutes=10)
+
+# Index matches that turn out to be gone from the database before giving up
+_MAX_STALE_MATCHES = 5
+
+
+class SoilDuplicate(NamedTuple):
+    """A completed classification matching a new upload."""
+    classification: SoilClassification
+    distance: int
+    exact: bool
+
+    @property
+    def result(self) -> Dict:
+        """classify()-style result of the matched classification."""
+        return {
+            'soil_type': self.classification.soil_type,
+            'confidence_score': self.classification.confidence_score,
+            'all_predictions': self.classification.all_predictions,
+        }
+
+
+def get_dedup_config() -> Dict:
+    """settings.SOIL_DEDUP with defaults."""
+    from django.conf import settings
+    config = {
+        'ENABLED': False,
+        'MAX_DISTANCE': 4,
+        'MAX_COLOR_DIFF': 16,
+        'REUSE_FILES': True,
+    }
+    config.update(getattr(settings, 'SOIL_DEDUP', {}))
+    return config
+
+
+def compute_image_hashes(source: Union[bytes, BinaryIO]) -> Tuple[str, str, str]:
+    """
+    Hash an uploaded image.
+
+    File-like objects are read in chunks and rewound, so the upload can
+    still be classified and saved afterwards.
+
+    Returns:
+        (content_hash, perceptual_hash, color_signature) hex strings
+    """
+    digest = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+    else:
+        source.seek(0)
+        for block in iter(lambda: source.read(1 << 20), b''):
+            digest.update(block)
+        source.seek(0)
+
+    return (digest.hexdigest(), *perceptual_signatures(source))
+
+
+def perceptual_signatures(source: Union[str, bytes, BinaryIO]) -> Tuple[str, str]:
+    """
+    64-bit dHash (16 hex digits) and colour signature (24 hex digits) of an
+    image, from one decode.
+    """
+    try:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        rewind = hasattr(source, 'seek')
+        try:
+            img = Image.open(source)
+            # Decode JPEGs at 1/8 scale; both signatures only need thumbnails
+            if img.format == 'JPEG':
+                img.draft('RGB', (64, 64))
+            img = img.convert('RGB')
+            gray = img.convert('L').resize(_DHASH_SIZE, Image.BILINEAR)
+            color = img.resize(_COLOR_GRID, Image.BOX)
+        finally:
+            if rewind:
+                source.seek(0)
+    except Exception as e:
+        raise ValueError(f"Error loading image: {str(e)}")
+
+    pixels = np.asarray(gray, dtype=np.int16)
+    bits = (pixels[:, :-1] > pixels[:, 1:]).ravel()
+    return f'{int(np.packbits(bits).view(">u8")[0]):016x}', np.asarray(color, dtype=np.uint8).tobytes().hex()
+
+
+def _color_values(signature: str) -> np.ndarray:
+    """Colour signature as int16 values (all _NO_COLOR if missing or malformed)."""
+    try:
+        values = np.frombuffer(bytes.fromhex(signature), dtype=np.uint8)
+    except ValueError:
+        values = np.empty(0, dtype=np.uint8)
+    if len(values) != _COLOR_VALUES:
+        return np.full(_COLOR_VALUES, _NO_COLOR, dtype=np.int16)
+    return values.astype(np.int16)
+
+
+def color_difference(a: str, b: str) -> int:
+    """Largest per-channel difference between two colour signatures."""
+    return int(np.abs(_color_values(a) - _color_values(b)).max())
+
+
+def hamming_distances(hashes: np.ndarray, target: int) -> np.ndarray:
+    """Bit differences between every uint64 in hashes and target."""
+    xor = np.bitwise_xor(hashes, np.uint64(target))
+    return _POPCOUNT8[xor.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+class PerceptualHashIndex:
+    """
+    In-process copy of (pk, user, perceptual_hash, color_signature) for
+    completed classifications, sorted by pk. 48 bytes per row.
+
+    Refreshed incrementally from rows updated since shortly before the last
+    refresh (_REFRESH_OVERLAP), so results written by other worker processes
+    are picked up on the next lookup. A row saved again replaces its entry,
+    or drops it if it is no longer completed. Deleted rows are dropped when
+    a lookup finds them gone (discard()) and by the full rebuild every
+    _REBUILD_INTERVAL.
+    """
+
+    def __init__(self):
+        self._pks = np.empty(0, dtype=np.int64)
+        self._users = np.empty(0, dtype=np.int64)
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._colors = np.empty((0, _COLOR_VALUES), dtype=np.int16)
+        self._refreshed_at: Optional[datetime] = None
+        self._rebuilt_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Load hashes of classifications changed since the last refresh."""
+        from django.utils import timezone
+
+        now = timezone.now()
+        rows = SoilClassification.objects.all()
+        rebuild = self._rebuilt_at is None or now - self._rebuilt_at >= _REBUILD_INTERVAL
+        if rebuild:
+            rows = rows.filter(status=SoilClassification.STATUS_COMPLETED).exclude(perceptual_hash='')
+        else:
+            rows = rows.filter(updated_at__gte=self._refreshed_at - _REFRESH_OVERLAP)
+
+        changed = list(rows.values_list('pk', 'user_id', 'status', 'perceptual_hash', 'color_signature'))
+        indexed = [
+            (pk, user_id, int(phash, 16), _color_values(color))
+            for pk, user_id, status, phash, color in changed
+            if status == SoilClassification.STATUS_COMPLETED and phash
+        ]
+        if rebuild:
+            self._set(indexed)
+            self._rebuilt_at = now
+        else:
+            # Rows that stopped being matchable (re-queued, hash cleared)
+            self._remove(np.asarray([row[0] for row in changed], dtype=np.int64))
+            self._add(indexed)
+        self._refreshed_at = now
+
+    def discard(self, pk: int):
+        """Drop a row found missing from the database."""
+        with self._lock:
+            self._remove(np.asarray([pk], dtype=np.int64))
+
+    def _set(self, rows):
+        """Replace the whole index with rows of (pk, user_id, hash, colors)."""
+        rows = sorted(rows, key=lambda row: row[0])
+        self._pks = np.asarray([row[0] for row in rows], dtype=np.int64)
+        self._users = np.asarray([row[1] for row in rows], dtype=np.int64)
+        self._hashes = np.asarray([row[2] for row in rows], dtype=np.uint64)
+        self._colors = (
+            np.stack([row[3] for row in rows]) if rows
+            else np.empty((0, _COLOR_VALUES), dtype=np.int16)
+        )
+
+    def _remove(self, pks: np.ndarray):
+        """Drop the entries of pks (unknown pks are ignored)."""
+        keep = ~np.isin(self._pks, pks)
+        if not keep.all():
+            self._pks = self._pks[keep]
+            self._users = self._users[keep]
+            self._hashes = self._hashes[keep]
+            self._colors = self._colors[keep]
+
+    def _add(self, rows):
+        """Insert rows of (pk, user_id, hash, colors) whose pks are not indexed."""
+        if not rows:
+            return
+        self._pks = np.concatenate([self._pks, np.asarray([row[0] for row in rows], dtype=np.int64)])
+        self._users = np.concatenate([self._users, np.asarray([row[1] for row in rows], dtype=np.int64)])
+        self._hashes = np.concatenate([self._hashes, np.asarray([row[2] for row in rows], dtype=np.uint64)])
+        self._colors = np.concatenate([self._colors, np.stack([row[3] for row in rows])])
+        # New rows usually have the highest pks; re-sort only when not
+        if len(self._pks) > 1 and (np.diff(self._pks) < 0).any():
+            order = np.argsort(self._pks, kind='stable')
+            self._pks = self._pks[order]
+            self._users = self._users[order]
+            self._hashes = self._hashes[order]
+            self._colors = self._colors[order]
+
+    def nearest(
+        self,
+        user_id: int,
+        phash: str,
+        color_signature: str,
+        max_distance: int,
+        max_color_diff: int
+    ) -> Optional[Tuple[int, int]]:
+        """
+        Closest indexed classification of user_id within max_distance bits
+        whose colours are all within max_color_diff.
+
+        Returns:
+            (pk, distance), or None if nothing is close enough
+        """
+        with self._lock:
+            self.refresh()
+            if not len(self._hashes):
+                return None
+            distances = hamming_distances(self._hashes, int(phash, 16))
+            color_diffs = np.abs(self._colors - _color_values(color_signature)).max(axis=1)
+            candidates = np.flatnonzero(
+                (self._users == user_id) & (distances <= max_distance) & (color_diffs <= max_color_diff)
+            )
+            if not len(candidates):
+                return None
+            best = int(candidates[np.argmin(distances[candidates])])
+            return int(self._pks[best]), int(distances[best])
+
+    def __len__(self):
+        return len(self._hashes)
+
+
+def find_duplicate(
+    user_id: int,
+    content_hash: str,
+    phash: str,
+    color_signature: str,
+    max_distance: Optional[int] = None,
+    max_color_diff: Optional[int] = None
+) -> Optional[SoilDuplicate]:
+    """
+    Find a completed classification of the same (or a near-identical) image
+    uploaded by the same user.
+
+    Args:
+        user_id: Uploading user; only their classifications are matched
+        content_hash: SHA-256 of the upload
+        phash: Perceptual hash of the upload
+        color_signature: Colour signature of the upload
+        max_distance: Max differing dHash bits (default: settings)
+        max_color_diff: Max per-channel colour difference (default: settings)
+
+    Returns:
+        SoilDuplicate, or None if the image has to be classified
+    """
+    config = get_dedup_config()
+    if max_distance is None:
+        max_distance = int(config['MAX_DISTANCE'])
+    if max_color_diff is None:
+        max_color_diff = int(config['MAX_COLOR_DIFF'])
+
+    completed = SoilClassification.objects.filter(
+        user_id=user_id, status=SoilClassification.STATUS_COMPLETED
+    ).order_by('-created_at')
+
+    duplicate = None
+    match = completed.filter(content_hash=content_hash).first()
+    if match is not None:
+        duplicate = SoilDuplicate(match, 0, exact=True)
+
+    if duplicate is None:
+        # Same gradients can still be a different soil colour
+        same_hash = completed.filter(perceptual_hash=phash).exclude(color_signature='')
+        for match in same_hash[:_MAX_SAME_HASH_ROWS]:
+            if color_difference(match.color_signature, color_signature) <= max_color_diff:
+                duplicate = SoilDuplicate(match, 0, exact=False)
+                break
+
+    if duplicate is None and max_distance > 0:
+        index = get_perceptual_index()
+        for _ in range(_MAX_STALE_MATCHES):
+            nearest = index.nearest(user_id, phash, color_signature, max_distance, max_color_diff)
+            if nearest is None:
+                break
+            pk, distance = nearest
+            match = completed.filter(pk=pk).first()
+            if match is not None:
+                duplicate = SoilDuplicate(match, distance, exact=False)
+                break
+            # Deleted (or no longer completed) since the index saw it
+            index.discard(pk)
+
+    if duplicate is not None:
+        logger.info(
+            f"[INFO] Soil upload matches classification {duplicate.classification.pk} "
+            f"({'identical file' if duplicate.exact else f'dHash distance {duplicate.distance}'})"
+        )
+    return duplicate
+
+
+# Singleton instance
+_index: Optional[PerceptualHashIndex] = None
+
+
+def get_perceptual_index() -> PerceptualHashIndex:
+    """Get or create the perceptual hash index singleton."""
+    global _index
+    if _index is None:
+        _index = PerceptualHashIndex()
+    return _index
@@ -0,0 +1,262 @@
+"""
+Soil Image Derivatives
+======================
+The result and history pages used to load the full-resolution upload. With
+settings.SOIL_DERIVATIVES['ENABLED'], every soil image also gets resized
+JPEG (or WebP) copies, one per configured size, stored next to the original
+under deterministic names:
+
+    soil_images/2025/01/01/soil.png
+    soil_images/2025/01/01/thumbs/soil.png.224.jpg
+    soil_images/2025/01/01/thumbs/soil.png.480.jpg
+
+A size is the length of the shorter edge, so each copy is at least
+size x size pixels - what an <img> of that size needs. The upload is
+decoded once, JPEGs at the smallest DCT scale that still covers the largest
+size, and the classifier gets that decoded image (classifier_input) rather
+than a copy: it resizes straight to 224x224 itself, so its input is
+resampled once, as without derivatives. Images are never upscaled: sizes
+an upright original already fits map to the original.
+
+JPEG is the default: on soil photos WebP files were only 5-10% smaller but
+took 30x longer to encode (scripts/benchmarks/benchmark_soil_derivatives.py).
+
+Derivatives are built at upload time (EAGER) in the sync views and in the
+soil job workers, or lazily on first request through soil_image_view.
+Names are recorded in SoilClassification.image_derivatives so templates
+({% soil_image_url classification 480 %}) link to them without asking the
+storage backend whether they exist.
+"""
+
+import io
+import logging
+import posixpath
+from typing import BinaryIO, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from django.core.files.base import ContentFile
+from PIL import Image, features
+
+logger = logging.getLogger(__name__)
+
+# SoilClassifier.img_size; always built as the smallest copy
+CLASSIFIER_SIZE = 224
+
+# Subdirectory next to the original that holds its derivatives
+DERIVATIVES_DIR = 'thumbs'
+
+_EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+# EXIF orientation tag, and the transpose that makes each value upright
+# (as in ImageOps.exif_transpose)
+_ORIENTATION = 0x0112
+_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+def get_derivatives_config() -> Dict:
+    """settings.SOIL_DERIVATIVES with defaults."""
+    from django.conf import settings
+    config = {
+        'ENABLED': False,
+        'EAGER': True,
+        'SIZES': [224, 480, 960],
+        'FORMAT': 'JPEG',
+        'QUALITY': 80,
+    }
+    config.update(getattr(settings, 'SOIL_DERIVATIVES', {}))
+    return config
+
+
+def get_sizes(config: Optional[Dict] = None) -> List[int]:
+    """Configured sizes plus the classifier size, ascending."""
+    config = config or get_derivatives_config()
+    return sorted({int(size) for size in config['SIZES']} | {CLASSIFIER_SIZE})
+
+
+def get_format(config: Optional[Dict] = None) -> str:
+    """Configured output format, JPEG if Pillow was built without WebP."""
+    config = config or get_derivatives_config()
+    fmt = config['FORMAT'].upper()
+    if fmt == 'WEBP' and not features.check('webp'):
+        return 'JPEG'
+    return fmt if fmt in _EXTENSIONS else 'JPEG'
+
+
+def nearest_size(requested: int, sizes: Optional[List[int]] = None) -> int:
+    """Smallest configured size covering requested (the largest if none does)."""
+    sizes = sizes or get_sizes()
+    return next((size for size in sizes if size >= requested), sizes[-1])
+
+
+def derivative_name(name: str, size: int, fmt: str = 'JPEG') -> str:
+    """
+    Storage name of a derivative of name.
+
+    e.g. soil_images/2025/01/01/soil.png, 480 ->
+    soil_images/2025/01/01/thumbs/soil.png.480.jpg (the original extension
+    stays, so soil.jpg and soil.png next to each other don't collide)
+    """
+    directory, filename = posixpath.split(name)
+    return posixpath.join(directory, DERIVATIVES_DIR, f'{filename}.{size}.{_EXTENSIONS[fmt]}')
+
+
+class SoilDerivatives(NamedTuple):
+    """Resized copies of one decoded image, before encoding."""
+    images: Dict[int, Image.Image]
+    orientation: int
+    source_size: Tuple[int, int]
+    decoded: Image.Image
+
+    def is_original(self, size: int) -> bool:
+        """True if the original can stand in for this size (no resize, no rotation)."""
+        return self.images[size].size == self.source_size and self.orientation == 1
+
+    @property
+    def classifier_input(self) -> Image.Image:
+        """
+        The decoded upload, in stored pixel order like the classifier's own
+        decode. Not the 224px copy: the classifier's 224x224 resize of that
+        would resample the image twice.
+        """
+        return self.decoded
+
+    def encode(self, size: int, fmt: str, quality: int) -> bytes:
+        """One derivative as WebP/JPEG bytes, rotated upright for display."""
+        img = self.images[size]
+        if self.orientation in _TRANSPOSE:
+            img = img.transpose(_TRANSPOSE[self.orientation])
+        buffer = io.BytesIO()
+        img.save(buffer, format=fmt, quality=quality)
+        return buffer.getvalue()
+
+
+def resize_short_edge(img: Image.Image, size: int) -> Image.Image:
+    """Scale img so its shorter edge is size pixels (never upscales)."""
+    width, height = img.size
+    scale = size / min(width, height)
+    if scale >= 1:
+        return img
+    return img.resize(
+        (max(1, round(width * scale)), max(1, round(height * scale))), Image.BILINEAR
+    )
+
+
+def build_derivatives(
+    source: Union[str, bytes, BinaryIO], sizes: Optional[List[int]] = None
+) -> SoilDerivatives:
+    """
+    Decode an image once and resize it to every derivative size.
+
+    File-like objects are rewound afterwards so the upload can still be
+    saved. Raises ValueError if the image cannot be decoded.
+    """
+    sizes = sizes or get_sizes()
+    try:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        rewind = hasattr(source, 'seek')
+        if rewind:
+            source.seek(0)
+        try:
+            img = Image.open(source)
+            source_size = img.size
+            if img.format == 'JPEG':
+                # Smallest DCT scale that still covers the largest size
+                img.draft('RGB', (sizes[-1], sizes[-1]))
+            img.load()
+        finally:
+            if rewind:
+                source.seek(0)
+        orientation = img.getexif().get(_ORIENTATION, 1)
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+    except Exception as e:
+        raise ValueError(f"Error loading image: {str(e)}")
+
+    # Every size is resized from the decoded image, not from the next larger copy
+    return SoilDerivatives(
+        images={size: resize_short_edge(img, size) for size in sizes},
+        orientation=orientation,
+        source_size=source_size,
+        decoded=img,
+    )
+
+
+def prepare_derivatives(source: Union[bytes, BinaryIO]) -> Optional[SoilDerivatives]:
+    """
+    build_derivatives() for an upload when eager derivatives are enabled.
+
+    Returns None when disabled or when the image cannot be decoded (the
+    classifier reports that error).
+    """
+    config = get_derivatives_config()
+    if not (config['ENABLED'] and config['EAGER']):
+        return None
+    try:
+        return build_derivatives(source, get_sizes(config))
+    except ValueError:
+        return None
+
+
+def store_derivatives(classification, derivatives: SoilDerivatives) -> Dict[str, str]:
+    """
+    Encode and save the derivatives of a saved classification's image.
+
+    Records {"<size>": name} in classification.image_derivatives. A failed
+    write is logged; the size is then built lazily on first request.
+    """
+    config = get_derivatives_config()
+    fmt = get_format(config)
+    image = classification.soil_image
+    storage = image.storage
+
+    stored = dict(classification.image_derivatives)
+    for size in sorted(derivatives.images):
+        if derivatives.is_original(size):
+            # Re-encoding at the same size would save nothing
+            stored[str(size)] = image.name
+            continue
+        name = derivative_name(image.name, size, fmt)
+        try:
+            data = derivatives.encode(size, fmt, config['QUALITY'])
+            stored[str(size)] = _save_exact(storage, name, ContentFile(data))
+        except Exception as e:
+            logger.error(f"[ERROR] Could not store derivative {name}: {e}")
+
+    classification.image_derivatives = stored
+    classification.save(update_fields=['image_derivatives', 'updated_at'])
+    return stored
+
+
+def ensure_derivatives(classification) -> Dict[str, str]:
+    """Build any missing derivatives of a stored image (lazy path)."""
+    sizes = get_sizes()
+    if all(str(size) in classification.image_derivatives for size in sizes):
+        return classification.image_derivatives
+
+    with classification.soil_image.open('rb') as f:
+        image_bytes = f.read()
+    return store_derivatives(classification, build_derivatives(image_bytes, sizes))
+
+
+def derivative_url(classification, requested: int) -> str:
+    """URL of the stored derivative covering requested px, or '' if not built."""
+    name = classification.image_derivatives.get(str(nearest_size(requested)))
+    return classification.soil_image.storage.url(name) if name else ''
+
+
+def _save_exact(storage, name: str, content) -> str:
+    """Save content under exactly name, replacing an earlier copy."""
+    save_exact = getattr(storage, 'save_exact', None)
+    if save_exact is not None:
+        return save_exact(name, content)
+    # Other backends (e.g. FileSystemStorage) would pick a new unique name
+    storage.delete(name)
+    return storage.save(name, content)
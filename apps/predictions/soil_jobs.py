@@ -0,0 +1,244 @@
+"""
+Asynchronous Soil Classification Jobs
+=====================================
+With settings.SOIL_ASYNC_JOBS['ENABLED'], soil_classification_view stores
+the upload as a PENDING SoilClassification and redirects straight to the
+result page; the ResNet forward pass runs here, off the request thread.
+
+The SoilClassification table is the queue: worker threads claim the oldest
+PENDING row with an atomic status update, so several WSGI worker processes
+(or `manage.py process_soil_jobs`) can share it and jobs survive restarts.
+Rows stuck in PROCESSING for longer than STALE_AFTER seconds (e.g. the
+process died mid-job) are claimed again.
+
+A job that fails (storage or network error, model not loaded) goes back to
+PENDING with exponential backoff, like the upload queue
+(apps/core/upload_queue.py), and is marked FAILED after MAX_ATTEMPTS. An
+image that cannot be decoded fails at once. When the inference queue is
+full the job is put back without using an attempt and the worker stops
+draining until its next poll.
+"""
+
+import logging
+import os
+import threading
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .ml_services.inference_executor import InferenceQueueFull, get_soil_executor
+from .ml_services.soil_classifier import get_soil_classifier
+from .models import PredictionHistory, SoilClassification
+from .soil_derivatives import prepare_derivatives, store_derivatives
+
+logger = logging.getLogger(__name__)
+
+
+def get_soil_jobs_config() -> Dict:
+    """settings.SOIL_ASYNC_JOBS with defaults."""
+    from django.conf import settings
+    config = {
+        'ENABLED': False,
+        'WORKERS': 1,
+        'POLL_INTERVAL': 5.0,
+        'STALE_AFTER': 600,
+        'MAX_ATTEMPTS': 5,
+        'RETRY_BACKOFF': 10.0,
+        'MAX_BACKOFF': 600.0,
+    }
+    config.update(getattr(settings, 'SOIL_ASYNC_JOBS', {}))
+    return config
+
+
+def claim_next_job(stale_after: float = 600) -> Optional[int]:
+    """
+    Atomically move the oldest due job to PROCESSING.
+
+    Returns:
+        The claimed SoilClassification pk, or None if nothing is due
+    """
+    now = timezone.now()
+    runnable = Q(status=SoilClassification.STATUS_PENDING, next_attempt_at__lte=now) | Q(
+        status=SoilClassification.STATUS_PROCESSING,
+        updated_at__lt=now - timedelta(seconds=stale_after)
+    )
+    candidates = (
+        SoilClassification.objects.filter(runnable)
+        .order_by('next_attempt_at')
+        .values_list('pk', 'status', 'updated_at')[:10]
+    )
+    for pk, status, updated_at in candidates:
+        # Only one process wins the update for a given (status, updated_at)
+        claimed = SoilClassification.objects.filter(
+            pk=pk, status=status, updated_at=updated_at
+        ).update(status=SoilClassification.STATUS_PROCESSING, updated_at=now)
+        if claimed:
+            return pk
+    return None
+
+
+def process_job(pk: int) -> str:
+    """
+    Classify one claimed job and store its result.
+
+    Returns:
+        The job's new status, or 'requeued' when the inference queue was
+        full and the job was put back untried
+    """
+    classification = SoilClassification.objects.get(pk=pk)
+
+    try:
+        with classification.soil_image.open('rb') as f:
+            image_bytes = f.read()
+        # One decode for the derivatives and the classifier input, when enabled
+        derivatives = prepare_derivatives(image_bytes)
+        source = derivatives.classifier_input if derivatives else image_bytes
+        result = get_soil_executor().run(get_soil_classifier().classify, source)
+    except InferenceQueueFull:
+        # Not an attempt; wait one backoff step so the worker does not spin on it
+        now = timezone.now()
+        SoilClassification.objects.filter(pk=pk).update(
+            status=SoilClassification.STATUS_PENDING,
+            next_attempt_at=now + timedelta(seconds=get_soil_jobs_config()['RETRY_BACKOFF']),
+            updated_at=now
+        )
+        return 'requeued'
+    except Exception as e:
+        return _record_failure(classification, e)
+
+    classification.status = SoilClassification.STATUS_COMPLETED
+    classification.soil_type = result['soil_type']
+    classification.confidence_score = result['confidence_score']
+    classification.all_predictions = result['all_predictions']
+    classification.error_message = ''
+    classification.save(update_fields=[
+        'status', 'soil_type', 'confidence_score', 'all_predictions',
+        'error_message', 'updated_at'
+    ])
+    if derivatives is not None:
+        store_derivatives(classification, derivatives)
+
+    PredictionHistory.objects.create(
+        user_id=classification.user_id,
+        prediction_type='soil',
+        result_summary=f"Classified as: {classification.get_soil_type_display()} (Confidence: {result['confidence_score']*100:.1f}%)"
+    )
+    logger.info(f"[INFO] Soil classification job {pk} completed: {result['soil_type']}")
+    return classification.status
+
+
+def _record_failure(classification: SoilClassification, error: Exception) -> str:
+    """Schedule a retry with exponential backoff, or mark the job FAILED."""
+    config = get_soil_jobs_config()
+    attempts = classification.attempts + 1
+    # An image that cannot be decoded will not decode on a later attempt either
+    permanent = isinstance(error, ValueError)
+    failed = permanent or attempts >= config['MAX_ATTEMPTS']
+    delay = min(config['RETRY_BACKOFF'] * (2 ** (attempts - 1)), config['MAX_BACKOFF'])
+
+    classification.status = SoilClassification.STATUS_FAILED if failed else SoilClassification.STATUS_PENDING
+    classification.attempts = attempts
+    classification.error_message = str(error)
+    classification.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    classification.save(update_fields=[
+        'status', 'attempts', 'error_message', 'next_attempt_at', 'updated_at'
+    ])
+
+    if failed:
+        logger.error(f"[ERROR] Soil classification job {classification.pk} failed after {attempts} attempt(s): {error}")
+    else:
+        logger.warning(
+            f"[WARNING] Soil classification job {classification.pk} failed (attempt {attempts}), "
+            f"retrying in {delay:.0f}s: {error}"
+        )
+    return classification.status
+
+
+def run_pending_jobs(stale_after: float = 600, limit: Optional[int] = None) -> int:
+    """
+    Claim and process jobs until none are due (or limit is reached).
+
+    Stops early when the inference queue is full; the caller polls again later.
+    """
+    processed = 0
+    while limit is None or processed < limit:
+        pk = claim_next_job(stale_after)
+        if pk is None:
+            break
+        if process_job(pk) == 'requeued':
+            break
+        processed += 1
+    return processed
+
+
+class SoilJobWorker:
+    """In-process worker threads that drain the job table."""
+
+    def __init__(self, workers: int = 1, poll_interval: float = 5.0, stale_after: float = 600):
+        # 0: no in-process threads, jobs are left to `manage.py process_soil_jobs`
+        self.workers = max(int(workers), 0)
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+
+        self._wakeup = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._threads_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def notify(self):
+        """Wake the workers after a job was enqueued (starting them if needed)."""
+        self.start()
+        self._wakeup.set()
+
+    def start(self):
+        """Start the worker threads (again after a fork, e.g. gunicorn preload)."""
+        pid = os.getpid()
+        if self._threads_pid == pid and all(t.is_alive() for t in self._threads):
+            return
+
+        with self._lock:
+            if self._threads_pid == pid and all(t.is_alive() for t in self._threads):
+                return
+            if self._threads_pid != pid:
+                self._threads = []
+                self._wakeup = threading.Event()
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for i in range(len(self._threads), self.workers):
+                thread = threading.Thread(target=self._run, name=f'soil-jobs-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            self._threads_pid = pid
+
+    def _run(self):
+        """Worker loop: drain the queue, then sleep until notified or polled."""
+        while True:
+            close_old_connections()
+            try:
+                run_pending_jobs(self.stale_after)
+            except Exception as e:
+                logger.error(f"[ERROR] Soil job worker error: {e}")
+            finally:
+                close_old_connections()
+
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+
+# Singleton instance
+_worker: Optional[SoilJobWorker] = None
+
+
+def get_soil_job_worker() -> SoilJobWorker:
+    """Get or create the soil job worker singleton."""
+    global _worker
+    if _worker is None:
+        config = get_soil_jobs_config()
+        _worker = SoilJobWorker(
+            workers=config['WORKERS'],
+            poll_interval=config['POLL_INTERVAL'],
+            stale_after=config['STALE_AFTER']
+        )
+    return _worker
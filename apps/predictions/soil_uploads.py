@@ -0,0 +1,75 @@
+"""
+Soil Upload Handling
+====================
+The steps shared by the sync and async soil classification views
+(views.py, async_views.py) between form validation and classification:
+
+1. hash_soil_upload(): dedup hashes of the upload (CPU only)
+2. plan_soil_upload(): look for a duplicate (database) and decide whether
+   to reuse its result, queue a background job (SOIL_ASYNC_JOBS) or
+   classify now, and whether to build eager derivatives from the upload
+
+The steps are separate so the async view can run the CPU work in a worker
+thread and the database work on Django's sync thread.
+"""
+
+from typing import Dict, NamedTuple, Optional
+
+from .models import SoilClassification
+from .soil_dedup import compute_image_hashes, find_duplicate, get_dedup_config
+from .soil_jobs import get_soil_jobs_config
+
+
+class SoilUploadPlan(NamedTuple):
+    """What to do with a validated soil upload."""
+    result: Optional[Dict]  # reused from a duplicate; None means classify
+    background: bool  # save as PENDING and let the soil job queue classify it
+    needs_derivatives: bool  # build eager derivatives from the upload
+
+
+def hash_soil_upload(classification: SoilClassification, uploaded_file):
+    """Set content_hash / perceptual_hash / color_signature when dedup is enabled."""
+    if not get_dedup_config()['ENABLED']:
+        return
+    try:
+        (
+            classification.content_hash,
+            classification.perceptual_hash,
+            classification.color_signature,
+        ) = compute_image_hashes(uploaded_file)
+    except ValueError:
+        # Undecodable image; let the classifier report it
+        pass
+
+
+def plan_soil_upload(classification: SoilClassification) -> SoilUploadPlan:
+    """
+    Decide how to handle an upload hashed by hash_soil_upload().
+
+    Reusing a byte-identical file also points classification at the stored
+    image and its derivatives; a background job marks it PENDING.
+    """
+    dedup_config = get_dedup_config()
+    duplicate = None
+    if dedup_config['ENABLED'] and classification.content_hash:
+        duplicate = find_duplicate(
+            classification.user_id,
+            classification.content_hash,
+            classification.perceptual_hash,
+            classification.color_signature
+        )
+
+    if duplicate is not None:
+        if duplicate.exact and dedup_config['REUSE_FILES']:
+            # The user's byte-identical file is already in storage; skip the upload
+            classification.soil_image = duplicate.classification.soil_image.name
+            classification.image_derivatives = duplicate.classification.image_derivatives
+            return SoilUploadPlan(duplicate.result, background=False, needs_derivatives=False)
+        return SoilUploadPlan(duplicate.result, background=False, needs_derivatives=True)
+
+    if get_soil_jobs_config()['ENABLED']:
+        # Store the upload and classify it (and resize it) in the background
+        classification.status = SoilClassification.STATUS_PENDING
+        return SoilUploadPlan(None, background=True, needs_derivatives=False)
+
+    return SoilUploadPlan(None, background=False, needs_derivatives=True)
@@ -2,6 +2,9 @@
 Custom template filters for predictions app
 """
 from django import template
+from django.urls import reverse
+
+from apps.predictions.soil_derivatives import derivative_url, get_derivatives_config, nearest_size
 
 register = template.Library()
 
@@ -13,3 +16,20 @@ def multiply(value, arg):
         return float(value) * float(arg)
     except (ValueError, TypeError):
         return 0
+
+
+@register.simple_tag
+def soil_image_url(classification, size=480):
+    """
+    URL of a classification's soil image resized to at least size px.
+
+    Links to the stored derivative when it exists, to the view that builds
+    it when it does not, and to the original when derivatives are off.
+    """
+    if not classification.soil_image:
+        return ''
+    if not get_derivatives_config()['ENABLED']:
+        return classification.soil_image.url
+    return derivative_url(classification, size) or reverse(
+        'predictions:soil_image', args=[classification.pk, nearest_size(size)]
+    )
@@ -0,0 +1,150 @@
+"""
+CropPredictionBatcher: coalescing, the inline fallback and error hand-back.
+
+Uses a stand-in predictor, so no model artifacts are needed.
+"""
+
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from apps.predictions.ml_services.batching import CropPredictionBatcher
+
+LOGGER = 'apps.predictions.ml_services.batching'
+
+
+class FakePredictor:
+    """Echoes each row's 'x' back and records how every row was scored."""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.batches = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+        self._lock = threading.Lock()
+
+    def get_cached(self, features, top_k=3):
+        return None
+
+    def predict_batch(self, features, cache_lookup=True):
+        self.started.set()
+        self.release.wait()
+        time.sleep(self.delay)
+        with self._lock:
+            self.batches.append([row['x'] for row in features])
+        if self.fail:
+            raise RuntimeError('batch failed')
+        return [{'x': row['x'], 'thread': threading.current_thread().name} for row in features]
+
+    def predict(self, features):
+        if self.fail:
+            raise RuntimeError('fallback failed')
+        return self.predict_batch([features])[0]
+
+    def scored(self):
+        return sorted(x for batch in self.batches for x in batch)
+
+
+def run_concurrently(batcher, count):
+    """Call batcher.predict from count threads at once; return results in order."""
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def call(i):
+        barrier.wait()
+        try:
+            results[i] = batcher.predict({'x': i})
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return results
+
+
+class CropPredictionBatcherTests(SimpleTestCase):
+
+    def test_coalesces_concurrent_requests(self):
+        predictor = FakePredictor()
+        batcher = CropPredictionBatcher(predictor, max_wait_ms=50, max_batch_size=64)
+
+        results = run_concurrently(batcher, 16)
+
+        self.assertEqual([r['x'] for r in results], list(range(16)))
+        self.assertEqual(predictor.scored(), list(range(16)))
+        metrics = batcher.get_metrics()
+        self.assertEqual(metrics['requests_total'], 16)
+        self.assertLess(metrics['batches_total'], 16)
+        self.assertEqual(metrics['inline_total'], 0)
+
+    def test_dead_worker_scores_inline(self):
+        # e.g. the thread was lost in a fork and cannot be restarted
+        predictor = FakePredictor()
+        batcher = CropPredictionBatcher(predictor, timeout_ms=10000)
+
+        start = time.monotonic()
+        with mock.patch.object(batcher, '_ensure_worker'), self.assertLogs(LOGGER, 'WARNING'):
+            result = batcher.predict({'x': 1})
+
+        self.assertEqual(result['x'], 1)
+        self.assertEqual(result['thread'], threading.current_thread().name)
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(batcher.get_metrics()['inline_total'], 1)
+
+    def test_timeout_scores_unclaimed_request_once(self):
+        # The thread is stuck on another batch when the second request times out
+        predictor = FakePredictor()
+        predictor.release.clear()
+        batcher = CropPredictionBatcher(predictor, max_wait_ms=0, timeout_ms=100)
+
+        first = threading.Thread(target=batcher.predict, args=({'x': 0},))
+        first.start()
+        self.assertTrue(predictor.started.wait(2))
+
+        waiter = threading.Timer(0.5, predictor.release.set)
+        waiter.start()
+        with self.assertLogs(LOGGER, 'WARNING'):
+            result = batcher.predict({'x': 1})
+        first.join(2)
+
+        self.assertEqual(result['x'], 1)
+        self.assertEqual(result['thread'], threading.current_thread().name)
+        self.assertEqual(predictor.scored(), [0, 1])
+        self.assertEqual(batcher.get_metrics()['inline_total'], 1)
+
+    def test_claimed_request_waits_for_slow_batch(self):
+        # Past the timeout, but the thread already took the request: no second scoring
+        predictor = FakePredictor(delay=0.3)
+        batcher = CropPredictionBatcher(predictor, max_wait_ms=0, timeout_ms=50)
+
+        result = batcher.predict({'x': 7})
+
+        self.assertEqual(result['thread'], 'crop-prediction-batcher')
+        self.assertEqual(predictor.scored(), [7])
+        self.assertEqual(batcher.get_metrics()['inline_total'], 0)
+
+    def test_errors_reach_every_caller(self):
+        predictor = FakePredictor(fail=True)
+        batcher = CropPredictionBatcher(predictor, max_wait_ms=50)
+
+        with self.assertLogs(LOGGER, 'ERROR'):
+            results = run_concurrently(batcher, 4)
+
+        for result in results:
+            self.assertIsInstance(result, RuntimeError)
+        self.assertTrue(batcher._worker_alive())
+
+    def test_disabled_calls_predictor_directly(self):
+        predictor = FakePredictor()
+        batcher = CropPredictionBatcher(predictor, enabled=False)
+
+        self.assertEqual(batcher.predict({'x': 3})['x'], 3)
+        self.assertIsNone(batcher._worker)
+
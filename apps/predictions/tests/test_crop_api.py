@@ -0,0 +1,87 @@
+"""
+Crop JSON API streaming endpoints: scored output with the model, 503
+without it.
+"""
+
+import io
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.predictions import api_views
+from apps.predictions.ml_services import crop_predictor
+from apps.predictions.ml_services.crop_predictor import FEATURE_KEYS, CropPredictor
+
+from .test_crop_predictor import HAS_MODEL, load_predictor
+
+CSV_BODY = ','.join(FEATURE_KEYS) + '\n90,42,43,20.9,82.0,6.5,202.9\n'
+NDJSON_BODY = b'{"nitrogen": 90, "phosphorus": 42, "potassium": 43, "temperature": 20.9, ' \
+              b'"humidity": 82.0, "ph_value": 6.5, "rainfall": 202.9}\n'
+
+
+class CropStreamingApiTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(username='grower', password='x')
+        self.client.force_login(user)
+
+    def use_predictor(self, predictor: CropPredictor):
+        patch = mock.patch.object(api_views, 'get_crop_predictor', return_value=predictor)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def use_untrained_predictor(self):
+        """Serve from a predictor whose model files are missing (mock mode)."""
+        empty_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(empty_dir.cleanup)
+        for patch in (
+            mock.patch.object(crop_predictor, 'get_model_dir', return_value=Path(empty_dir.name)),
+            # The loader prints its failure on every attempt
+            mock.patch('sys.stdout', new_callable=io.StringIO),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.use_predictor(CropPredictor())
+
+    def score_file(self):
+        upload = SimpleUploadedFile('soil.csv', CSV_BODY.encode(), content_type='text/csv')
+        return self.client.post(reverse('predictions:crop_score_file_api'), {'file': upload})
+
+    def stream(self):
+        return self.client.post(
+            reverse('predictions:crop_predict_stream_api'), NDJSON_BODY,
+            content_type='application/x-ndjson'
+        )
+
+    def test_score_file_without_model_is_unavailable(self):
+        self.use_untrained_predictor()
+        response = self.score_file()
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('error', response.json())
+
+    def test_stream_without_model_is_unavailable(self):
+        self.use_untrained_predictor()
+        response = self.stream()
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('error', response.json())
+
+    @unittest.skipUnless(HAS_MODEL, 'Crop model files not available')
+    def test_score_file_with_model(self):
+        self.use_predictor(load_predictor('sklearn'))
+        response = self.score_file()
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].split(',')[7])
+
+    @unittest.skipUnless(HAS_MODEL, 'Crop model files not available')
+    def test_stream_with_model(self):
+        self.use_predictor(load_predictor('sklearn'))
+        response = self.stream()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'predicted_crop', b''.join(response.streaming_content))
@@ -0,0 +1,111 @@
+"""
+Numeric parity of the optimized crop model backends with the sklearn forest.
+
+The compiled, fused, memory-mapped and lookup-grid paths all claim to give
+the sklearn answer; these tests check that on the sample dataset rows and
+on whole-number / one-decimal inputs, which sit on split thresholds far
+more often than continuous random values.
+"""
+
+import tempfile
+import unittest
+
+import joblib
+import numpy as np
+from django.test import SimpleTestCase
+
+from apps.predictions.ml_services.compiled_forest import CompiledForest, fold_thresholds
+from apps.predictions.ml_services.crop_predictor import (
+    FEATURE_RANGES,
+    get_model_dir,
+    get_parity_inputs,
+    get_sample_features,
+)
+from apps.predictions.ml_services.lookup_grid import LookupGrid
+
+MODEL_DIR = get_model_dir()
+HAS_MODEL = all(
+    (MODEL_DIR / name).exists()
+    for name in ('random_forest_model.pkl', 'scaler.pkl', 'label_encoder.pkl')
+)
+
+
+class FoldThresholdsTests(SimpleTestCase):
+    """fold_thresholds() returns the exact raw-value boundary of each split."""
+
+    def test_boundary_is_exact(self):
+        rng = np.random.default_rng(0)
+        threshold = rng.normal(size=2000)
+        mean = rng.uniform(-50, 200, size=2000)
+        scale = rng.uniform(0.05, 80, size=2000)
+
+        folded = fold_thresholds(threshold, mean, scale)
+
+        def goes_left(x):
+            return ((x - mean) / scale).astype(np.float32) <= threshold
+
+        self.assertTrue(goes_left(folded).all())
+        self.assertFalse(goes_left(np.nextafter(folded, np.inf)).any())
+
+
+@unittest.skipUnless(HAS_MODEL, 'crop model artifacts not available')
+class CropModelParityTests(SimpleTestCase):
+    """Optimized backends agree with scaler + sklearn forest on top-1 crop."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.model = joblib.load(str(MODEL_DIR / 'random_forest_model.pkl'))
+        cls.model.set_params(verbose=0)
+        cls.scaler = joblib.load(str(MODEL_DIR / 'scaler.pkl'))
+        cls.compiled = CompiledForest.from_sklearn(cls.model)
+        cls.fused = cls.compiled.fuse_scaler(cls.scaler)
+        cls.inputs = get_parity_inputs(samples=2000)
+
+    def expected(self, X):
+        return self.model.predict_proba(self.scaler.transform(X))
+
+    def assertSameTop1(self, expected, actual, name):
+        flipped = int((expected.argmax(axis=1) != actual.argmax(axis=1)).sum())
+        self.assertEqual(flipped, 0, f"{flipped} top-1 crops differ on {name} inputs")
+
+    def test_dataset_rows_present(self):
+        self.assertIsNotNone(get_sample_features())
+
+    def test_compiled_matches_sklearn(self):
+        for name, X in self.inputs.items():
+            with self.subTest(inputs=name):
+                expected = self.expected(X)
+                actual = self.compiled.predict_proba(self.scaler.transform(X))
+                self.assertSameTop1(expected, actual, name)
+                np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-12)
+
+    def test_fused_matches_sklearn(self):
+        for name, X in self.inputs.items():
+            with self.subTest(inputs=name):
+                expected = self.expected(X)
+                actual = self.fused.predict_proba(X)
+                self.assertSameTop1(expected, actual, name)
+                np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-12)
+
+    def test_mmap_round_trip(self):
+        X = self.inputs['dataset']
+        for model, X_in in ((self.compiled, self.scaler.transform(X)), (self.fused, X)):
+            with tempfile.TemporaryDirectory() as directory:
+                model.save_mmap(directory)
+                loaded = CompiledForest.load(directory, mmap_mode='r')
+                self.assertEqual(loaded.fused_exact, model.fused_exact)
+                np.testing.assert_array_equal(loaded.predict_proba(X_in), model.predict_proba(X_in))
+
+    def test_grid_matches_live_model_at_grid_points(self):
+        bins = [3] * len(FEATURE_RANGES)
+        predict = lambda X: self.expected(X)
+        grid = LookupGrid.build(predict, FEATURE_RANGES, bins, 'test')
+
+        coords = np.stack(np.unravel_index(np.arange(int(np.prod(bins))), bins), axis=1)
+        X = grid.lows + coords * grid.steps
+        proba = predict(X)
+        grid_idx, _ = grid.lookup(X)
+        # Ties may pick either crop; the grid's top-1 must be a live top-1
+        top1 = np.take_along_axis(proba, grid_idx[:, :1], axis=1)[:, 0]
+        np.testing.assert_array_equal(top1, proba.max(axis=1))
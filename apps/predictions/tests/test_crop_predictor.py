@@ -0,0 +1,185 @@
+"""
+CropPredictor behaviour that must not depend on the loaded backend.
+"""
+
+import contextlib
+import io
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import joblib
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from apps.predictions.ml_services.compiled_forest import MMAP_SUFFIX, CompiledForest
+from apps.predictions.ml_services.crop_predictor import (
+    COMPILED_MODEL_FILENAME,
+    FUSED_MODEL_FILENAME,
+    SOURCE_FILENAMES,
+    CropPredictor,
+    get_model_dir,
+    get_sample_features,
+)
+from apps.predictions.ml_services.soil_classifier import file_sha256
+
+MODEL_DIR = get_model_dir()
+HAS_MODEL = all(
+    (MODEL_DIR / name).exists()
+    for name in ('random_forest_model.pkl', 'scaler.pkl', 'label_encoder.pkl')
+)
+
+BACKENDS = ('sklearn', 'compiled', 'fused')
+BACKEND_FILES = {'compiled': COMPILED_MODEL_FILENAME, 'fused': FUSED_MODEL_FILENAME}
+
+
+def load_predictor_with_log(backend: str, cache=None, **settings):
+    """
+    A predictor forced onto one backend, without the lookup grid or mmap.
+
+    Returns:
+        (predictor, everything it printed while loading)
+    """
+    overrides = {
+        'CROP_MODEL_BACKEND': backend,
+        'CROP_MODEL_MMAP': False,
+        'CROP_LOOKUP_GRID': {'ENABLED': False},
+    }
+    overrides.update(settings)
+    log = io.StringIO()
+    with override_settings(**overrides), contextlib.redirect_stdout(log):
+        predictor = CropPredictor(cache=cache)
+        predictor._load_model()
+    return predictor, log.getvalue()
+
+
+def load_predictor(backend: str, cache=None, **settings) -> CropPredictor:
+    return load_predictor_with_log(backend, cache, **settings)[0]
+
+
+@unittest.skipUnless(HAS_MODEL, 'crop model artifacts not available')
+class PredictBatchTests(SimpleTestCase):
+    """predict_batch() edge cases on every backend."""
+
+    def backends(self):
+        for backend in BACKENDS:
+            name = BACKEND_FILES.get(backend)
+            if name and not (MODEL_DIR / name).exists():
+                continue
+            predictor = load_predictor(backend)
+            self.assertEqual(predictor.backend, backend)
+            yield backend, predictor
+
+    def test_empty_input(self):
+        for backend, predictor in self.backends():
+            with self.subTest(backend=backend):
+                self.assertEqual(predictor.predict_batch([]), [])
+
+                top_idx, top_scores = predictor.predict_batch(
+                    np.empty((0, 7)), return_arrays=True
+                )
+                self.assertEqual(top_idx.shape, (0, 3))
+                self.assertEqual(top_scores.shape, (0, 3))
+
+
+HAS_COMPILED = (
+    HAS_MODEL
+    and (MODEL_DIR / FUSED_MODEL_FILENAME).exists()
+    and (MODEL_DIR / COMPILED_MODEL_FILENAME).exists()
+)
+
+
+class TempModelDirMixin:
+    """Runs each test against a copy of the crop model directory."""
+
+    def setUp(self):
+        super().setUp()
+        self.model_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.model_dir)
+        for name in SOURCE_FILENAMES + (COMPILED_MODEL_FILENAME, FUSED_MODEL_FILENAME):
+            shutil.copy(MODEL_DIR / name, self.model_dir / name)
+
+        patcher = mock.patch(
+            'apps.predictions.ml_services.crop_predictor.get_model_dir',
+            return_value=self.model_dir
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+@unittest.skipUnless(HAS_COMPILED, 'compiled crop model artifacts not available')
+class ModelSourceTests(TempModelDirMixin, SimpleTestCase):
+    """Compiled/fused artifacts are only used with the .pkl files they came from."""
+
+    def retrain(self, name):
+        """Rewrite a source file with new bytes (same object, so it still loads)."""
+        path = self.model_dir / name
+        joblib.dump(joblib.load(path), path, compress=3)
+
+    def test_current_artifacts_are_used(self):
+        self.assertEqual(load_predictor('auto').backend, 'fused')
+        self.assertEqual(load_predictor('compiled').backend, 'compiled')
+
+    def test_retrained_source_falls_back_to_sklearn(self):
+        for name in SOURCE_FILENAMES:
+            with self.subTest(source=name):
+                self.retrain(name)
+                predictor, log = load_predictor_with_log('auto')
+                self.assertTrue(predictor.is_trained)
+                self.assertEqual(predictor.backend, 'sklearn')
+                self.assertIn(f"was built from a different {name}", log)
+                shutil.copy(MODEL_DIR / name, self.model_dir / name)
+
+    def test_explicit_backend_refuses_stale_artifact(self):
+        self.retrain('random_forest_model.pkl')
+        for backend in ('fused', 'compiled'):
+            with self.subTest(backend=backend):
+                self.assertFalse(load_predictor(backend).is_trained)
+
+    def test_artifact_without_sources_is_not_trusted(self):
+        for name in (FUSED_MODEL_FILENAME, COMPILED_MODEL_FILENAME):
+            model = CompiledForest.load(self.model_dir / name)
+            model.sources = {}
+            model.save(self.model_dir / name)
+
+        self.assertEqual(load_predictor('auto').backend, 'sklearn')
+
+
+@unittest.skipUnless(HAS_COMPILED, 'compiled crop model artifacts not available')
+class MmapExportTests(TempModelDirMixin, SimpleTestCase):
+    """A memory-mapped export is only used with the .npz it was made from."""
+
+    def setUp(self):
+        super().setUp()
+        self.npz_path = self.model_dir / FUSED_MODEL_FILENAME
+        self.mmap_dir = self.npz_path.with_suffix(MMAP_SUFFIX)
+        CompiledForest.load(self.npz_path).save_mmap(
+            self.mmap_dir, source_sha256=file_sha256(self.npz_path)
+        )
+
+    def test_current_export_is_mapped(self):
+        predictor, log = load_predictor_with_log('fused', CROP_MODEL_MMAP=True)
+        self.assertIn(f"Memory-mapping crop model from {self.mmap_dir}", log)
+        self.assertIsInstance(predictor.model.value.base, np.memmap)
+
+    def test_stale_export_is_ignored(self):
+        # Rebuild the .npz (different leaf values) without re-exporting
+        model = CompiledForest.load(self.npz_path)
+        model.value = model.value[:, ::-1].copy()
+        model.save(self.npz_path)
+
+        predictor, log = load_predictor_with_log('fused', CROP_MODEL_MMAP=True)
+
+        self.assertIn('was exported from a different crop_model_fused.npz', log)
+        X = get_sample_features()
+        np.testing.assert_array_equal(predictor.model.predict_proba(X), model.predict_proba(X))
+
+    def test_export_without_hash_is_ignored(self):
+        CompiledForest.load(self.npz_path).save_mmap(self.mmap_dir)
+
+        predictor, log = load_predictor_with_log('fused', CROP_MODEL_MMAP=True)
+
+        self.assertNotIn('Memory-mapping', log)
+        self.assertEqual(predictor.backend, 'fused')
@@ -0,0 +1,107 @@
+"""
+PredictionCache and CropPredictor's cached path.
+"""
+
+import unittest
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from apps.predictions.ml_services.crop_predictor import get_parity_inputs
+from apps.predictions.ml_services.prediction_cache import PredictionCache
+
+from .test_crop_predictor import HAS_MODEL, load_predictor
+
+
+class PredictionCacheTests(SimpleTestCase):
+
+    def test_keys_round_features(self):
+        cache = PredictionCache(round_decimals=1)
+        X = np.array([[1.04, 2.0, 3, 4, 5, 6, -0.01], [1.0, 2.0, 3, 4, 5, 6, 0.0]])
+
+        keys = cache.make_keys(X, 'v1')
+
+        self.assertEqual(keys[0], keys[1])
+        self.assertTrue(keys[0].endswith(',0.0'))
+        self.assertNotEqual(keys[0], cache.make_keys(X, 'v2')[0])
+        self.assertNotEqual(keys[0], cache.make_keys(X, 'v1', top_k=5)[0])
+
+    def test_lookups_return_copies(self):
+        cache = PredictionCache()
+        stored = {'predicted_crop': 'Rice', 'top_3_crops': [{'crop': 'Rice'}]}
+        cache.set_many({'k': stored})
+        stored['predicted_crop'] = 'changed after set'
+
+        first = cache.get_many(['k'])['k']
+        first['top_3_crops'][0]['crop'] = 'changed after get'
+        second = cache.get_many(['k'])['k']
+
+        self.assertEqual(second, {'predicted_crop': 'Rice', 'top_3_crops': [{'crop': 'Rice'}]})
+
+    def test_lru_eviction_and_ttl(self):
+        cache = PredictionCache(max_size=2, ttl=60)
+        cache.set_many({'a': {}, 'b': {}})
+        cache.get_many(['a'])
+        cache.set_many({'c': {}})
+        self.assertEqual(set(cache.get_many(['a', 'b', 'c'])), {'a', 'c'})
+
+        with mock.patch('time.monotonic', return_value=10 ** 9):
+            self.assertEqual(cache.get_many(['a', 'c']), {})
+        self.assertEqual(cache.get_stats()['size'], 0)
+
+
+@unittest.skipUnless(HAS_MODEL, 'crop model artifacts not available')
+class CachedPredictionTests(SimpleTestCase):
+
+    def test_repeated_rows_are_independent(self):
+        predictor = load_predictor('auto', cache=PredictionCache())
+        row = {'nitrogen': 90, 'phosphorus': 42, 'potassium': 43, 'temperature': 20.9,
+               'humidity': 82.0, 'ph_value': 6.5, 'rainfall': 202.9}
+
+        results = predictor.predict_batch([row, row, row])
+        results[0]['predicted_crop'] = 'edited'
+        results[1]['top_3_crops'].clear()
+
+        self.assertIsNot(results[1], results[2])
+        self.assertEqual(len(results[2]['top_3_crops']), 3)
+        again = predictor.predict_batch([row])[0]
+        self.assertNotEqual(again['predicted_crop'], 'edited')
+        self.assertEqual(len(again['top_3_crops']), 3)
+
+    def test_result_does_not_depend_on_first_input(self):
+        cache = PredictionCache(round_decimals=0)
+        predictor = load_predictor('auto', cache=cache)
+        plain = load_predictor('auto')
+
+        # Rows whose prediction changes when rounded to the key precision
+        X = get_parity_inputs(samples=2000)['random']
+        rounded = cache.round_features(X)
+        raw_idx, _ = plain.predict_batch(X, return_arrays=True)
+        key_idx, key_scores = plain.predict_batch(rounded, return_arrays=True)
+        differs = np.flatnonzero((raw_idx != key_idx).any(axis=1))
+        self.assertTrue(len(differs), 'no input changes prediction when rounded')
+
+        for i in differs[:5]:
+            expected = plain.crops_list[key_idx[i, 0]].capitalize()
+            for order in ((X[i], rounded[i]), (rounded[i], X[i])):
+                cache.clear()
+                first = predictor.predict_batch(np.array(order[0]))[0]
+                second = predictor.predict_batch(np.array(order[1]))[0]
+                self.assertEqual(first['predicted_crop'], expected)
+                self.assertEqual(second, first)
+                self.assertAlmostEqual(first['confidence_score'], key_scores[i, 0])
+
+    def test_new_model_version_misses(self):
+        cache = PredictionCache()
+        predictor = load_predictor('auto', cache=cache)
+        X = get_parity_inputs(samples=10)['form']
+
+        predictor.predict_batch(X)
+        predictor.predict_batch(X)
+        self.assertEqual(cache.hits, len(X))
+
+        predictor.model_version = 'retrained'
+        predictor.predict_batch(X)
+        self.assertEqual(cache.hits, len(X))
+        self.assertEqual(cache.misses, 2 * len(X))
@@ -0,0 +1,102 @@
+"""
+SoilClassifier batch and preprocessing paths, with a small stand-in network
+(the trained model.pth is not needed).
+"""
+
+import threading
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import torch
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from apps.predictions.ml_services import soil_classifier
+from apps.predictions.ml_services.soil_classifier import SoilClassifier, build_soil_transform
+
+SAMPLE_DIR = Path(settings.BASE_DIR) / 'datasets' / 'test_samples' / 'soil_images'
+SAMPLE_IMAGES = sorted(SAMPLE_DIR.glob('*.jpg'))
+
+
+def make_classifier() -> SoilClassifier:
+    """SoilClassifier running a fixed random 4-class network on CPU."""
+    with mock.patch.object(SoilClassifier, '_load_model'):
+        classifier = SoilClassifier()
+
+    torch.manual_seed(0)
+    classifier.model = torch.nn.Sequential(
+        torch.nn.Conv2d(3, 8, kernel_size=7, stride=4),
+        torch.nn.ReLU(),
+        torch.nn.AdaptiveAvgPool2d(4),
+        torch.nn.Flatten(),
+        torch.nn.Linear(8 * 16, 4),
+    ).eval()
+    classifier.device = torch.device('cpu')
+    classifier.transform = build_soil_transform(classifier.img_size)
+    classifier.is_trained = True
+    return classifier
+
+
+class ClassifyBatchTests(SimpleTestCase):
+
+    def setUp(self):
+        # Per-image [PREDICTION] lines
+        patcher = mock.patch.object(soil_classifier.logger, 'disabled', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.classifier = make_classifier()
+        self.images = [path.read_bytes() for path in SAMPLE_IMAGES]
+
+    def test_matches_classify_in_input_order(self):
+        sources = self.images + [b'not an image'] + self.images[:2]
+
+        report = self.classifier.classify_batch(sources, chunk_size=3, decode_workers=2)
+
+        self.assertEqual(report['count'], len(sources) - 1)
+        self.assertEqual(len(report['results']), len(sources))
+        self.assertIn('error', report['results'][len(self.images)])
+        for source, result in zip(sources, report['results']):
+            if 'error' in result:
+                continue
+            expected = self.classifier.classify(source)
+            self.assertEqual(result['soil_type'], expected['soil_type'])
+            self.assertAlmostEqual(result['confidence_score'], expected['confidence_score'], places=5)
+
+    def test_decodes_one_chunk_at_a_time(self):
+        chunk_size = 2
+        lock = threading.Lock()
+        state = {'decoded': 0, 'peak': 0, 'pulled': 0}
+        load_tensor = self.classifier._load_tensor
+        predict_tensors = self.classifier._predict_tensors
+
+        def counting_load(source):
+            tensor = load_tensor(source)
+            with lock:
+                state['decoded'] += 1
+                state['peak'] = max(state['peak'], state['decoded'])
+            return tensor
+
+        def counting_predict(batch):
+            with lock:
+                state['decoded'] -= len(batch)
+            return predict_tensors(batch)
+
+        def generate():
+            for _ in range(5):
+                for image in self.images:
+                    state['pulled'] += 1
+                    yield image
+
+        with mock.patch.object(self.classifier, '_load_tensor', counting_load), \
+                mock.patch.object(self.classifier, '_predict_tensors', counting_predict):
+            report = self.classifier.classify_batch(generate(), chunk_size=chunk_size, decode_workers=4)
+
+        self.assertEqual(report['count'], 5 * len(self.images))
+        self.assertEqual(state['pulled'], 5 * len(self.images))
+        self.assertLessEqual(state['peak'], chunk_size)
+
+    def test_empty_input(self):
+        report = self.classifier.classify_batch([])
+        self.assertEqual((report['results'], report['count']), ([], 0))
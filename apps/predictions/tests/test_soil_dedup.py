@@ -0,0 +1,128 @@
+"""
+Duplicate upload detection: per-user matching and the perceptual hash
+index refresh (hashes are written directly; no images are decoded).
+"""
+
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.predictions import soil_dedup
+from apps.predictions.models import SoilClassification
+from apps.predictions.soil_dedup import find_duplicate
+from apps.predictions.soil_uploads import plan_soil_upload
+
+PHASH = '00000000000000ff'
+NEAR_PHASH = '00000000000000fe'  # 1 bit from PHASH
+COLORS = '80' * 12
+
+
+@override_settings(SOIL_DEDUP={'ENABLED': True, 'MAX_DISTANCE': 4, 'MAX_COLOR_DIFF': 16})
+class SoilDedupTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(username='grower', password='x')
+        self.other = User.objects.create_user(username='neighbour', password='x')
+
+        patch = mock.patch.object(soil_dedup, '_index', None)
+        patch.start()
+        self.addCleanup(patch.stop)
+        patch = mock.patch.object(soil_dedup.logger, 'disabled', True)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def classified(self, user, content_hash='a' * 64, phash=PHASH, soil_type='clay') -> SoilClassification:
+        return SoilClassification.objects.create(
+            user=user,
+            soil_image=f'soil_images/{user.username}-{content_hash[:8]}.jpg',
+            soil_type=soil_type,
+            confidence_score=0.9,
+            all_predictions={soil_type: 0.9},
+            content_hash=content_hash,
+            perceptual_hash=phash,
+            color_signature=COLORS,
+        )
+
+    def test_matches_own_identical_upload(self):
+        row = self.classified(self.user)
+        duplicate = find_duplicate(self.user.pk, 'a' * 64, PHASH, COLORS)
+        self.assertEqual(duplicate.classification, row)
+        self.assertTrue(duplicate.exact)
+
+    def test_ignores_other_users(self):
+        self.classified(self.other)
+        self.assertIsNone(find_duplicate(self.user.pk, 'a' * 64, PHASH, COLORS))
+        self.assertIsNone(find_duplicate(self.user.pk, 'b' * 64, NEAR_PHASH, COLORS))
+
+    def test_other_users_file_is_not_reused(self):
+        self.classified(self.other)
+        upload = SoilClassification(
+            user=self.user, soil_image='soil_images/new.jpg',
+            content_hash='a' * 64, perceptual_hash=PHASH, color_signature=COLORS
+        )
+        plan = plan_soil_upload(upload)
+        self.assertIsNone(plan.result)
+        self.assertEqual(upload.soil_image.name, 'soil_images/new.jpg')
+
+    def test_own_file_is_reused(self):
+        row = self.classified(self.user)
+        upload = SoilClassification(
+            user=self.user, soil_image='soil_images/new.jpg',
+            content_hash='a' * 64, perceptual_hash=PHASH, color_signature=COLORS
+        )
+        plan = plan_soil_upload(upload)
+        self.assertEqual(plan.result['soil_type'], 'clay')
+        self.assertEqual(upload.soil_image.name, row.soil_image.name)
+
+    def test_near_match_from_index(self):
+        row = self.classified(self.user, phash=NEAR_PHASH)
+        duplicate = find_duplicate(self.user.pk, 'b' * 64, PHASH, COLORS)
+        self.assertEqual(duplicate.classification, row)
+        self.assertEqual(duplicate.distance, 1)
+
+    def test_index_picks_up_late_commits(self):
+        index = soil_dedup.get_perceptual_index()
+        index.refresh()
+
+        # Committed after the refresh, but stamped before it
+        row = self.classified(self.user, phash=NEAR_PHASH)
+        SoilClassification.objects.filter(pk=row.pk).update(
+            updated_at=timezone.now() - timedelta(seconds=30)
+        )
+        self.assertEqual(index.nearest(self.user.pk, PHASH, COLORS, 4, 16), (row.pk, 1))
+
+    def test_index_drops_rows_no_longer_completed(self):
+        row = self.classified(self.user, phash=NEAR_PHASH)
+        index = soil_dedup.get_perceptual_index()
+        index.refresh()
+        self.assertEqual(len(index), 1)
+
+        SoilClassification.objects.filter(pk=row.pk).update(
+            status=SoilClassification.STATUS_PENDING, updated_at=timezone.now()
+        )
+        self.assertIsNone(index.nearest(self.user.pk, PHASH, COLORS, 4, 16))
+        self.assertEqual(len(index), 0)
+
+    def test_deleted_match_falls_through_to_next_nearest(self):
+        self.classified(self.user, content_hash='c' * 64, phash=NEAR_PHASH)
+        fallback = self.classified(self.user, content_hash='d' * 64, phash='00000000000000fc')
+        index = soil_dedup.get_perceptual_index()
+        index.refresh()
+
+        SoilClassification.objects.filter(content_hash='c' * 64).delete()
+        duplicate = find_duplicate(self.user.pk, 'b' * 64, PHASH, COLORS)
+        self.assertEqual(duplicate.classification, fallback)
+        self.assertEqual(len(index), 1)
+
+    def test_rebuild_drops_deleted_rows(self):
+        row = self.classified(self.user, phash=NEAR_PHASH)
+        index = soil_dedup.get_perceptual_index()
+        index.refresh()
+
+        row.delete()
+        index._rebuilt_at -= soil_dedup._REBUILD_INTERVAL
+        index.refresh()
+        self.assertEqual(len(index), 0)
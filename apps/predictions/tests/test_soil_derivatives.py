@@ -0,0 +1,39 @@
+"""
+Soil image derivatives: classifying the shared decode gives the same result
+as classifying the upload itself.
+"""
+
+from unittest import mock
+
+import torch
+from django.test import SimpleTestCase
+
+from apps.predictions.ml_services import soil_classifier
+from apps.predictions.soil_derivatives import build_derivatives
+
+from .test_soil_classifier import SAMPLE_IMAGES, make_classifier
+
+
+class ClassifierInputTests(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(soil_classifier.logger, 'disabled', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.classifier = make_classifier()
+
+    def test_matches_classifying_the_upload(self):
+        for path in SAMPLE_IMAGES:
+            with self.subTest(image=path.name):
+                data = path.read_bytes()
+                derivatives = build_derivatives(data, [224, 480, 960])
+
+                self.assertTrue(torch.equal(
+                    self.classifier._load_tensor(derivatives.classifier_input),
+                    self.classifier._load_tensor(data)
+                ))
+                self.assertEqual(
+                    self.classifier.classify(derivatives.classifier_input),
+                    self.classifier.classify(data)
+                )
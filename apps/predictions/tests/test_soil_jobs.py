@@ -0,0 +1,142 @@
+"""
+Soil job queue: retries with backoff, permanent failures and the
+queue-full requeue (the classifier and image storage are stubbed).
+"""
+
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db.models.fields.files import FieldFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.predictions import soil_jobs
+from apps.predictions.ml_services.inference_executor import InferenceQueueFull
+from apps.predictions.models import SoilClassification
+
+JOBS_CONFIG = {
+    'ENABLED': True,
+    'WORKERS': 0,
+    'MAX_ATTEMPTS': 3,
+    'RETRY_BACKOFF': 10,
+    'MAX_BACKOFF': 15,
+}
+RESULT = {
+    'soil_type': 'clay',
+    'confidence_score': 0.9,
+    'all_predictions': {'clay': 0.9},
+}
+
+
+class InlineExecutor:
+    """Runs jobs on the calling thread, or refuses them when full."""
+
+    def __init__(self, full=False):
+        self.full = full
+
+    def run(self, fn, *args):
+        if self.full:
+            raise InferenceQueueFull('soil inference queue is full')
+        return fn(*args)
+
+
+@override_settings(SOIL_ASYNC_JOBS=JOBS_CONFIG, SOIL_DERIVATIVES={'ENABLED': False})
+class SoilJobTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(username='grower', password='x')
+        self.job = SoilClassification.objects.create(
+            user=user, soil_image='soil_images/sample.jpg',
+            status=SoilClassification.STATUS_PENDING
+        )
+        self.classify = mock.Mock(return_value=RESULT)
+        self.executor = InlineExecutor()
+
+        patches = [
+            mock.patch.object(FieldFile, 'open', lambda field, mode='rb': io.BytesIO(b'jpeg')),
+            mock.patch.object(soil_jobs, 'get_soil_executor', lambda: self.executor),
+            mock.patch.object(
+                soil_jobs, 'get_soil_classifier', lambda: mock.Mock(classify=self.classify)
+            ),
+            mock.patch.object(soil_jobs.logger, 'disabled', True),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def refresh(self) -> SoilClassification:
+        self.job.refresh_from_db()
+        return self.job
+
+    def make_due(self):
+        SoilClassification.objects.filter(pk=self.job.pk).update(next_attempt_at=timezone.now())
+
+    def test_completes(self):
+        self.assertEqual(soil_jobs.run_pending_jobs(), 1)
+        job = self.refresh()
+        self.assertEqual(job.status, SoilClassification.STATUS_COMPLETED)
+        self.assertEqual(job.soil_type, 'clay')
+
+    def test_transient_error_is_retried_with_backoff(self):
+        self.classify.side_effect = [RuntimeError('storage timeout'), RESULT]
+
+        before = timezone.now()
+        soil_jobs.run_pending_jobs()
+        job = self.refresh()
+        self.assertEqual(job.status, SoilClassification.STATUS_PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.error_message, 'storage timeout')
+        self.assertGreaterEqual(job.next_attempt_at, before + timedelta(seconds=10))
+
+        # Not due yet
+        self.assertIsNone(soil_jobs.claim_next_job())
+
+        self.make_due()
+        soil_jobs.run_pending_jobs()
+        self.assertEqual(self.refresh().status, SoilClassification.STATUS_COMPLETED)
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        self.classify.side_effect = RuntimeError('storage timeout')
+        delays = []
+        for _ in range(2):
+            before = timezone.now()
+            soil_jobs.run_pending_jobs()
+            delays.append((self.refresh().next_attempt_at - before).total_seconds())
+            self.make_due()
+        self.assertAlmostEqual(delays[0], 10, delta=1)
+        self.assertAlmostEqual(delays[1], 15, delta=1)
+
+    def test_fails_after_max_attempts(self):
+        self.classify.side_effect = RuntimeError('storage timeout')
+        for _ in range(3):
+            soil_jobs.run_pending_jobs()
+            self.make_due()
+
+        job = self.refresh()
+        self.assertEqual(job.status, SoilClassification.STATUS_FAILED)
+        self.assertEqual(job.attempts, 3)
+        self.assertIsNone(soil_jobs.claim_next_job())
+
+    def test_undecodable_image_fails_at_once(self):
+        self.classify.side_effect = ValueError('Error loading image: truncated')
+        soil_jobs.run_pending_jobs()
+
+        job = self.refresh()
+        self.assertEqual(job.status, SoilClassification.STATUS_FAILED)
+        self.assertEqual(job.attempts, 1)
+
+    def test_queue_full_is_not_reclaimed_at_once(self):
+        self.executor.full = True
+
+        self.assertEqual(soil_jobs.run_pending_jobs(), 0)
+        job = self.refresh()
+        self.assertEqual(job.status, SoilClassification.STATUS_PENDING)
+        self.assertEqual(job.attempts, 0)
+        self.assertIsNone(soil_jobs.claim_next_job())
+        self.classify.assert_not_called()
+
+        self.executor.full = False
+        self.make_due()
+        soil_jobs.run_pending_jobs()
+        self.assertEqual(self.refresh().status, SoilClassification.STATUS_COMPLETED)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api_views, async_views, views
 
 app_name = 'predictions'
 
@@ -8,5 +8,17 @@ urlpatterns = [
     path('crop/result/<int:pk>/', views.crop_result_view, name='crop_result'),
     path('soil/', views.soil_classification_view, name='soil_classification'),
     path('soil/result/<int:pk>/', views.soil_result_view, name='soil_result'),
+    path('soil/result/<int:pk>/status/', views.soil_status_view, name='soil_status'),
+    path('soil/result/<int:pk>/image/<int:size>/', views.soil_image_view, name='soil_image'),
+    path('async/crop/', async_views.crop_prediction_view, name='async_crop_prediction'),
+    path('async/soil/', async_views.soil_classification_view, name='async_soil_classification'),
+    path('api/crop/', api_views.crop_predict_api_view, name='crop_predict_api'),
+    path('api/crop/bulk/', api_views.crop_predict_bulk_api_view, name='crop_predict_bulk_api'),
+    path('api/crop/score-file/', api_views.crop_score_file_api_view, name='crop_score_file_api'),
+    path('api/crop/stream/', api_views.crop_predict_stream_api_view, name='crop_predict_stream_api'),
     path('history/', views.prediction_history_view, name='history'),
+    path('metrics/crop-batching/', views.crop_batching_metrics_view, name='crop_batching_metrics'),
+    path('metrics/crop-cache/', views.crop_cache_metrics_view, name='crop_cache_metrics'),
+    path('metrics/soil-inference/', views.soil_inference_metrics_view, name='soil_inference_metrics'),
+    path('health/ready/', views.readiness_view, name='readiness'),
 ]
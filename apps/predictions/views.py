@@ -1,11 +1,21 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.views.decorators.http import require_http_methods
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_GET, require_http_methods
 from .forms import CropPredictionForm, SoilClassificationForm
 from .models import CropPrediction, SoilClassification, PredictionHistory
+from .ml_services.batching import get_crop_batcher
 from .ml_services.crop_predictor import get_crop_predictor
+from .ml_services.inference_executor import InferenceQueueFull, get_soil_executor
 from .ml_services.soil_classifier import get_soil_classifier
+from .ml_services.warmup import get_readiness
+from .soil_derivatives import (
+    ensure_derivatives, get_derivatives_config, get_sizes, prepare_derivatives, store_derivatives
+)
+from .soil_jobs import get_soil_job_worker
+from .soil_uploads import hash_soil_upload, plan_soil_upload
 
 
 @login_required
@@ -19,8 +29,8 @@ def crop_prediction_view(request):
             prediction = form.save(commit=False)
             prediction.user = request.user
 
-            # Get ML prediction
-            predictor = get_crop_predictor()
+            # Get ML prediction (coalesced with concurrent requests when enabled)
+            predictor = get_crop_batcher()
             features = {
                 'nitrogen': prediction.nitrogen,
                 'phosphorus': prediction.phosphorus,
@@ -78,51 +88,54 @@ def soil_classification_view(request):
     if request.method == 'POST':
         form = SoilClassificationForm(request.POST, request.FILES)
         if form.is_valid():
-            import tempfile
-            import os
-            from django.core.files.uploadedfile import InMemoryUploadedFile
-            from io import BytesIO
-
             # Get the uploaded file
             uploaded_file = request.FILES['soil_image']
+            classification = form.save(commit=False)
+            classification.user = request.user
+
+            # Reuse the result of an earlier upload of the same image, or
+            # classify it in the background
+            hash_soil_upload(classification, uploaded_file)
+            plan = plan_soil_upload(classification)
+            if plan.background:
+                classification.save()
+                get_soil_job_worker().notify()
 
-            # Read file content into memory
-            file_content = uploaded_file.read()
-
-            # Create a temporary file to pass to the classifier
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
-                tmp_file.write(file_content)
-                tmp_file_path = tmp_file.name
+                messages.info(request, "Your soil image is being classified. This page will update automatically.")
+                return redirect('predictions:soil_result', pk=classification.pk)
 
-            try:
-                # Get ML classification
+            derivatives = prepare_derivatives(uploaded_file) if plan.needs_derivatives else None
+            result = plan.result
+            if result is None:
+                # Get ML classification on the inference executor (decoded straight
+                # from the upload buffer, which is rewound afterwards for saving).
+                # With derivatives on, the image is decoded once for both the
+                # derivatives and the classifier.
                 classifier = get_soil_classifier()
-                result = classifier.classify(tmp_file_path)
-
-                # Reset the uploaded file for saving
-                uploaded_file.seek(0)
+                source = derivatives.classifier_input if derivatives else uploaded_file
+                try:
+                    result = get_soil_executor().run(classifier.classify, source)
+                except InferenceQueueFull:
+                    messages.error(request, "The classifier is busy right now. Please try again in a moment.")
+                    return render(request, 'predictions/soil_classification.html', {'form': form}, status=503)
+
+            # Now save the classification with all data
+            classification.soil_type = result['soil_type']
+            classification.confidence_score = result['confidence_score']
+            classification.all_predictions = result['all_predictions']
+            classification.save()
+            if derivatives is not None:
+                store_derivatives(classification, derivatives)
 
-                # Now save the classification with all data
-                classification = form.save(commit=False)
-                classification.user = request.user
-                classification.soil_type = result['soil_type']
-                classification.confidence_score = result['confidence_score']
-                classification.all_predictions = result['all_predictions']
-                classification.save()
-
-                # Save to history
-                PredictionHistory.objects.create(
-                    user=request.user,
-                    prediction_type='soil',
-                    result_summary=f"Classified as: {classification.get_soil_type_display()} (Confidence: {result['confidence_score']*100:.1f}%)"
-                )
+            # Save to history
+            PredictionHistory.objects.create(
+                user=request.user,
+                prediction_type='soil',
+                result_summary=f"Classified as: {classification.get_soil_type_display()} (Confidence: {result['confidence_score']*100:.1f}%)"
+            )
 
-                messages.success(request, f"Classification successful! Soil type: {classification.get_soil_type_display()}")
-                return redirect('predictions:soil_result', pk=classification.pk)
-            finally:
-                # Clean up temporary file
-                if os.path.exists(tmp_file_path):
-                    os.unlink(tmp_file_path)
+            messages.success(request, f"Classification successful! Soil type: {classification.get_soil_type_display()}")
+            return redirect('predictions:soil_result', pk=classification.pk)
         else:
             messages.error(request, "Please correct the errors below.")
     else:
@@ -146,6 +159,55 @@ def soil_result_view(request, pk):
     return render(request, 'predictions/soil_result.html', context)
 
 
+@login_required
+@require_GET
+def soil_image_view(request, pk, size):
+    """
+    Redirect to a resized copy of a soil image, building it on first request.
+
+    The soil_image_url template tag links here until the derivative is
+    recorded on the classification, and straight to the file afterwards.
+    """
+    try:
+        lookup = {} if request.user.is_staff else {'user': request.user}
+        classification = SoilClassification.objects.get(pk=pk, **lookup)
+    except SoilClassification.DoesNotExist:
+        raise Http404("Classification not found")
+    if not get_derivatives_config()['ENABLED'] or size not in get_sizes():
+        raise Http404("Unknown image size")
+
+    try:
+        name = ensure_derivatives(classification).get(str(size))
+    except (ValueError, OSError, AttributeError):
+        # Undecodable or unavailable original; fall back to it as it is
+        name = None
+    return redirect(classification.soil_image.storage.url(name) if name else classification.soil_image.url)
+
+
+@login_required
+@require_GET
+def soil_status_view(request, pk):
+    """JSON status of a soil classification, polled by the result page."""
+    try:
+        classification = SoilClassification.objects.get(pk=pk, user=request.user)
+    except SoilClassification.DoesNotExist:
+        return JsonResponse({'error': 'Classification not found'}, status=404)
+
+    data = {
+        'status': classification.status,
+        'finished': classification.is_finished,
+    }
+    if classification.is_completed:
+        data.update(
+            soil_type=classification.soil_type,
+            soil_type_label=classification.get_soil_type_display(),
+            confidence_score=classification.confidence_score,
+        )
+    elif classification.status == SoilClassification.STATUS_FAILED:
+        data['error'] = classification.error_message
+    return JsonResponse(data)
+
+
 @login_required
 def prediction_history_view(request):
     """View for displaying user's prediction history."""
@@ -157,3 +219,33 @@ def prediction_history_view(request):
         'soil_classifications': soil_classifications,
     }
     return render(request, 'predictions/history.html', context)
+
+
+@staff_member_required
+def crop_batching_metrics_view(request):
+    """JSON metrics for the crop prediction batcher (queue depth, batch sizes)."""
+    return JsonResponse(get_crop_batcher().get_metrics())
+
+
+@staff_member_required
+def soil_inference_metrics_view(request):
+    """JSON metrics for the soil inference executor (queue depth, rejections)."""
+    return JsonResponse(get_soil_executor().get_metrics())
+
+
+@staff_member_required
+def crop_cache_metrics_view(request):
+    """JSON metrics for the crop prediction result cache (hits, misses)."""
+    predictor = get_crop_predictor()
+    if predictor.cache is None:
+        return JsonResponse({'enabled': False})
+    stats = predictor.cache.get_stats()
+    stats.update(enabled=True, model_version=predictor.model_version)
+    return JsonResponse(stats)
+
+
+@require_GET
+def readiness_view(request):
+    """Readiness probe: 200 once the ML models are warm, 503 before."""
+    readiness = get_readiness()
+    return JsonResponse(readiness, status=200 if readiness['ready'] else 503)
@@ -0,0 +1,13 @@
+"""
+Gunicorn settings.
+
+Usage:
+    gunicorn -c config/gunicorn.conf.py config.wsgi
+    gunicorn -c config/gunicorn.conf.py --preload -w 4 config.wsgi
+"""
+
+
+def post_worker_init(worker):
+    """Start model warmup and background workers in each worker process."""
+    from apps.core.serving import start_serving
+    start_serving()
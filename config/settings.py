@@ -139,6 +139,56 @@ SUPABASE_STORAGE_BUCKETS = {
     'profile_pictures': 'profile-pictures'
 }
 
+# Supabase Storage HTTP client (config/storage_client.py)
+# One keep-alive connection pool per process for all storage backends.
+# Failed requests (connection errors, timeouts, 408/429/5xx) are retried
+# MAX_RETRIES times with exponential backoff starting at RETRY_BACKOFF seconds.
+# Uploads of RESUMABLE_THRESHOLD bytes or more use the resumable endpoint in
+# CHUNK_SIZE chunks (Supabase requires 6 MB). URL overrides SUPABASE_URL for
+# storage only, e.g. http://127.0.0.1:5000 for the local stand-in server.
+# INDEX_ENABLED answers exists()/size() from the StoredObject table, kept up
+# to date on save/delete; run manage.py reconcile_storage_index when enabling.
+SUPABASE_STORAGE = {
+    'URL': os.getenv('SUPABASE_STORAGE_URL', ''),
+    'TIMEOUT': float(os.getenv('SUPABASE_STORAGE_TIMEOUT', 30)),
+    'CONNECT_TIMEOUT': float(os.getenv('SUPABASE_STORAGE_CONNECT_TIMEOUT', 5)),
+    'MAX_RETRIES': int(os.getenv('SUPABASE_STORAGE_MAX_RETRIES', 3)),
+    'RETRY_BACKOFF': float(os.getenv('SUPABASE_STORAGE_RETRY_BACKOFF', 0.5)),
+    'MAX_CONNECTIONS': int(os.getenv('SUPABASE_STORAGE_MAX_CONNECTIONS', 10)),
+    'KEEPALIVE_EXPIRY': float(os.getenv('SUPABASE_STORAGE_KEEPALIVE_EXPIRY', 60)),
+    'RESUMABLE_THRESHOLD': int(os.getenv('SUPABASE_STORAGE_RESUMABLE_THRESHOLD', 6 * 1024 * 1024)),
+    'CHUNK_SIZE': int(os.getenv('SUPABASE_STORAGE_CHUNK_SIZE', 6 * 1024 * 1024)),
+    'INDEX_ENABLED': os.getenv('SUPABASE_STORAGE_INDEX', 'False') == 'True',
+}
+
+# Write-behind Storage Uploads (apps/core/upload_queue.py)
+# Saved images are spooled to SPOOL_DIR and served from there while WORKERS
+# background threads per process upload them; requests don't wait on Supabase.
+# Failed uploads are retried with exponential backoff (RETRY_BACKOFF doubling
+# up to MAX_BACKOFF seconds) and marked failed after MAX_ATTEMPTS; see
+# /admin-panel/uploads/. SPOOL_DIR must be shared by every web process.
+STORAGE_WRITE_BEHIND = {
+    'ENABLED': os.getenv('STORAGE_WRITE_BEHIND', 'False') == 'True',
+    'SPOOL_DIR': os.getenv('STORAGE_SPOOL_DIR', str(BASE_DIR / 'upload_spool')),
+    'WORKERS': int(os.getenv('STORAGE_UPLOAD_WORKERS', 2)),
+    'POLL_INTERVAL': float(os.getenv('STORAGE_UPLOAD_POLL_INTERVAL', 5)),
+    'STALE_AFTER': float(os.getenv('STORAGE_UPLOAD_STALE_AFTER', 300)),
+    'MAX_ATTEMPTS': int(os.getenv('STORAGE_UPLOAD_MAX_ATTEMPTS', 10)),
+    'RETRY_BACKOFF': float(os.getenv('STORAGE_UPLOAD_RETRY_BACKOFF', 10)),
+    'MAX_BACKOFF': float(os.getenv('STORAGE_UPLOAD_MAX_BACKOFF', 3600)),
+}
+
+# Storage Read Cache (config/storage_cache.py)
+# Objects opened through SupabaseStorage (up to MAX_OBJECT_SIZE bytes) are
+# kept in DIR for repeated reads, least recently used first out once the
+# cache passes MAX_SIZE bytes. Larger objects are always streamed.
+STORAGE_READ_CACHE = {
+    'ENABLED': os.getenv('STORAGE_READ_CACHE', 'False') == 'True',
+    'DIR': os.getenv('STORAGE_READ_CACHE_DIR', str(BASE_DIR / 'storage_cache')),
+    'MAX_SIZE': int(os.getenv('STORAGE_READ_CACHE_MAX_SIZE', 1024 * 1024 * 1024)),
+    'MAX_OBJECT_SIZE': int(os.getenv('STORAGE_READ_CACHE_MAX_OBJECT_SIZE', 32 * 1024 * 1024)),
+}
+
 # ML Model Configuration
 ML_MODELS = {
     'CROP_PREDICTOR': {
@@ -156,6 +206,153 @@ ML_MODELS = {
     }
 }
 
+# Crop Prediction Backend
+# 'auto' prefers the fused model (manage.py fuse_crop_model), then the compiled
+# forest (manage.py compile_crop_model), then random_forest_model.pkl.
+# 'fused' / 'compiled' require that artifact, 'sklearn' always loads the pickle.
+CROP_MODEL_BACKEND = os.getenv('CROP_MODEL_BACKEND', 'auto')
+
+# Memory-map the compiled/fused crop model (manage.py export_crop_model_mmap)
+# so all gunicorn workers share one page-cache copy of the forest arrays
+CROP_MODEL_MMAP = os.getenv('CROP_MODEL_MMAP', 'False') == 'True'
+
+# Crop Prediction Micro-Batching
+# Coalesces concurrent crop predictions into one batched forward pass.
+# Only useful with threaded workers (e.g. gunicorn --threads / gthread).
+CROP_BATCHING = {
+    'ENABLED': os.getenv('CROP_BATCHING_ENABLED', 'False') == 'True',
+    'MAX_WAIT_MS': float(os.getenv('CROP_BATCH_MAX_WAIT_MS', 5)),
+    'MAX_BATCH_SIZE': int(os.getenv('CROP_BATCH_MAX_SIZE', 64)),
+    # A request the batching thread has not taken after this long is scored
+    # inline by its caller (also when the thread has died)
+    'TIMEOUT_MS': float(os.getenv('CROP_BATCH_TIMEOUT_MS', 1000)),
+}
+
+# Crop Prediction Result Cache
+# Exact-input LRU/TTL cache keyed on the rounded features + model version.
+# BACKEND 'local' is per process; 'django' uses CACHES[CACHE_ALIAS] and is
+# shared across workers when that cache is (Redis, Memcached, database).
+CROP_PREDICTION_CACHE = {
+    'ENABLED': os.getenv('CROP_CACHE_ENABLED', 'False') == 'True',
+    'BACKEND': os.getenv('CROP_CACHE_BACKEND', 'local'),
+    'CACHE_ALIAS': os.getenv('CROP_CACHE_ALIAS', 'default'),
+    'MAX_SIZE': int(os.getenv('CROP_CACHE_MAX_SIZE', 10000)),
+    'TTL': int(os.getenv('CROP_CACHE_TTL', 3600)),
+    'ROUND_DECIMALS': int(os.getenv('CROP_CACHE_ROUND_DECIMALS', 2)),
+}
+
+# Crop Lookup Grid
+# Serve in-range crop predictions from a precomputed top-3 table
+# (manage.py build_crop_grid); out-of-range inputs use the live model.
+# A grid whose measured top-1 agreement with the live model is below
+# MIN_TOP1_AGREEMENT is not written by the build and not loaded.
+CROP_LOOKUP_GRID = {
+    'ENABLED': os.getenv('CROP_GRID_ENABLED', 'False') == 'True',
+    'PATH': os.getenv('CROP_GRID_PATH', ''),
+    'MIN_TOP1_AGREEMENT': float(os.getenv('CROP_GRID_MIN_TOP1_AGREEMENT', 0.8)),
+}
+
+# Crop Prediction JSON API (/predictions/api/crop/ and /predictions/api/crop/bulk/)
+CROP_API = {
+    'MAX_BULK_ROWS': int(os.getenv('CROP_API_MAX_BULK_ROWS', 1000)),
+    # Rows parsed and scored per chunk by /predictions/api/crop/score-file/
+    'FILE_CHUNK_ROWS': int(os.getenv('CROP_API_FILE_CHUNK_ROWS', 5000)),
+    # /predictions/api/crop/stream/ micro-batches: flush after this many
+    # records, or once the oldest unscored record has waited this long
+    'STREAM_BATCH_SIZE': int(os.getenv('CROP_API_STREAM_BATCH_SIZE', 256)),
+    'STREAM_MAX_WAIT_MS': float(os.getenv('CROP_API_STREAM_MAX_WAIT_MS', 50)),
+}
+
+# Soil model directory (model.pth, metadata.json and exports), relative to BASE_DIR
+SOIL_MODEL_PATH = os.getenv('SOIL_MODEL_DIR', 'ml_models/soil_classifier/v1.0')
+
+# Soil model backend: 'auto' (frozen TorchScript export when present and current,
+# else eager), 'torchscript', 'eager' or 'int8'. Export with manage.py
+# export_soil_model; build the INT8 model with manage.py quantize_soil_model
+SOIL_MODEL_BACKEND = os.getenv('SOIL_MODEL_BACKEND', 'auto')
+
+# INT8 static quantization of the soil model (manage.py quantize_soil_model).
+# ENGINE: 'fbgemm' / 'x86' on x86 servers, 'qnnpack' on ARM
+SOIL_QUANTIZATION = {
+    'CALIBRATION_DIR': os.getenv('SOIL_CALIBRATION_DIR', 'datasets/test_samples/soil_images'),
+    'ENGINE': os.getenv('SOIL_QUANTIZATION_ENGINE', 'fbgemm'),
+    # Held-out labelled images (validation split, one folder per class)
+    'EVAL_DIR': os.getenv('SOIL_QUANTIZATION_EVAL_DIR', ''),
+}
+
+# Decode JPEG uploads at a reduced DCT scale (draft mode) and resize/normalize
+# in a single pass instead of full decode + torchvision transforms
+SOIL_FAST_PREPROCESS = os.getenv('SOIL_FAST_PREPROCESS', 'False') == 'True'
+
+# Soil Inference Executor
+# Runs soil classification on dedicated threads with pinned torch thread
+# counts and a bounded queue instead of in the request thread. Keep
+# (WSGI workers x WORKERS x INTRA_OP_THREADS) <= CPU cores; 0 = torch default.
+SOIL_INFERENCE = {
+    'ENABLED': os.getenv('SOIL_INFERENCE_EXECUTOR', 'False') == 'True',
+    'WORKERS': int(os.getenv('SOIL_INFERENCE_WORKERS', 1)),
+    'INTRA_OP_THREADS': int(os.getenv('SOIL_INTRA_OP_THREADS', 0)),
+    'INTER_OP_THREADS': int(os.getenv('SOIL_INTER_OP_THREADS', 0)),
+    'MAX_QUEUE': int(os.getenv('SOIL_INFERENCE_MAX_QUEUE', 16)),
+    'SUBMIT_TIMEOUT': float(os.getenv('SOIL_INFERENCE_SUBMIT_TIMEOUT', 2.0)),
+}
+
+# Asynchronous Soil Classification Jobs (apps/predictions/soil_jobs.py)
+# Uploads are stored as pending rows and classified by background threads
+# (or manage.py process_soil_jobs); the result page polls until done.
+# A failed job is retried after RETRY_BACKOFF seconds, doubling per attempt
+# up to MAX_BACKOFF, and marked failed after MAX_ATTEMPTS
+SOIL_ASYNC_JOBS = {
+    'ENABLED': os.getenv('SOIL_ASYNC_JOBS', 'False') == 'True',
+    'WORKERS': int(os.getenv('SOIL_JOB_WORKERS', 1)),
+    'POLL_INTERVAL': float(os.getenv('SOIL_JOB_POLL_INTERVAL', 5)),
+    'STALE_AFTER': float(os.getenv('SOIL_JOB_STALE_AFTER', 600)),
+    'MAX_ATTEMPTS': int(os.getenv('SOIL_JOB_MAX_ATTEMPTS', 5)),
+    'RETRY_BACKOFF': float(os.getenv('SOIL_JOB_RETRY_BACKOFF', 10)),
+    'MAX_BACKOFF': float(os.getenv('SOIL_JOB_MAX_BACKOFF', 600)),
+}
+
+# Soil Image Duplicate Detection (apps/predictions/soil_dedup.py)
+# Re-uploads of an image the same user already classified reuse its result. MAX_DISTANCE is
+# the number of differing bits (of 64) in the perceptual hash still treated as
+# the same photo; 0 = identical hashes only. Such matches also need the mean
+# colour of every image quadrant within MAX_COLOR_DIFF (0-255) per channel.
+# REUSE_FILES skips the storage upload for byte-identical files.
+SOIL_DEDUP = {
+    'ENABLED': os.getenv('SOIL_DEDUP_ENABLED', 'False') == 'True',
+    'MAX_DISTANCE': int(os.getenv('SOIL_DEDUP_MAX_DISTANCE', 4)),
+    'MAX_COLOR_DIFF': int(os.getenv('SOIL_DEDUP_MAX_COLOR_DIFF', 16)),
+    'REUSE_FILES': os.getenv('SOIL_DEDUP_REUSE_FILES', 'True') == 'True',
+}
+
+# Soil Image Derivatives (apps/predictions/soil_derivatives.py)
+# Resized JPEG/WebP copies of each soil image (SIZES = shorter edge in px),
+# stored next to the original and used by the result page. EAGER builds them
+# at upload time from the same decode as the classifier input (224px);
+# otherwise they are built on first request.
+SOIL_DERIVATIVES = {
+    'ENABLED': os.getenv('SOIL_DERIVATIVES', 'False') == 'True',
+    'EAGER': os.getenv('SOIL_DERIVATIVES_EAGER', 'True') == 'True',
+    'SIZES': [int(s) for s in os.getenv('SOIL_DERIVATIVE_SIZES', '224,480,960').split(',')],
+    'FORMAT': os.getenv('SOIL_DERIVATIVE_FORMAT', 'JPEG'),
+    'QUALITY': int(os.getenv('SOIL_DERIVATIVE_QUALITY', 80)),
+}
+
+# Batched Soil Classification (SoilClassifier.classify_batch)
+SOIL_BATCH_CLASSIFICATION = {
+    'CHUNK_SIZE': int(os.getenv('SOIL_BATCH_CHUNK_SIZE', 16)),
+    'DECODE_WORKERS': int(os.getenv('SOIL_BATCH_DECODE_WORKERS', 4)),
+}
+
+# Model Warmup
+# Load and warm both models at process start (PredictionsConfig.ready) instead
+# of on the first request. BACKGROUND warms in a thread; /predictions/health/ready/
+# returns 503 until warmup has finished.
+ML_WARMUP = {
+    'ENABLED': os.getenv('ML_WARMUP_ENABLED', 'False') == 'True',
+    'BACKGROUND': os.getenv('ML_WARMUP_BACKGROUND', 'False') == 'True',
+}
+
 # File Upload Settings
 MAX_UPLOAD_SIZE = int(os.getenv('MAX_UPLOAD_SIZE', 5242880))  # 5MB
 ALLOWED_IMAGE_TYPES = os.getenv('ALLOWED_IMAGE_TYPES', 'image/jpeg,image/png').split(',')
@@ -204,6 +401,11 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': False,
         },
+        'config': {
+            'handlers': ['file', 'console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
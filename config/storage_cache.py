@@ -0,0 +1,220 @@
+"""
+Read-through Disk Cache for Storage Objects
+===========================================
+With settings.STORAGE_READ_CACHE['ENABLED'], SupabaseStorage._open() keeps
+a local copy of every object it downloads (up to MAX_OBJECT_SIZE bytes)
+under DIR, so jobs that read the same images again (reprocessing, backfills,
+exports) read them from disk instead of Supabase. A miss streams the object
+into the cache file chunk by chunk; it is never held in memory.
+
+The cache is bounded by MAX_SIZE bytes with least-recently-used eviction:
+a hit bumps the file's mtime, and when an insert takes the cache over
+MAX_SIZE the oldest files are removed until it is under LOW_WATER x MAX_SIZE.
+Each process keeps a running estimate of the total size and rescans DIR
+before evicting, so processes sharing DIR also share the budget.
+
+Objects saved with save() get unique timestamped names and are never
+rewritten. save_exact() and delete() drop the local copy; a cache on another
+host keeps its copy of a rewritten name until it is evicted.
+"""
+
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+
+logger = logging.getLogger(__name__)
+
+# Bytes copied per read while filling the cache
+_FILL_CHUNK = 256 * 1024
+
+
+def get_read_cache_config() -> Dict:
+    """settings.STORAGE_READ_CACHE with defaults."""
+    config = {
+        'ENABLED': False,
+        'DIR': str(Path(settings.BASE_DIR) / 'storage_cache'),
+        'MAX_SIZE': 1024 * 1024 * 1024,
+        'MAX_OBJECT_SIZE': 32 * 1024 * 1024,
+        'LOW_WATER': 0.9,
+    }
+    config.update(getattr(settings, 'STORAGE_READ_CACHE', {}))
+    return config
+
+
+class DiskCache:
+    """Size-bounded LRU cache of storage objects in a local directory."""
+
+    def __init__(
+        self,
+        directory: str,
+        max_size: int = 1024 * 1024 * 1024,
+        max_object_size: int = 32 * 1024 * 1024,
+        low_water: float = 0.9
+    ):
+        """
+        Args:
+            directory: Cache root; objects live at <directory>/<bucket>/<name>
+            max_size: Total bytes kept before evicting
+            max_object_size: Larger objects are streamed, not cached
+            low_water: Eviction stops below this fraction of max_size
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self.max_object_size = max_object_size
+        self.low_water = low_water
+
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None  # estimate; None until the first scan
+
+    def path(self, bucket: str, name: str) -> str:
+        """Cache path of an object (raises SuspiciousFileOperation on '..')."""
+        return safe_join(self.directory, bucket, name)
+
+    def open(self, bucket: str, name: str) -> Optional[BinaryIO]:
+        """The cached copy opened for reading (marked recently used), or None."""
+        try:
+            path = self.path(bucket, name)
+            f = open(path, 'rb')
+        except (OSError, SuspiciousFileOperation, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return f
+
+    def fill(self, bucket: str, name: str, source: BinaryIO) -> BinaryIO:
+        """
+        Copy source into the cache and open the copy.
+
+        Raises:
+            OSError: The copy could not be written (source is then
+                partially read)
+        """
+        path = self.path(bucket, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Readers never see a partial file: write a temp file, then rename it
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        size = 0
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in iter(lambda: source.read(_FILL_CHUNK), b''):
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        cached = open(path, 'rb')
+        self._added(size)
+        return cached
+
+    def invalidate(self, bucket: str, name: str):
+        """Drop the cached copy of an object, if any."""
+        try:
+            os.remove(self.path(bucket, name))
+        except (OSError, SuspiciousFileOperation, ValueError):
+            pass
+
+    def clear(self):
+        """Remove every cached object."""
+        for path, _, _ in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._size = 0
+
+    def stats(self) -> Dict:
+        """Objects and bytes currently in the cache directory (scans it)."""
+        entries = self._entries()
+        return {
+            'objects': len(entries),
+            'size': sum(size for _, size, _ in entries),
+            'max_size': self.max_size,
+            'directory': self.directory,
+        }
+
+    def _added(self, size: int):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(s for _, s, _ in self._entries())
+            else:
+                self._size += size
+            if self._size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        """Remove least recently used files until under low_water x max_size."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        target = self.max_size * self.low_water
+        evicted = 0
+        if total > self.max_size:
+            for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass  # another process evicted it
+                except OSError:
+                    continue
+                total -= size
+                evicted += 1
+        self._size = total
+        if evicted:
+            logger.info(f"[INFO] Storage read cache: evicted {evicted} file(s), {total} bytes kept")
+
+    def _entries(self):
+        """(path, size, mtime) of every cached object, skipping temp files."""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                if filename.endswith('.part'):
+                    continue
+                path = os.path.join(root, filename)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, st.st_size, st.st_mtime))
+        return entries
+
+
+# Singleton instance
+_cache: Optional[DiskCache] = None
+
+
+def get_read_cache() -> Optional[DiskCache]:
+    """The read cache singleton, or None when STORAGE_READ_CACHE is disabled."""
+    global _cache
+    config = get_read_cache_config()
+    if not config['ENABLED']:
+        return None
+    if _cache is None:
+        _cache = DiskCache(
+            config['DIR'],
+            max_size=config['MAX_SIZE'],
+            max_object_size=config['MAX_OBJECT_SIZE'],
+            low_water=config['LOW_WATER']
+        )
+    return _cache
+
+
+def reset_read_cache():
+    """Forget the cache singleton (e.g. after changing settings in tests)."""
+    global _cache
+    _cache = None
@@ -0,0 +1,621 @@
+"""
+Pooled Supabase Storage Client
+==============================
+Talks to the Supabase Storage REST API over one keep-alive connection pool
+per process, shared by every SupabaseStorage instance (soil images, profile
+pictures, default storage).
+
+- Timeouts and retries: transport errors, 408/429 and 5xx responses are
+  retried with exponential backoff (settings.SUPABASE_STORAGE)
+- Large uploads go through the resumable (TUS) endpoint in CHUNK_SIZE
+  chunks; a failed chunk resumes from the server's offset instead of
+  restarting the upload
+- URL can point storage at a different server than SUPABASE_URL, e.g. the
+  local stand-in in scripts/testing/storage_standin_server.py
+- INDEX_ENABLED answers SupabaseStorage.exists() / size() from the
+  StoredObject table (apps/core/models.py) instead of listing the bucket
+- Downloads can be streamed: ObjectReader reads an object as a seekable
+  file, fetching the body lazily and resuming with Range requests
+"""
+
+import base64
+import io
+import logging
+import os
+import random
+import threading
+import time
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+from urllib.parse import quote
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying; everything else is returned / raised at once
+RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+# Longest Retry-After we are willing to honour, in seconds
+_MAX_RETRY_AFTER = 10.0
+
+TUS_VERSION = '1.0.0'
+
+# Forward seeks up to this far read through the open download instead of
+# starting a new ranged request
+_SEEK_THROUGH = 256 * 1024
+
+
+def get_storage_config() -> Dict:
+    """settings.SUPABASE_STORAGE with defaults."""
+    config = {
+        'URL': '',
+        'TIMEOUT': 30.0,
+        'CONNECT_TIMEOUT': 5.0,
+        'MAX_RETRIES': 3,
+        'RETRY_BACKOFF': 0.5,
+        'MAX_CONNECTIONS': 10,
+        'KEEPALIVE_EXPIRY': 60.0,
+        'RESUMABLE_THRESHOLD': 6 * 1024 * 1024,
+        'CHUNK_SIZE': 6 * 1024 * 1024,
+        'CACHE_CONTROL': 3600,
+        'INDEX_ENABLED': False,
+    }
+    config.update(getattr(settings, 'SUPABASE_STORAGE', {}))
+    return config
+
+
+class StorageError(Exception):
+    """A storage request failed (after retries)."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class StorageClient:
+    """
+    Supabase Storage REST client on a shared httpx connection pool.
+
+    Thread-safe; one instance is meant to serve the whole process (see
+    get_storage_client()).
+    """
+
+    def __init__(
+        self,
+        url: str,
+        key: str,
+        timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+        max_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        resumable_threshold: int = 6 * 1024 * 1024,
+        chunk_size: int = 6 * 1024 * 1024,
+        cache_control: int = 3600
+    ):
+        """
+        Args:
+            url: Project URL (the Storage API lives under /storage/v1)
+            key: API key sent as bearer token
+            timeout: Read / write / pool timeout per request, in seconds
+            connect_timeout: Connection setup timeout, in seconds
+            max_retries: Retries after the first attempt of a request
+            retry_backoff: First retry delay; doubles on every retry
+            max_connections: Connection pool size (all kept alive)
+            keepalive_expiry: Idle seconds before a pooled connection is closed
+            resumable_threshold: Uploads of at least this many bytes use the
+                resumable endpoint
+            chunk_size: Resumable upload chunk size (Supabase requires 6 MB)
+            cache_control: max-age sent with uploaded objects
+        """
+        self.url = url.rstrip('/')
+        self.storage_url = f"{self.url}/storage/v1"
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.resumable_threshold = resumable_threshold
+        self.chunk_size = chunk_size
+        self.cache_control = cache_control
+
+        self.session = httpx.Client(
+            headers={'Authorization': f'Bearer {key}', 'apikey': key},
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive_expiry
+            ),
+        )
+
+    def close(self):
+        self.session.close()
+
+    # ------------------------------------------------------------------
+    # Objects
+    # ------------------------------------------------------------------
+
+    def object_url(self, bucket: str, name: str) -> str:
+        return f"{self.storage_url}/object/{quote(bucket)}/{quote(name)}"
+
+    def public_url(self, bucket: str, name: str) -> str:
+        return f"{self.storage_url}/object/public/{quote(bucket)}/{quote(name)}"
+
+    def upload(
+        self,
+        bucket: str,
+        name: str,
+        content: Union[bytes, BinaryIO],
+        content_type: str = 'application/octet-stream',
+        upsert: bool = False
+    ):
+        """
+        Upload an object.
+
+        Args:
+            bucket: Bucket name
+            name: Object path inside the bucket
+            content: Bytes, or a binary file object (read from its current
+                position; large seekable files are streamed in chunks)
+            content_type: MIME type stored with the object
+            upsert: Overwrite an existing object instead of failing
+
+        Raises:
+            StorageError: The upload failed
+        """
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            data, size = bytes(content), len(content)
+        else:
+            size = _remaining_size(content)
+            data = None
+            if size is None:
+                data = content.read()
+                size = len(data)
+
+        if size >= self.resumable_threshold:
+            fileobj = content if data is None else _BytesReader(data)
+            self._upload_resumable(bucket, name, fileobj, size, content_type, upsert)
+            return
+
+        if data is None:
+            data = content.read()
+        headers = {
+            'Content-Type': content_type,
+            'Cache-Control': f'max-age={self.cache_control}',
+            'x-upsert': 'true' if upsert else 'false',
+        }
+        self._request(
+            'POST', self.object_url(bucket, name), headers=headers, content=data,
+            duplicate_ok=not upsert
+        )
+
+    def download(self, bucket: str, name: str) -> bytes:
+        """Object contents; raises StorageError (404 when missing)."""
+        return self._request('GET', self.object_url(bucket, name)).content
+
+    def open_stream(self, bucket: str, name: str, start: int = 0) -> httpx.Response:
+        """
+        Start downloading an object from byte start without reading the body.
+
+        The caller reads the body (iter_bytes()) and must close the response.
+        A server that ignores the Range header answers 200 with the whole
+        object instead of 206.
+
+        Raises:
+            StorageError: Request failed (404 when missing, 416 when start
+                is past the end)
+        """
+        # identity: Content-Length / Content-Range must count the stored bytes
+        headers = {'Accept-Encoding': 'identity'}
+        if start:
+            headers['Range'] = f'bytes={start}-'
+        return self._request('GET', self.object_url(bucket, name), headers=headers, stream=True)
+
+    def object_size(self, bucket: str, name: str) -> int:
+        """Object size in bytes from a HEAD request."""
+        response = self._request(
+            'HEAD', self.object_url(bucket, name), headers={'Accept-Encoding': 'identity'}
+        )
+        return int(response.headers['Content-Length'])
+
+    def remove(self, bucket: str, names: List[str]) -> List[Dict]:
+        """Delete objects; returns the objects that were deleted."""
+        return self._request(
+            'DELETE', f"{self.storage_url}/object/{quote(bucket)}",
+            json={'prefixes': list(names)}
+        ).json()
+
+    def list(self, bucket: str, prefix: str = '', limit: int = 100, offset: int = 0) -> List[Dict]:
+        """One page of the objects (and folders) directly under prefix."""
+        return self._request(
+            'POST', f"{self.storage_url}/object/list/{quote(bucket)}",
+            json={
+                'prefix': prefix,
+                'limit': limit,
+                'offset': offset,
+                'sortBy': {'column': 'name', 'order': 'asc'},
+            }
+        ).json()
+
+    def iter_objects(self, bucket: str, prefix: str = '', page_size: int = 1000) -> Iterator[Dict]:
+        """Every entry directly under prefix, fetched page by page."""
+        offset = 0
+        while True:
+            page = self.list(bucket, prefix=prefix, limit=page_size, offset=offset)
+            yield from page
+            if len(page) < page_size:
+                return
+            offset += page_size
+
+    def walk(self, bucket: str, prefix: str = '', page_size: int = 1000) -> Iterator[Tuple[str, Dict]]:
+        """(path, entry) for every object under prefix, descending into folders."""
+        folders = [prefix.strip('/')]
+        while folders:
+            folder = folders.pop()
+            for entry in self.iter_objects(bucket, prefix=folder, page_size=page_size):
+                path = f"{folder}/{entry['name']}" if folder else entry['name']
+                if entry.get('id') is None:
+                    # Folders are listed without an id
+                    folders.append(path)
+                else:
+                    yield path, entry
+
+    # ------------------------------------------------------------------
+    # Resumable (TUS) uploads
+    # ------------------------------------------------------------------
+
+    def _upload_resumable(
+        self,
+        bucket: str,
+        name: str,
+        fileobj: BinaryIO,
+        size: int,
+        content_type: str,
+        upsert: bool
+    ):
+        """Upload in chunk_size pieces through /upload/resumable."""
+        start = fileobj.tell()
+        metadata = {
+            'bucketName': bucket,
+            'objectName': name,
+            'contentType': content_type,
+            'cacheControl': str(self.cache_control),
+        }
+        response = self._request(
+            'POST', f"{self.storage_url}/upload/resumable",
+            headers={
+                'Tus-Resumable': TUS_VERSION,
+                'Upload-Length': str(size),
+                'Upload-Metadata': ','.join(
+                    f"{k} {base64.b64encode(v.encode()).decode()}" for k, v in metadata.items()
+                ),
+                'x-upsert': 'true' if upsert else 'false',
+            },
+            duplicate_ok=not upsert
+        )
+        if response.status_code != 201:
+            # Duplicate on a retried create: an earlier attempt got through
+            return
+        location = str(response.url.join(response.headers['Location']))
+
+        offset = 0
+        failures = 0
+        while offset < size:
+            fileobj.seek(start + offset)
+            chunk = fileobj.read(self.chunk_size)
+            try:
+                response = self.session.patch(location, content=chunk, headers={
+                    'Tus-Resumable': TUS_VERSION,
+                    'Upload-Offset': str(offset),
+                    'Content-Type': 'application/offset+octet-stream',
+                })
+                if response.status_code == 204:
+                    offset = int(response.headers['Upload-Offset'])
+                    failures = 0
+                    continue
+                if response.status_code not in RETRY_STATUSES and response.status_code != 409:
+                    raise StorageError(
+                        f"Resumable upload of {name} failed: HTTP {response.status_code} {response.text[:200]}",
+                        response.status_code
+                    )
+                error = f"HTTP {response.status_code}"
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {e}"
+
+            failures += 1
+            if failures > self.max_retries:
+                raise StorageError(f"Resumable upload of {name} failed at byte {offset}: {error}")
+            self._sleep_before_retry(failures - 1)
+            # The server may have stored part of the chunk; continue from there
+            offset = self._resumable_offset(location)
+            logger.warning(f"[WARNING] Resuming upload of {name} at byte {offset} after {error}")
+
+    def _resumable_offset(self, location: str) -> int:
+        response = self._request('HEAD', location, headers={'Tus-Resumable': TUS_VERSION})
+        return int(response.headers['Upload-Offset'])
+
+    # ------------------------------------------------------------------
+    # Requests with retries
+    # ------------------------------------------------------------------
+
+    def _request(
+        self, method: str, url: str, duplicate_ok: bool = False, stream: bool = False, **kwargs
+    ) -> httpx.Response:
+        """
+        Send a request, retrying transport errors and RETRY_STATUSES.
+
+        Args:
+            duplicate_ok: Treat "already exists" on a retry as success (the
+                earlier attempt was stored but its response was lost)
+            stream: Return a successful response before reading its body
+
+        Raises:
+            StorageError: Non-2xx response, or retries exhausted
+        """
+        attempt = 0
+        while True:
+            try:
+                request = self.session.build_request(method, url, **kwargs)
+                response = self.session.send(request, stream=stream)
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise StorageError(f"{method} {url} failed: {type(e).__name__}: {e}") from e
+                logger.warning(f"[WARNING] {method} {url}: {type(e).__name__}, retrying")
+                self._sleep_before_retry(attempt)
+                attempt += 1
+                continue
+
+            if response.is_success:
+                return response
+            if stream:
+                # Error bodies are short; read them and release the connection
+                try:
+                    response.read()
+                except httpx.TransportError:
+                    pass
+                response.close()
+            if duplicate_ok and attempt > 0 and _is_duplicate(response):
+                return response
+            if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                raise StorageError(
+                    f"{method} {url} failed: HTTP {response.status_code} {response.text[:200]}",
+                    _status_code(response)
+                )
+
+            logger.warning(f"[WARNING] {method} {url}: HTTP {response.status_code}, retrying")
+            self._sleep_before_retry(attempt, response.headers.get('Retry-After'))
+            attempt += 1
+
+    def _sleep_before_retry(self, attempt: int, retry_after: Optional[str] = None):
+        delay = self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.0)
+        if retry_after:
+            try:
+                delay = max(delay, min(float(retry_after), _MAX_RETRY_AFTER))
+            except ValueError:
+                pass
+        time.sleep(delay)
+
+
+class ObjectReader(io.RawIOBase):
+    """
+    Seekable, read-only file over a stored object, streamed as it is read.
+
+    The body comes from one GET response, so reading the object front to
+    back costs one request and never holds more than a network chunk.
+    Seeking elsewhere drops that response; the next read resumes with a
+    Range request from the new position. A connection lost mid-body is
+    resumed the same way (up to the client's max_retries).
+
+    Wrap it in io.BufferedReader for small reads (see SupabaseFile).
+    """
+
+    def __init__(self, client: StorageClient, bucket: str, name: str):
+        """Sends the first GET, so a missing object raises StorageError here."""
+        super().__init__()
+        self.client = client
+        self.bucket = bucket
+        self.name = name
+        self._pos = 0
+        self._size: Optional[int] = None
+        self._response: Optional[httpx.Response] = None
+        self._chunks: Optional[Iterator[bytes]] = None
+        self._pending = memoryview(b'')
+        self._skip = 0
+        self._open_at(0)
+
+    @property
+    def size(self) -> int:
+        """Object size (HEAD request if no response has reported it)."""
+        if self._size is None:
+            self._size = self.client.object_size(self.bucket, self.name)
+        return self._size
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError(f"invalid whence ({whence})")
+        if pos < 0:
+            raise ValueError(f"negative seek position {pos}")
+
+        if pos != self._pos:
+            if self._chunks is not None and 0 < pos - self._pos <= _SEEK_THROUGH:
+                self._skip += pos - self._pos
+            else:
+                self._close_response()
+            self._pos = pos
+        return pos
+
+    def readinto(self, buffer) -> int:
+        if self._size is not None and self._pos >= self._size:
+            return 0
+        if self._chunks is None:
+            self._open_at(self._pos)
+
+        failures = 0
+        while True:
+            if not self._pending:
+                try:
+                    self._pending = memoryview(next(self._chunks))
+                except StopIteration:
+                    return 0
+                except httpx.TransportError as e:
+                    failures += 1
+                    if failures > self.client.max_retries:
+                        raise StorageError(f"Download of {self.bucket}/{self.name} failed: {e}") from e
+                    logger.warning(
+                        f"[WARNING] Download of {self.bucket}/{self.name} interrupted at byte "
+                        f"{self._pos}, resuming: {type(e).__name__}"
+                    )
+                    self._open_at(self._pos)
+                    continue
+
+            if self._skip:
+                skipped = min(self._skip, len(self._pending))
+                self._pending = self._pending[skipped:]
+                self._skip -= skipped
+                continue
+
+            n = min(len(buffer), len(self._pending))
+            buffer[:n] = self._pending[:n]
+            self._pending = self._pending[n:]
+            self._pos += n
+            return n
+
+    def close(self):
+        self._close_response()
+        super().close()
+
+    def _open_at(self, pos: int):
+        """Start a download at pos; the body is read by readinto()."""
+        self._close_response()
+        response = self.client.open_stream(self.bucket, self.name, pos)
+        if response.status_code == 206:
+            total = response.headers.get('Content-Range', '').rpartition('/')[2]
+            if total.isdigit():
+                self._size = int(total)
+        else:
+            length = response.headers.get('Content-Length', '')
+            if length.isdigit():
+                self._size = int(length)
+            # Range ignored: the body starts at byte 0
+            self._skip = pos
+        self._response = response
+        self._chunks = response.iter_bytes()
+
+    def _close_response(self):
+        if self._response is not None:
+            self._response.close()
+        self._response = None
+        self._chunks = None
+        self._pending = memoryview(b'')
+        self._skip = 0
+
+
+class _BytesReader:
+    """Minimal seekable reader over bytes (avoids copying into BytesIO)."""
+
+    def __init__(self, data: bytes):
+        self._view = memoryview(data)
+        self._pos = 0
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, pos: int):
+        self._pos = pos
+
+    def read(self, n: int = -1) -> bytes:
+        end = len(self._view) if n < 0 else self._pos + n
+        chunk = self._view[self._pos:end].tobytes()
+        self._pos += len(chunk)
+        return chunk
+
+
+def _remaining_size(fileobj) -> Optional[int]:
+    """Bytes left from the current position, or None when not seekable."""
+    try:
+        pos = fileobj.tell()
+        end = fileobj.seek(0, os.SEEK_END)
+        fileobj.seek(pos)
+        return end - pos
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _status_code(response: httpx.Response) -> int:
+    """HTTP status, or the one Supabase reports in the JSON error body."""
+    try:
+        return int(response.json().get('statusCode', response.status_code))
+    except (ValueError, AttributeError, TypeError):
+        return response.status_code
+
+
+def _is_duplicate(response: httpx.Response) -> bool:
+    # Supabase answers duplicates with 409, or 400 + {"statusCode": "409"}
+    return response.status_code == 409 or _status_code(response) == 409
+
+
+_client: Optional[StorageClient] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
+
+def get_storage_client() -> Optional[StorageClient]:
+    """
+    Process-wide StorageClient, or None when Supabase is not configured.
+
+    Created on first use; a forked worker gets its own pool rather than the
+    parent's sockets.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            config = get_storage_config()
+            url = config['URL'] or getattr(settings, 'SUPABASE_URL', '')
+            key = getattr(settings, 'SUPABASE_KEY', '')
+            if not url or not key:
+                return None
+            _client = StorageClient(
+                url,
+                key,
+                timeout=config['TIMEOUT'],
+                connect_timeout=config['CONNECT_TIMEOUT'],
+                max_retries=config['MAX_RETRIES'],
+                retry_backoff=config['RETRY_BACKOFF'],
+                max_connections=config['MAX_CONNECTIONS'],
+                keepalive_expiry=config['KEEPALIVE_EXPIRY'],
+                resumable_threshold=config['RESUMABLE_THRESHOLD'],
+                chunk_size=config['CHUNK_SIZE'],
+                cache_control=config['CACHE_CONTROL'],
+            )
+            _client_pid = pid
+            logger.info(f"[INFO] Supabase storage client ready ({_client.storage_url})")
+    return _client
+
+
+def reset_storage_client():
+    """Close and forget the shared client (e.g. after changing settings in tests)."""
+    global _client, _client_pid
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
@@ -1,32 +1,110 @@
 """
 Supabase Storage Backend for Django
 Handles image uploads to Supabase Storage buckets
+
+All instances share one pooled HTTP client (config/storage_client.py), so
+constructing a storage per model field costs nothing and uploads reuse
+kept-alive connections.
+
+With SUPABASE_STORAGE['INDEX_ENABLED'], exists() and size() read the
+StoredObject index (apps/core/models.py) that _save() / delete() maintain,
+instead of listing the whole bucket.
+
+With STORAGE_WRITE_BEHIND['ENABLED'], _save() spools the file to local disk
+and queues the upload (apps/core/upload_queue.py); spooled names are served
+from disk until the background upload has finished. A generated name that is
+already spooled or indexed gets a random suffix instead of replacing it.
+
+_open() streams objects instead of downloading them whole (SupabaseFile).
+With STORAGE_READ_CACHE['ENABLED'], objects read once are kept in a local
+size-bounded LRU cache (config/storage_cache.py).
 """
+import io
+import logging
 import os
-from io import BytesIO
+from django.core.files.base import File
 from django.core.files.storage import Storage
 from django.conf import settings
-from supabase import create_client
+from django.db import DatabaseError
+from django.urls import reverse
 from datetime import datetime
 
+from config.storage_cache import get_read_cache
+from config.storage_client import ObjectReader, StorageError, get_storage_client, get_storage_config
+
+logger = logging.getLogger(__name__)
+
+# Read buffer of SupabaseFile; small reads (image headers) share one fetch
+_READ_BUFFER_SIZE = 64 * 1024
+
+
+def index_object(bucket, name, size, content_type):
+    """Record a stored object in the metadata index (when enabled)."""
+    if not get_storage_config()['INDEX_ENABLED']:
+        return
+    from apps.core.models import StoredObject
+    try:
+        StoredObject.objects.update_or_create(
+            bucket=bucket, name=name,
+            defaults={'size': size, 'content_type': content_type}
+        )
+    except DatabaseError as e:
+        # A stale entry is fixed by reconcile_storage_index; keep the upload
+        logger.error(f"[ERROR] Could not index {bucket}/{name}: {e}")
+
+
+class SupabaseFile(File):
+    """
+    An object in Supabase Storage, streamed as it is read.
+
+    read(n), seek() and chunks() fetch only what they need (ObjectReader);
+    read() with no size still loads the whole object. Reopening a closed
+    file starts a new download.
+    """
+
+    def __init__(self, reader: ObjectReader, name):
+        super().__init__(io.BufferedReader(reader, _READ_BUFFER_SIZE), name)
+        self.mode = 'rb'
+        self._reader = reader
+
+    @property
+    def size(self):
+        return self._reader.size
+
+    def open(self, mode=None):
+        if not self.closed:
+            self.seek(0)
+        else:
+            reader = self._reader
+            self._reader = ObjectReader(reader.client, reader.bucket, reader.name)
+            self.file = io.BufferedReader(self._reader, _READ_BUFFER_SIZE)
+        return self
+
 
 class SupabaseStorage(Storage):
     """Custom storage backend for Supabase Storage"""
 
     def __init__(self, bucket_name='soil-images'):
         self.bucket_name = bucket_name
-        try:
-            self.supabase = create_client(
-                settings.SUPABASE_URL,
-                settings.SUPABASE_KEY
-            )
-            self.base_url = f"{settings.SUPABASE_URL}/storage/v1/object/public/{bucket_name}"
-        except Exception as e:
-            # Fallback to None if Supabase fails to initialize
-            print(f"[WARNING] Supabase storage initialization failed: {e}")
-            print("[INFO] Will use local file storage instead")
-            self.supabase = None
-            self.base_url = None
+
+    @property
+    def client(self):
+        """Shared storage client, or None to use local file storage."""
+        return get_storage_client()
+
+    @property
+    def index_enabled(self):
+        return get_storage_config()['INDEX_ENABLED']
+
+    def _index(self):
+        """StoredObject rows of this bucket (imported lazily: models import this module)."""
+        from apps.core.models import StoredObject
+        return StoredObject.objects.filter(bucket=self.bucket_name)
+
+    def _spooled_path(self, name):
+        """Local path while name waits in the write-behind spool, else None."""
+        from apps.core.upload_queue import is_spooled, spool_path
+        return spool_path(self.bucket_name, name) if is_spooled(self.bucket_name, name) else None
 
     def _save(self, name, content):
         """
@@ -35,92 +113,173 @@ class SupabaseStorage(Storage):
         # Generate unique filename
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"{timestamp}_{name}"
+        while True:
+            try:
+                return self._store(filename, name, content)
+            except FileExistsError:
+                # Same name saved in the same second and not uploaded yet
+                file_root, file_ext = os.path.splitext(filename)
+                filename = self.get_available_name(self.get_alternative_name(file_root, file_ext))
 
-        # Read file content
-        if hasattr(content, 'read'):
-            file_content = content.read()
-        else:
-            file_content = content
+    def save_exact(self, name, content):
+        """
+        Save content under exactly this name, replacing any existing file.
 
+        For files with deterministic names, such as soil image derivatives;
+        save() would prefix a timestamp.
+        """
+        name = self._store(name, name, content, upsert=True)
+        # A cached copy would still hold the old content
+        cache = get_read_cache()
+        if cache is not None:
+            cache.invalidate(self.bucket_name, name)
+        return name
+
+    def _store(self, filename, local_name, content, upsert=False):
+        """Upload content as filename, or save it locally as local_name."""
         # Try Supabase if available
-        if self.supabase:
+        client = self.client
+        if client:
+            from apps.core.upload_queue import enqueue_upload, get_write_behind_config
+            if get_write_behind_config()['ENABLED']:
+                if not upsert and self.index_enabled and self._index().filter(name=filename).exists():
+                    # The queue uploads with upsert; never let it replace an object
+                    raise FileExistsError(f"{self.bucket_name}/{filename} already exists")
+                try:
+                    # Spool locally; the upload queue pushes it to Supabase
+                    return enqueue_upload(
+                        self.bucket_name, filename, content, self._get_content_type(local_name),
+                        replace=upsert
+                    )
+                except FileExistsError:
+                    raise
+                except (OSError, DatabaseError) as e:
+                    logger.error(f"[ERROR] Could not queue upload, uploading directly: {e}")
+
             try:
-                # Upload to Supabase Storage
-                result = self.supabase.storage.from_(self.bucket_name).upload(
-                    path=filename,
-                    file=file_content,
-                    file_options={"content-type": self._get_content_type(name)}
+                # Large files are streamed in chunks; small ones sent in one request
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                content_type = self._get_content_type(local_name)
+                client.upload(
+                    self.bucket_name,
+                    filename,
+                    content if hasattr(content, 'read') else bytes(content),
+                    content_type=content_type,
+                    upsert=upsert
                 )
+                size = content.size if hasattr(content, 'size') else len(content)
+                index_object(self.bucket_name, filename, size, content_type)
                 return filename
-            except Exception as e:
-                print(f"Error uploading to Supabase: {e}")
+            except StorageError as e:
+                logger.error(f"[ERROR] Error uploading to Supabase: {e}")
 
         # Fallback to local filesystem storage
         from django.core.files.storage import FileSystemStorage
-        from django.conf import settings
         local_storage = FileSystemStorage(location=settings.MEDIA_ROOT)
 
         # Reset content for local storage
         if hasattr(content, 'seek'):
             content.seek(0)
 
-        return local_storage.save(name, content)
+        if upsert:
+            local_storage.delete(local_name)
+        return local_storage.save(local_name, content)
 
     def _open(self, name, mode='rb'):
         """
         Open file from Supabase Storage
+
+        Returns a SupabaseFile that downloads the object as it is read, or
+        the local copy when the read cache holds it.
         """
+        path = self._spooled_path(name)
+        if path:
+            try:
+                return open(path, 'rb')
+            except FileNotFoundError:
+                # Uploaded in the meantime
+                pass
+
+        cache = get_read_cache()
+        if cache is not None:
+            cached = cache.open(self.bucket_name, name)
+            if cached is not None:
+                return File(cached)
         try:
-            # Download from Supabase
-            response = self.supabase.storage.from_(self.bucket_name).download(name)
-            return BytesIO(response)
-        except Exception as e:
-            print(f"Error downloading from Supabase: {e}")
+            # Sends the GET; the body is streamed on read
+            reader = ObjectReader(self.client, self.bucket_name, name)
+            if cache is not None and reader.size <= cache.max_object_size:
+                try:
+                    return File(cache.fill(self.bucket_name, name, reader))
+                except OSError as e:
+                    logger.warning(f"[WARNING] Could not cache {self.bucket_name}/{name}: {e}")
+                    reader.seek(0)
+            return SupabaseFile(reader, name)
+        except (StorageError, AttributeError) as e:
+            logger.error(f"[ERROR] Error downloading from Supabase: {e}")
             return None
 
     def exists(self, name):
         """
         Check if file exists in Supabase Storage
         """
+        if self._spooled_path(name):
+            return True
+        if self.client and self.index_enabled:
+            return self._index().filter(name=name).exists()
         try:
-            files = self.supabase.storage.from_(self.bucket_name).list()
-            return any(f['name'] == name for f in files)
-        except:
+            return any(f['name'] == name for f in self.client.iter_objects(self.bucket_name))
+        except (StorageError, AttributeError):
             return False
 
     def url(self, name):
         """
         Return public URL for file
         """
-        if self.base_url:
-            return f"{self.base_url}/{name}"
+        if self._spooled_path(name):
+            # Not in Supabase yet; served from the spool directory
+            return reverse('core:spooled_upload', args=[self.bucket_name, name])
+        client = self.client
+        if client:
+            return client.public_url(self.bucket_name, name)
         else:
             # Fallback to local media URL
-            from django.conf import settings
             return f"{settings.MEDIA_URL}{name}"
 
     def delete(self, name):
         """
         Delete file from Supabase Storage
         """
+        from apps.core.upload_queue import cancel_upload
+        cancel_upload(self.bucket_name, name)
+        cache = get_read_cache()
+        if cache is not None:
+            cache.invalidate(self.bucket_name, name)
         try:
-            self.supabase.storage.from_(self.bucket_name).remove([name])
+            self.client.remove(self.bucket_name, [name])
+            if self.index_enabled:
+                self._index().filter(name=name).delete()
             return True
-        except Exception as e:
-            print(f"Error deleting from Supabase: {e}")
+        except (StorageError, AttributeError) as e:
+            logger.error(f"[ERROR] Error deleting from Supabase: {e}")
             return False
 
     def size(self, name):
         """
         Return file size
         """
+        path = self._spooled_path(name)
+        if path:
+            return os.path.getsize(path)
+        if self.client and self.index_enabled:
+            return self._index().filter(name=name).values_list('size', flat=True).first() or 0
         try:
-            files = self.supabase.storage.from_(self.bucket_name).list()
-            for f in files:
+            for f in self.client.iter_objects(self.bucket_name):
                 if f['name'] == name:
-                    return f.get('metadata', {}).get('size', 0)
+                    return (f.get('metadata') or {}).get('size', 0)
             return 0
-        except:
+        except (StorageError, AttributeError):
             return 0
 
     def _get_content_type(self, name):
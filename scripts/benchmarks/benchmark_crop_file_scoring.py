@@ -0,0 +1,128 @@
+"""
+Benchmark streaming crop file scoring (/predictions/api/crop/score-file/).
+
+Writes random soil tests with the extract_test_samples.py columns to a
+temporary CSV (and Parquet, when pyarrow is installed) for every row count,
+then scores each file in a fresh process with the same reader/writer the
+endpoint uses. Prints rows/sec and how much the process's peak RSS grew
+while scoring (after loading Django and the model), which should stay flat
+as the row count grows.
+
+Usage:
+    python scripts/benchmarks/benchmark_crop_file_scoring.py --rows 10000,100000,1000000
+"""
+
+import argparse
+import csv
+import multiprocessing as mp
+import os
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from apps.predictions.ml_services.crop_predictor import FEATURE_KEYS, FEATURE_RANGES
+
+COLUMNS = ('crop',) + FEATURE_KEYS
+
+
+def write_inputs(directory: Path, n_rows: int, chunk: int = 100000):
+    """Random in-range rows as CSV (and Parquet if pyarrow is available)."""
+    rng = np.random.default_rng(0)
+    lows, highs = np.asarray(FEATURE_RANGES).T
+    csv_path = directory / f'{n_rows}.csv'
+    parquet_path = directory / f'{n_rows}.parquet'
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        pa = None
+        parquet_path = None
+
+    parquet_writer = None
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for start in range(0, n_rows, chunk):
+            X = rng.uniform(lows, highs, size=(min(chunk, n_rows - start), len(FEATURE_KEYS))).round(1)
+            writer.writerows([['unknown'] + row for row in X.tolist()])
+            if pa is not None:
+                table = pa.table(
+                    [pa.array(['unknown'] * len(X))] + [pa.array(X[:, j]) for j in range(X.shape[1])],
+                    names=list(COLUMNS)
+                )
+                if parquet_writer is None:
+                    parquet_writer = pq.ParquetWriter(parquet_path, table.schema)
+                parquet_writer.write_table(table)
+    if parquet_writer is not None:
+        parquet_writer.close()
+    return csv_path, parquet_path
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _score_in_child(path, fmt, chunk_rows, results):
+    """Score one file to /dev/null in this (fresh) process."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+    from apps.predictions.crop_scoring import FeatureChunks, iter_scored_csv
+    from apps.predictions.ml_services.crop_predictor import get_crop_predictor
+
+    predictor = get_crop_predictor()
+    predictor.warmup()
+    baseline = _peak_rss_mb()
+
+    stats = {}
+    start = time.perf_counter()
+    with open(path, 'rb') as f, open(os.devnull, 'w') as out:
+        for piece in iter_scored_csv(FeatureChunks(f, fmt, chunk_rows), predictor, stats):
+            out.write(piece)
+    seconds = time.perf_counter() - start
+    results.put((seconds, stats['rows'], _peak_rss_mb() - baseline))
+
+
+def score(path: Path, fmt: str, chunk_rows: int):
+    """Returns (seconds, rows, peak RSS growth in MB)."""
+    ctx = mp.get_context('spawn')
+    results = ctx.Queue()
+    proc = ctx.Process(target=_score_in_child, args=(str(path), fmt, chunk_rows, results))
+    proc.start()
+    result = results.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark streaming crop file scoring')
+    parser.add_argument('--rows', default='10000,100000,1000000')
+    parser.add_argument('--chunk-rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    print("=" * 64)
+    print(f"CROP FILE SCORING (chunk of {args.chunk_rows} rows)")
+    print("=" * 64)
+    print(f"{'format':<8} {'rows':>9} {'input MB':>9} {'rows/sec':>10} {'RSS growth MB':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in (int(n) for n in args.rows.split(',')):
+            csv_path, parquet_path = write_inputs(Path(tmp), n_rows)
+            for fmt, path in (('csv', csv_path), ('parquet', parquet_path)):
+                if path is None:
+                    continue
+                seconds, rows, growth_mb = score(path, fmt, args.chunk_rows)
+                size_mb = path.stat().st_size / 1024 / 1024
+                print(f"{fmt:<8} {rows:>9} {size_mb:9.1f} {rows / seconds:10.0f} {growth_mb:14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark the streaming NDJSON crop endpoint (/predictions/api/crop/stream/).
+
+Logs in to a running server, sends --records random feature records as a
+chunked NDJSON request body and reads the NDJSON results as they stream
+back. Prints records/sec end to end and the time to the first result.
+
+The body is written from a separate thread over a raw socket: the server
+answers while the upload is still running, and a client that only reads
+once it has sent everything (as httpx does) deadlocks as soon as the
+socket buffers fill up.
+
+    gunicorn config.wsgi -w 1 -b 127.0.0.1:8000
+    python scripts/benchmarks/benchmark_crop_ndjson.py --create-user --records 200000
+
+--create-user creates the login user in the local database first (same
+settings as the server).
+"""
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import httpx
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from apps.predictions.ml_services.crop_predictor import FEATURE_KEYS, FEATURE_RANGES
+
+
+def create_user(username, password):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+    from django.contrib.auth import get_user_model
+    user, _ = get_user_model().objects.get_or_create(
+        username=username, defaults={'email': f'{username}@example.com'}
+    )
+    user.set_password(password)
+    user.save()
+
+
+def login(client, username, password):
+    """Log in through the login form and return the CSRF token."""
+    client.get('/accounts/login/')
+    token = client.cookies['csrftoken']
+    response = client.post('/accounts/login/', data={
+        'username': username, 'password': password, 'csrfmiddlewaretoken': token,
+    })
+    if response.status_code != 302 or 'sessionid' not in client.cookies:
+        raise SystemExit(f"Login as {username} failed (HTTP {response.status_code})")
+    return client.cookies['csrftoken']
+
+
+def record_lines(n_records, lines_per_chunk):
+    """Random in-range records, yielded as chunks of NDJSON lines."""
+    rng = np.random.default_rng(0)
+    lows, highs = np.asarray(FEATURE_RANGES).T
+    for start in range(0, n_records, lines_per_chunk):
+        X = rng.uniform(lows, highs, size=(min(lines_per_chunk, n_records - start), len(FEATURE_KEYS)))
+        yield ''.join(
+            json.dumps(dict(zip(FEATURE_KEYS, row), id=start + i)) + '\n'
+            for i, row in enumerate(X.round(1).tolist())
+        ).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the NDJSON crop prediction stream')
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--records', type=int, default=100000)
+    parser.add_argument('--lines-per-chunk', type=int, default=100,
+                        help='Records per chunk of the request body')
+    parser.add_argument('--username', default='loadtest')
+    parser.add_argument('--password', default='loadtest-password')
+    parser.add_argument('--create-user', action='store_true')
+    args = parser.parse_args()
+
+    if args.create_user:
+        create_user(args.username, args.password)
+
+    with httpx.Client(base_url=args.url) as client:
+        token = login(client, args.username, args.password)
+        cookie = '; '.join(f'{name}={value}' for name, value in client.cookies.items())
+
+    url = urlsplit(args.url)
+    sock = socket.create_connection((url.hostname, url.port or 80))
+    sock.sendall((
+        f'POST /predictions/api/crop/stream/ HTTP/1.1\r\n'
+        f'Host: {url.netloc}\r\n'
+        f'Content-Type: application/x-ndjson\r\n'
+        f'Transfer-Encoding: chunked\r\n'
+        f'X-CSRFToken: {token}\r\n'
+        f'Cookie: {cookie}\r\n'
+        f'Connection: close\r\n\r\n'
+    ).encode())
+
+    def upload():
+        for chunk in record_lines(args.records, args.lines_per_chunk):
+            sock.sendall(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+        sock.sendall(b'0\r\n\r\n')
+
+    received = errors = 0
+    first_result = None
+    start = time.perf_counter()
+    sender = threading.Thread(target=upload, daemon=True)
+    sender.start()
+
+    response = http.client.HTTPResponse(sock)
+    response.begin()
+    if response.status != 200:
+        raise SystemExit(f"HTTP {response.status}: {response.read()[:200]!r}")
+    for line in response:
+        if first_result is None:
+            first_result = time.perf_counter() - start
+        received += 1
+        if b'"error"' in line:
+            errors += 1
+    seconds = time.perf_counter() - start
+    sender.join()
+    sock.close()
+
+    print("=" * 60)
+    print(f"NDJSON CROP STREAM ({args.url})")
+    print("=" * 60)
+    print(f"Records sent:      {args.records}")
+    print(f"Results received:  {received} ({errors} errors)")
+    print(f"Time:              {seconds:.2f}s")
+    print(f"Throughput:        {received / seconds:,.0f} records/sec")
+    print(f"First result:      {first_result * 1000 if first_result else 0:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark batched soil classification against one-image-at-a-time.
+
+Classifies the sample soil images (repeated to --images) with classify()
+in a loop and with classify_batch() at several chunk sizes, and prints
+images/sec for each.
+
+Usage:
+    python scripts/benchmarks/benchmark_soil_batch.py --images 128
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import django
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from apps.predictions.ml_services.soil_classifier import get_soil_classifier
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark SoilClassifier.classify_batch')
+    parser.add_argument('--images', type=int, default=128)
+    parser.add_argument('--image-dir', default=str(BASE_DIR / 'datasets' / 'test_samples' / 'soil_images'))
+    parser.add_argument('--chunk-sizes', default='1,8,16,32')
+    parser.add_argument('--decode-workers', type=int, default=4)
+    args = parser.parse_args()
+
+    classifier = get_soil_classifier()
+    if not classifier.is_trained:
+        print("[ERROR] Soil classifier model not loaded")
+        sys.exit(1)
+
+    samples = sorted(str(p) for p in Path(args.image_dir).glob('*.jpg'))
+    paths = (samples * (args.images // len(samples) + 1))[:args.images]
+    classifier.warmup()
+
+    print("=" * 60)
+    print(f"SOIL CLASSIFICATION THROUGHPUT ({len(paths)} images)")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    for path in paths:
+        classifier.classify(path)
+    seconds = time.perf_counter() - start
+    print(f"classify() loop            {len(paths) / seconds:8.1f} images/sec")
+
+    for chunk_size in (int(c) for c in args.chunk_sizes.split(',')):
+        report = classifier.classify_batch(
+            paths, chunk_size=chunk_size, decode_workers=args.decode_workers
+        )
+        print(f"classify_batch(chunk={chunk_size:<3})   {report['images_per_sec']:8.1f} images/sec")
+
+
+if __name__ == '__main__':
+    main()
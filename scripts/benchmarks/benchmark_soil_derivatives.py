@@ -0,0 +1,121 @@
+"""
+Benchmark soil image derivatives: decode cost and bytes served.
+
+For each image, times decoding and resizing on the upload side with
+derivatives enabled:
+
+- separate: the classifier decodes the upload (draft 224, fast preprocess)
+  and the derivative pipeline decodes it a second time
+- shared:   one decode (build_derivatives), which is also the classifier
+  input
+
+then the time to encode the derivatives as JPEG and as WebP, and their size
+against the original. The forward pass is the same either way and is not
+included, so this runs without PyTorch or the trained model. Besides the bundled samples, a 12 MP
+phone-sized JPEG is made from the largest one.
+
+Usage:
+    python scripts/benchmarks/benchmark_soil_derivatives.py --rounds 20
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+import django
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from PIL import Image
+
+from apps.predictions.ml_services.soil_classifier import SoilClassifier, preprocess_array
+from apps.predictions.soil_derivatives import build_derivatives, get_sizes
+
+
+def encode_all(derivatives, fmt, quality):
+    """Encode the sizes that need their own file."""
+    return {
+        size: derivatives.encode(size, fmt, quality)
+        for size in derivatives.images if not derivatives.is_original(size)
+    }
+
+
+def separate(data):
+    """Classifier decode (draft 224, fast preprocess), then a second decode for the derivatives."""
+    preprocess_array(SoilClassifier._open_image(data, draft_size=224))
+    return build_derivatives(data)
+
+
+def shared(data):
+    """One decode for the derivatives and the classifier."""
+    derivatives = build_derivatives(data)
+    preprocess_array(derivatives.classifier_input)
+    return derivatives
+
+
+def ms_per_call(fn, rounds, *args):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(*args)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark soil image derivatives')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--quality', type=int, default=80)
+    parser.add_argument('--image-dir', default=str(BASE_DIR / 'datasets' / 'test_samples' / 'soil_images'))
+    args = parser.parse_args()
+
+    images = {p.name: p.read_bytes() for p in sorted(Path(args.image_dir).glob('*.jpg'))}
+    if not images:
+        print(f"[ERROR] No .jpg images found in {args.image_dir}")
+        sys.exit(1)
+
+    # A typical phone upload: 4032 x 3024 JPEG
+    largest = max(images.values(), key=lambda data: Image.open(io.BytesIO(data)).size)
+    buffer = io.BytesIO()
+    Image.open(io.BytesIO(largest)).convert('RGB').resize((4032, 3024), Image.BICUBIC).save(
+        buffer, format='JPEG', quality=90
+    )
+    images['phone_4032x3024.jpg'] = buffer.getvalue()
+
+    sizes = get_sizes()
+    print("=" * 100)
+    print(f"SOIL IMAGE DERIVATIVES (sizes {sizes}, quality {args.quality}, {args.rounds} rounds)")
+    print("=" * 100)
+    print(f"{'image':<22} {'pixels':>10} {'separate':>9} {'shared':>7} {'format':>7} {'encode':>7}   "
+          f"{'original':>8} " + ' '.join(f"{size:>7}" for size in sizes))
+    print(f"{'':<22} {'':>10} {'ms':>9} {'ms':>7} {'':>7} {'ms':>7}")
+
+    for name, data in images.items():
+        separate(data)
+        shared(data)
+        separate_ms = ms_per_call(separate, args.rounds, data)
+        shared_ms = ms_per_call(shared, args.rounds, data)
+        derivatives = build_derivatives(data)
+        width, height = derivatives.source_size
+
+        for fmt in ('JPEG', 'WEBP'):
+            encode_ms = ms_per_call(encode_all, args.rounds, derivatives, fmt, args.quality)
+            encoded = encode_all(derivatives, fmt, args.quality)
+            # "orig" where the original already fits the size and is served as is
+            sizes_kb = ' '.join(
+                f"{len(encoded[size]) / 1024:6.0f}K" if size in encoded else f"{'orig':>7}"
+                for size in sizes
+            )
+            if fmt == 'JPEG':
+                print(f"{name[:22]:<22} {f'{width}x{height}':>10} {separate_ms:9.1f} {shared_ms:7.1f} "
+                      f"{fmt:>7} {encode_ms:7.1f}   {len(data) / 1024:7.0f}K {sizes_kb}")
+            else:
+                print(f"{'':<22} {'':>10} {'':>9} {'':>7} {fmt:>7} {encode_ms:7.1f}   {'':>8} {sizes_kb}")
+
+
+if __name__ == '__main__':
+    main()
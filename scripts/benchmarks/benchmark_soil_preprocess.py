@@ -0,0 +1,107 @@
+"""
+Benchmark soil image decode + preprocess time at several source resolutions.
+
+Re-encodes a sample soil image as JPEGs of increasing size (up to a 12MP
+phone photo) and times, per image:
+
+- full:      full decode + convert('RGB') + torchvision transforms
+             (the default path; skipped if torchvision is not installed)
+- full+np:   full decode + single-pass resize/normalize (preprocess_array)
+- draft+np:  JPEG draft-mode decode + preprocess_array (SOIL_FAST_PREPROCESS)
+
+and reports the mean and max abs difference of the fast tensor from the
+full one (in normalized units; one 8-bit pixel level is ~0.017).
+
+Usage:
+    python scripts/benchmarks/benchmark_soil_preprocess.py --rounds 20
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+import django
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from PIL import Image
+
+from apps.predictions.ml_services.soil_classifier import SoilClassifier, preprocess_array
+
+RESOLUTIONS = [(640, 480), (1280, 960), (1920, 1440), (3024, 2268), (4032, 3024)]
+IMG_SIZE = 224
+
+
+def make_jpeg(source: Image.Image, size) -> bytes:
+    buffer = io.BytesIO()
+    source.resize(size, Image.BICUBIC).save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def time_per_image(fn, data: bytes, rounds: int) -> float:
+    fn(data)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(data)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark soil image decode + preprocess')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument(
+        '--image',
+        default=str(BASE_DIR / 'datasets' / 'test_samples' / 'soil_images' / 'Black_9.jpg')
+    )
+    args = parser.parse_args()
+
+    try:
+        from apps.predictions.ml_services.soil_classifier import build_soil_transform
+        transform = build_soil_transform(IMG_SIZE)
+    except ImportError:
+        transform = None
+        print("[WARNING] torchvision not installed; skipping the 'full' column")
+
+    source = SoilClassifier._open_image(args.image)
+
+    def full(data):
+        return transform(SoilClassifier._open_image(data)).numpy()
+
+    def full_np(data):
+        return preprocess_array(SoilClassifier._open_image(data), IMG_SIZE).transpose(2, 0, 1)
+
+    def draft_np(data):
+        img = SoilClassifier._open_image(data, draft_size=IMG_SIZE)
+        return preprocess_array(img, IMG_SIZE).transpose(2, 0, 1)
+
+    print("=" * 82)
+    print(f"SOIL DECODE + PREPROCESS (ms/image, {args.rounds} rounds)")
+    print("=" * 82)
+    print(f"{'source':>11} {'MP':>5} {'KB':>6} {'full':>8} {'full+np':>8} {'draft+np':>9} {'speedup':>8} {'mean diff':>9} {'max diff':>8}")
+
+    for size in RESOLUTIONS:
+        data = make_jpeg(source, size)
+        full_ms = time_per_image(full, data, args.rounds) if transform else None
+        full_np_ms = time_per_image(full_np, data, args.rounds)
+        draft_ms = time_per_image(draft_np, data, args.rounds)
+
+        reference = full(data) if transform else full_np(data)
+        diff = np.abs(reference - draft_np(data))
+        baseline = full_ms if full_ms is not None else full_np_ms
+
+        print(
+            f"{size[0]:>5}x{size[1]:<5} {size[0] * size[1] / 1e6:5.1f} {len(data) / 1024:6.0f} "
+            f"{full_ms if full_ms is not None else float('nan'):8.2f} {full_np_ms:8.2f} {draft_ms:9.2f} "
+            f"{baseline / draft_ms:7.1f}x {diff.mean():9.4f} {diff.max():8.3f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
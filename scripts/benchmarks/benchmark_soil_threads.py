@@ -0,0 +1,100 @@
+"""
+Benchmark soil classification throughput across worker x thread layouts.
+
+Each "worker" is a separate process (like a WSGI worker) that pins torch to
+T intra-op threads (0 = torch default, i.e. every core) and classifies the
+sample soil images through its own InferenceExecutor for --seconds. Prints
+aggregate images/sec and per-request latency for every layout, e.g. the
+oversubscribed 4x0 against the pinned 4x2 on an 8-core box.
+
+Usage:
+    python scripts/benchmarks/benchmark_soil_threads.py --layouts 1x8,2x4,4x2,8x1,4x0
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+
+def _worker(intra_op_threads, image_paths, seconds, barrier, results):
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    os.environ['SOIL_INTRA_OP_THREADS'] = str(intra_op_threads)
+    os.environ['SOIL_INTER_OP_THREADS'] = '1'
+
+    import django
+    django.setup()
+
+    from apps.predictions.ml_services.inference_executor import InferenceExecutor
+    from apps.predictions.ml_services.soil_classifier import get_soil_classifier
+
+    classifier = get_soil_classifier()
+    executor = InferenceExecutor(
+        name='bench', workers=1,
+        intra_op_threads=intra_op_threads, inter_op_threads=1
+    )
+    images = [Path(p).read_bytes() for p in image_paths]
+    executor.run(classifier.warmup)
+
+    barrier.wait()
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    i = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        executor.run(classifier.classify, images[i % len(images)])
+        latencies.append(time.perf_counter() - start)
+        i += 1
+    results.put(latencies)
+
+
+def run_layout(workers, threads, image_paths, seconds):
+    ctx = mp.get_context('spawn')
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=_worker, args=(threads, image_paths, seconds, barrier, results))
+        for _ in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    latencies = []
+    for _ in procs:
+        latencies.extend(results.get())
+    for p in procs:
+        p.join()
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+    return len(latencies) / seconds, p50, p95
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark soil throughput per worker x thread layout')
+    parser.add_argument('--layouts', default='1x8,2x4,4x2,8x1,4x0',
+                        help='Comma-separated WORKERSxINTRA_OP_THREADS (0 = torch default)')
+    parser.add_argument('--seconds', type=float, default=15)
+    parser.add_argument('--image-dir', default=str(BASE_DIR / 'datasets' / 'test_samples' / 'soil_images'))
+    args = parser.parse_args()
+
+    image_paths = sorted(str(p) for p in Path(args.image_dir).glob('*.jpg'))
+
+    print("=" * 60)
+    print(f"SOIL THROUGHPUT BY LAYOUT ({os.cpu_count()} CPUs, {args.seconds:.0f}s each)")
+    print("=" * 60)
+    print(f"{'workers':>7} x {'threads':<7} {'images/sec':>10} {'p50 ms':>8} {'p95 ms':>8}")
+    for layout in args.layouts.split(','):
+        workers, threads = (int(x) for x in layout.split('x'))
+        throughput, p50, p95 = run_layout(workers, threads, image_paths, args.seconds)
+        label = str(threads) if threads else 'all'
+        print(f"{workers:>7} x {label:<7} {throughput:10.1f} {p50:8.1f} {p95:8.1f}")
+
+
+if __name__ == '__main__':
+    main()
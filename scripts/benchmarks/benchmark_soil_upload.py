@@ -0,0 +1,94 @@
+"""
+Benchmark the soil upload decode path: temp file vs in-memory.
+
+Times the part of soil_classification_view that differs between the two
+approaches - getting an uploaded image into a decoded RGB PIL image. The
+forward pass is identical either way and is not included, so this runs
+without PyTorch or the trained model.
+
+- tempfile:  read upload -> write NamedTemporaryFile -> decode path -> unlink
+- in-memory: decode the upload buffer directly (SoilClassifier._open_image)
+
+Usage:
+    python scripts/benchmarks/benchmark_soil_upload.py --rounds 200
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import django
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+from apps.predictions.ml_services.soil_classifier import SoilClassifier
+
+
+def decode_via_tempfile(uploaded_file):
+    """The previous view flow."""
+    file_content = uploaded_file.read()
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
+        tmp_file.write(file_content)
+        tmp_file_path = tmp_file.name
+    try:
+        img = Image.open(tmp_file_path).convert('RGB')
+    finally:
+        os.unlink(tmp_file_path)
+    uploaded_file.seek(0)
+    return img
+
+
+def decode_in_memory(uploaded_file):
+    """The current view flow."""
+    return SoilClassifier._open_image(uploaded_file)
+
+
+def time_per_image(decode, uploads, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for uploaded_file in uploads:
+            decode(uploaded_file)
+    return (time.perf_counter() - start) / (rounds * len(uploads))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the soil upload decode path')
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--image-dir', default=str(BASE_DIR / 'datasets' / 'test_samples' / 'soil_images'))
+    args = parser.parse_args()
+
+    uploads = [
+        SimpleUploadedFile(p.name, p.read_bytes(), content_type='image/jpeg')
+        for p in sorted(Path(args.image_dir).glob('*.jpg'))
+    ]
+    if not uploads:
+        print(f"[ERROR] No .jpg images found in {args.image_dir}")
+        sys.exit(1)
+
+    # Warm the OS page cache and PIL plugins
+    time_per_image(decode_via_tempfile, uploads, 3)
+    time_per_image(decode_in_memory, uploads, 3)
+
+    via_tempfile = time_per_image(decode_via_tempfile, uploads, args.rounds)
+    in_memory = time_per_image(decode_in_memory, uploads, args.rounds)
+
+    print("=" * 60)
+    print(f"SOIL UPLOAD DECODE PATH ({len(uploads)} images x {args.rounds} rounds)")
+    print("=" * 60)
+    print(f"tempfile   {via_tempfile * 1000:8.3f} ms/image")
+    print(f"in-memory  {in_memory * 1000:8.3f} ms/image")
+    print(f"saved      {(via_tempfile - in_memory) * 1000:8.3f} ms/image "
+          f"({(1 - in_memory / via_tempfile) * 100:.1f}%)")
+
+
+if __name__ == '__main__':
+    main()
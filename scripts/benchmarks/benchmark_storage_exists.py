@@ -0,0 +1,108 @@
+"""
+Benchmark SupabaseStorage.exists() / size(): bucket listing vs metadata index.
+
+Fills the in-process stand-in storage server (scripts/testing/
+storage_standin_server.py) with --objects objects per run, builds the
+StoredObject index with `manage.py reconcile_storage_index` in a throwaway
+SQLite database, then times exists() and size() with the index off (list the
+bucket) and on (one indexed query). --latency-ms is added to every storage
+request to stand in for the round trip to Supabase.
+
+    python scripts/benchmarks/benchmark_storage_exists.py --objects 1000,10000,50000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BASE_DIR))
+sys.path.insert(0, str(BASE_DIR / 'scripts' / 'testing'))
+
+from storage_standin_server import StandInStorageServer
+
+BUCKET = 'soil-images'
+
+
+def time_calls(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark storage exists()/size() lookups')
+    parser.add_argument('--objects', default='1000,10000,50000',
+                        help='Comma-separated bucket sizes')
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--repeat', type=int, default=20, help='Lookups timed per measurement')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    from django.conf import settings
+    django.setup()
+
+    db_path = Path(tempfile.mkdtemp()) / 'storage_index.sqlite3'
+    settings.DATABASES['default'] = dict(
+        settings.DATABASES['default'], ENGINE='django.db.backends.sqlite3', NAME=str(db_path)
+    )
+    # App setup may already have connected to the configured database
+    from django.db import connections
+    connections['default'].close()
+    del connections['default']
+
+    from django.core.management import call_command
+    from config.supabase_storage import SoilImageStorage
+    from config.storage_client import reset_storage_client
+
+    call_command('migrate', verbosity=0)
+
+    server = StandInStorageServer(('127.0.0.1', 0), latency_ms=args.latency_ms)
+    server.serve_in_thread()
+    settings.SUPABASE_URL = server.url
+    settings.SUPABASE_KEY = 'local'
+    settings.SUPABASE_STORAGE = dict(getattr(settings, 'SUPABASE_STORAGE', {}), URL='')
+    reset_storage_client()
+    storage = SoilImageStorage()
+
+    print("=" * 78)
+    print(f"STORAGE exists()/size() (request latency +{args.latency_ms:g} ms)")
+    print("=" * 78)
+    print(f"{'objects':>8} {'list exists ms':>15} {'list size ms':>13} "
+          f"{'index exists ms':>16} {'index size ms':>14} {'reconcile s':>12}")
+
+    for n in (int(x) for x in args.objects.split(',')):
+        with server.lock:
+            server.objects.clear()
+            for i in range(n):
+                server.objects[(BUCKET, f'20250101_000000_{i:07d}.jpg')] = (b'', 'image/jpeg', time.time())
+        target = f'20250101_000000_{n - 1:07d}.jpg'  # sorts last: worst case for listing
+        missing = 'soil.jpg'  # what Django's get_available_name() checks on save
+
+        settings.SUPABASE_STORAGE['INDEX_ENABLED'] = False
+        repeat = max(1, args.repeat // max(1, n // 5000))
+        list_exists = time_calls(lambda: storage.exists(missing), repeat)
+        list_size = time_calls(lambda: storage.size(target), repeat)
+
+        start = time.perf_counter()
+        call_command('reconcile_storage_index', bucket=[BUCKET], verbosity=0, stdout=open(os.devnull, 'w'))
+        reconcile = time.perf_counter() - start
+
+        settings.SUPABASE_STORAGE['INDEX_ENABLED'] = True
+        assert storage.exists(target) and not storage.exists(missing)
+        index_exists = time_calls(lambda: storage.exists(missing), args.repeat * 10)
+        index_size = time_calls(lambda: storage.size(target), args.repeat * 10)
+
+        print(f"{n:>8} {list_exists:15.1f} {list_size:13.1f} "
+              f"{index_exists:16.3f} {index_size:14.3f} {reconcile:12.2f}")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark SupabaseStorage reads: whole download vs streaming vs read cache.
+
+Serves objects of --sizes MB from the stand-in storage server
+(scripts/testing/storage_standin_server.py, in a subprocess so its buffers
+are not counted) and measures, per object size, the time and peak Python
+memory (tracemalloc) of:
+
+- download: the old _open(), client.download() into BytesIO, then read
+- stream:   SupabaseStorage.open() + chunks() (ObjectReader)
+- range:    open(), seek to the middle and read 64 KB
+- cached:   open() + chunks() with STORAGE_READ_CACHE, second read (a hit)
+
+    python scripts/benchmarks/benchmark_storage_reads.py --sizes 1,8,32
+"""
+
+import argparse
+import io
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+STANDIN = BASE_DIR / 'scripts' / 'testing' / 'storage_standin_server.py'
+BUCKET = 'soil-images'
+RANGE_BYTES = 64 * 1024
+
+
+def measure(fn, repeat):
+    """Mean ms per call and peak traced MB over the calls."""
+    fn()  # warm the connection pool
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024)
+
+
+def start_server(latency_ms):
+    """Run the stand-in server in a subprocess; returns (process, url)."""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, str(STANDIN), '--port', str(port), '--latency-ms', str(latency_ms)],
+        stdout=subprocess.DEVNULL
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return process, f'http://127.0.0.1:{port}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark storage reads')
+    parser.add_argument('--sizes', default='1,8,32', help='Comma-separated object sizes in MB')
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--repeat', type=int, default=5, help='Reads timed per measurement')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    from django.conf import settings
+    django.setup()
+
+    from config.storage_cache import reset_read_cache
+    from config.storage_client import reset_storage_client
+    from config.supabase_storage import SoilImageStorage
+
+    server, url = start_server(args.latency_ms)
+    settings.SUPABASE_URL = url
+    settings.SUPABASE_KEY = 'local'
+    settings.SUPABASE_STORAGE = dict(getattr(settings, 'SUPABASE_STORAGE', {}), URL='')
+    reset_storage_client()
+    storage = SoilImageStorage()
+    cache_dir = tempfile.mkdtemp()
+
+    print("=" * 78)
+    print(f"STORAGE READS (request latency +{args.latency_ms:g} ms; ms / peak MB per read)")
+    print("=" * 78)
+    print(f"{'MB':>4} {'download':>16} {'stream':>16} {'range 64 KB':>16} {'cached':>16}")
+
+    for mb in (int(x) for x in args.sizes.split(',')):
+        name = f'bench_{mb}mb.jpg'
+        data = os.urandom(mb * 1024 * 1024)
+        storage.client.upload(BUCKET, name, data, content_type='image/jpeg', upsert=True)
+
+        def download():
+            f = io.BytesIO(storage.client.download(BUCKET, name))
+            for _ in iter(lambda: f.read(64 * 1024), b''):
+                pass
+
+        def stream():
+            with storage.open(name) as f:
+                for _ in f.chunks():
+                    pass
+
+        def ranged():
+            with storage.open(name) as f:
+                f.seek(len(data) // 2)
+                assert len(f.read(RANGE_BYTES)) == RANGE_BYTES
+
+        settings.STORAGE_READ_CACHE = {'ENABLED': False}
+        reset_read_cache()
+        results = [measure(download, args.repeat), measure(stream, args.repeat), measure(ranged, args.repeat)]
+
+        settings.STORAGE_READ_CACHE = {
+            'ENABLED': True, 'DIR': cache_dir, 'MAX_OBJECT_SIZE': 64 * 1024 * 1024
+        }
+        reset_read_cache()
+        results.append(measure(stream, args.repeat))  # the warm-up call fills the cache
+
+        print(f"{mb:>4} " + ' '.join(f"{ms:8.1f} /{peak:6.1f}" for ms, peak in results))
+
+    server.terminate()
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Benchmark soil image uploads: supabase-py client vs the pooled storage client.
+
+Runs scripts/testing/storage_standin_server.py in-process with a simulated
+connection setup cost (--connect-latency-ms, ~ a TLS handshake to the
+Supabase region) and request latency, then uploads the same image with
+
+- legacy: the storage3 client that supabase.create_client() builds and
+  SupabaseStorage used to create per instance (storage3 directly, so the
+  auth client's httpx requirements do not get in the way)
+- pooled: config.storage_client.StorageClient
+
+in four scenarios: back to back, from --threads concurrent threads, with
+--idle-s pauses between uploads (longer than httpx's default 5 s keep-alive)
+and with --fail-rate of the requests failing. A large upload then goes
+through the resumable path while chunks fail.
+
+    python scripts/benchmarks/benchmark_storage_upload.py --uploads 20
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BASE_DIR))
+sys.path.insert(0, str(BASE_DIR / 'scripts' / 'testing'))
+
+from storage_standin_server import StandInStorageServer
+
+KEY = 'stand.in.key'
+BUCKET = 'soil-images'
+
+
+def legacy_uploader(url):
+    from storage3 import create_client
+    headers = {'apikey': KEY, 'Authorization': f'Bearer {KEY}'}
+    bucket = create_client(f'{url}/storage/v1', headers, is_async=False).from_(BUCKET)
+
+    def upload(name, data):
+        bucket.upload(path=name, file=data, file_options={'content-type': 'image/jpeg'})
+    return upload
+
+
+def pooled_uploader(url, **kwargs):
+    from config.storage_client import StorageClient
+    client = StorageClient(url, KEY, **kwargs)
+
+    def upload(name, data):
+        client.upload(BUCKET, name, data, content_type='image/jpeg')
+    return upload
+
+
+def timed(server, uploader, data, uploads, threads=1, idle=0.0):
+    """
+    Upload `uploads` copies of data.
+
+    Returns (ok, seconds, new connections). With idle pauses, seconds only
+    counts the time spent uploading.
+    """
+    before = server.stats['connections']
+    tag = f"{time.monotonic_ns()}"
+
+    def one(i):
+        try:
+            uploader(f"{tag}_{i}.jpg", data)
+            return True
+        except Exception:
+            return False
+
+    if threads > 1:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            ok = sum(pool.map(one, range(uploads)))
+        return ok, time.perf_counter() - start, server.stats['connections'] - before
+
+    ok, busy = 0, 0.0
+    for i in range(uploads):
+        if i and idle:
+            time.sleep(idle)
+        start = time.perf_counter()
+        ok += one(i)
+        busy += time.perf_counter() - start
+    return ok, busy, server.stats['connections'] - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Supabase storage uploads')
+    parser.add_argument('--uploads', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--idle-s', type=float, default=6.0)
+    parser.add_argument('--idle-uploads', type=int, default=5)
+    parser.add_argument('--connect-latency-ms', type=float, default=100)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--fail-rate', type=float, default=0.1)
+    parser.add_argument('--large-mb', type=float, default=20)
+    parser.add_argument('--large-uploads', type=int, default=5)
+    parser.add_argument('--image', default=str(
+        BASE_DIR / 'datasets' / 'test_samples' / 'soil_images' / 'Black_9.jpg'
+    ))
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+    data = Path(args.image).read_bytes()
+    server = StandInStorageServer(
+        ('127.0.0.1', 0), latency_ms=args.latency_ms, connect_latency_ms=args.connect_latency_ms
+    )
+    server.serve_in_thread()
+    pooled_kwargs = {'retry_backoff': 0.05}
+
+    print("=" * 78)
+    print(f"STORAGE UPLOADS ({len(data) / 1024:.0f} KB image, connect +{args.connect_latency_ms:g} ms, "
+          f"request +{args.latency_ms:g} ms)")
+    print("=" * 78)
+    print(f"{'scenario':<30} {'client':<8} {'ok':>7} {'ms/upload':>10} {'uploads/s':>10} {'new conns':>10}")
+
+    scenarios = [
+        ('sequential', dict(uploads=args.uploads)),
+        (f'{args.threads} threads', dict(uploads=args.uploads, threads=args.threads)),
+        (f'{args.idle_s:g} s idle between uploads', dict(uploads=args.idle_uploads, idle=args.idle_s)),
+        (f'{args.fail_rate:.0%} requests fail', dict(uploads=args.uploads, fail_rate=args.fail_rate)),
+    ]
+    for name, options in scenarios:
+        server.fail_rate = options.pop('fail_rate', 0.0)
+        for label, make in (('legacy', legacy_uploader), ('pooled', pooled_uploader)):
+            uploader = make(server.url, **pooled_kwargs) if label == 'pooled' else make(server.url)
+            if not server.fail_rate:
+                uploader(f'warmup_{label}_{time.monotonic_ns()}.jpg', data)
+            ok, seconds, conns = timed(server, uploader, data, **options)
+            n = options['uploads']
+            print(f"{name:<30} {label:<8} {ok:>3}/{n:<3} {seconds / n * 1000:10.1f} "
+                  f"{n / seconds:10.1f} {conns:>10}")
+    server.fail_rate = 0.0
+
+    # Large uploads: the pooled client sends resumable chunks
+    large = (data * (int(args.large_mb * 1024 * 1024) // len(data) + 1))[:int(args.large_mb * 1024 * 1024)]
+    server.fail_rate = args.fail_rate
+    print()
+    print(f"{args.large_uploads} x {args.large_mb:g} MB uploads, {args.fail_rate:.0%} requests fail:")
+    for label, make in (('legacy', legacy_uploader), ('pooled', pooled_uploader)):
+        uploader = make(server.url, **pooled_kwargs) if label == 'pooled' else make(server.url)
+        failures = server.stats['failures']
+        ok, seconds, _ = timed(server, uploader, large, args.large_uploads)
+        print(f"  {label:<8} {ok}/{args.large_uploads} ok, {seconds / args.large_uploads:.2f}s per upload "
+              f"({server.stats['failures'] - failures} injected failures)")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
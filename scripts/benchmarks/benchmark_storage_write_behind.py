@@ -0,0 +1,122 @@
+"""
+Benchmark SupabaseStorage.save(): synchronous upload vs write-behind queue.
+
+Runs the in-process stand-in storage server (scripts/testing/
+storage_standin_server.py) with --latency-ms per request and saves the same
+image --saves times, first with the upload inside save() and then with
+STORAGE_WRITE_BEHIND (spool to disk, upload from background threads). The
+write-behind run reports save() latency and how long the uploaders took to
+drain the queue; a second write-behind run has --fail-rate of the requests
+fail. Uses a throwaway SQLite database and spool directory.
+
+    python scripts/benchmarks/benchmark_storage_write_behind.py --saves 50
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BASE_DIR))
+sys.path.insert(0, str(BASE_DIR / 'scripts' / 'testing'))
+
+from storage_standin_server import StandInStorageServer
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark synchronous vs write-behind storage saves')
+    parser.add_argument('--saves', type=int, default=50)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--fail-rate', type=float, default=0.2)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--image', default=str(
+        BASE_DIR / 'datasets' / 'test_samples' / 'soil_images' / 'Black_9.jpg'
+    ))
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    from django.conf import settings
+    django.setup()
+
+    work_dir = Path(tempfile.mkdtemp())
+    settings.DATABASES['default'] = dict(
+        settings.DATABASES['default'], ENGINE='django.db.backends.sqlite3',
+        NAME=str(work_dir / 'write_behind.sqlite3')
+    )
+    # App setup may already have connected to the configured database
+    from django.db import connections
+    connections['default'].close()
+    del connections['default']
+
+    from django.core.files.base import ContentFile
+    from django.core.management import call_command
+    from apps.core import upload_queue
+    from apps.core.models import PendingUpload
+    from config.storage_client import reset_storage_client
+    from config.supabase_storage import SoilImageStorage
+
+    call_command('migrate', verbosity=0)
+
+    server = StandInStorageServer(('127.0.0.1', 0), latency_ms=args.latency_ms)
+    server.serve_in_thread()
+    settings.SUPABASE_URL = server.url
+    settings.SUPABASE_KEY = 'local'
+    settings.SUPABASE_STORAGE = dict(
+        getattr(settings, 'SUPABASE_STORAGE', {}), URL='', INDEX_ENABLED=True, RETRY_BACKOFF=0.05
+    )
+    reset_storage_client()
+    storage = SoilImageStorage()
+    data = Path(args.image).read_bytes()
+
+    def run(write_behind, fail_rate=0.0):
+        settings.STORAGE_WRITE_BEHIND = dict(
+            getattr(settings, 'STORAGE_WRITE_BEHIND', {}), ENABLED=write_behind,
+            SPOOL_DIR=str(work_dir / 'spool'), WORKERS=args.workers,
+            POLL_INTERVAL=0.1, RETRY_BACKOFF=0.1, MAX_BACKOFF=1.0, MAX_ATTEMPTS=20
+        )
+        upload_queue._worker = None
+        server.fail_rate = fail_rate
+        failures = server.stats['failures']
+
+        latencies = []
+        start = time.perf_counter()
+        for i in range(args.saves):
+            t = time.perf_counter()
+            storage.save(f'soil_{write_behind:d}_{fail_rate:g}_{i}.jpg', ContentFile(data))
+            latencies.append((time.perf_counter() - t) * 1000)
+        saved = time.perf_counter() - start
+        while PendingUpload.objects.exists():
+            time.sleep(0.01)
+        drained = time.perf_counter() - start
+
+        label = 'write-behind' if write_behind else 'synchronous'
+        print(f"{label:<14} {fail_rate:>5.0%} {statistics.mean(latencies):9.1f} "
+              f"{percentile(latencies, 0.95):9.1f} {saved:9.2f} {drained:10.2f} "
+              f"{server.stats['failures'] - failures:>9}")
+
+    print("=" * 78)
+    print(f"STORAGE SAVES ({args.saves} x {len(data) / 1024:.0f} KB, request latency +{args.latency_ms:g} ms, "
+          f"{args.workers} uploaders)")
+    print("=" * 78)
+    print(f"{'mode':<14} {'fail':>5} {'mean ms':>9} {'p95 ms':>9} {'saves s':>9} {'uploaded s':>10} {'failures':>9}")
+    run(False)
+    run(True)
+    run(True, args.fail_rate)
+
+    server.shutdown()
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""
+Load test the sync and async prediction views with slow concurrent clients.
+
+Opens --clients concurrent connections to a running server. Each client logs
+in once and then sends --requests predictions. Soil uploads are streamed at
+--upload-kbps to mimic phones on a slow mobile network. Crop predictions are
+small form posts.
+
+For every path it prints the throughput, the latency percentiles and the
+average number of requests in flight (total request time / wall time, by
+Little's law).
+
+Use a phone-sized photo (--image, several MB): smaller uploads fit in the
+kernel's socket buffers, so even a sync worker never waits on the client.
+
+Before (sync views, one sync WSGI worker):
+    gunicorn config.wsgi -w 1 -b 127.0.0.1:8000
+    python scripts/benchmarks/loadtest_prediction_views.py --paths /predictions/soil/
+
+After (async views, one uvicorn worker):
+    uvicorn config.asgi:application --workers 1 --port 8000
+    python scripts/benchmarks/loadtest_prediction_views.py \\
+        --paths /predictions/soil/,/predictions/async/soil/
+
+--create-user creates the login user in the local database first (same
+settings as the server).
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+import httpx
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+CROP_FORM = {
+    'nitrogen': '90', 'phosphorus': '42', 'potassium': '43',
+    'temperature': '20.8', 'humidity': '82.0', 'ph_value': '6.5',
+    'rainfall': '202.9',
+}
+
+
+def create_user(username, password):
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+    from django.contrib.auth import get_user_model
+    user, _ = get_user_model().objects.get_or_create(
+        username=username, defaults={'email': f'{username}@example.com'}
+    )
+    user.set_password(password)
+    user.save()
+
+
+def multipart_body(image: bytes, csrf_token: str):
+    """Encode a soil upload form as multipart/form-data."""
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="csrfmiddlewaretoken"\r\n\r\n'
+        f'{csrf_token}\r\n'
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="soil_image"; filename="loadtest.jpg"\r\n'
+        f'Content-Type: image/jpeg\r\n\r\n'
+    ).encode() + image + f'\r\n--{boundary}--\r\n'.encode()
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+async def throttled(body: bytes, kbps: float):
+    """Yield body in 100 ms slices at kbps kilobits per second."""
+    if kbps <= 0:
+        yield body
+        return
+    chunk = max(int(kbps * 1000 / 8 * 0.1), 1)
+    for start in range(0, len(body), chunk):
+        yield body[start:start + chunk]
+        await asyncio.sleep(0.1)
+
+
+async def login(client, username, password):
+    """Log in through the login form and return the CSRF token."""
+    await client.get('/accounts/login/')
+    token = client.cookies['csrftoken']
+    response = await client.post('/accounts/login/', data={
+        'username': username, 'password': password, 'csrfmiddlewaretoken': token,
+    })
+    if response.status_code != 302 or 'sessionid' not in client.cookies:
+        raise SystemExit(f"Login as {username} failed (HTTP {response.status_code})")
+    return client.cookies['csrftoken']
+
+
+async def send(client, path, token, image, kbps):
+    """One prediction request; returns (status, seconds)."""
+    start = time.perf_counter()
+    if 'soil' in path:
+        body, content_type = multipart_body(image, token)
+        response = await client.post(path, content=throttled(body, kbps), headers={
+            'Content-Type': content_type,
+            'Content-Length': str(len(body)),
+            'X-CSRFToken': token,
+        })
+    else:
+        response = await client.post(
+            path, data=dict(CROP_FORM, csrfmiddlewaretoken=token),
+            headers={'X-CSRFToken': token}
+        )
+    return response.status_code, time.perf_counter() - start
+
+
+async def run_path(args, path, image):
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    timeout = httpx.Timeout(args.timeout)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout) as client:
+        token = await login(client, args.username, args.password)
+        await send(client, path, token, image, 0)  # warm up models
+
+        async def client_loop():
+            results = []
+            for _ in range(args.requests):
+                try:
+                    results.append(await send(client, path, token, image, args.upload_kbps))
+                except httpx.HTTPError as e:
+                    results.append((type(e).__name__, args.timeout))
+            return results
+
+        start = time.perf_counter()
+        per_client = await asyncio.gather(*(client_loop() for _ in range(args.clients)))
+        wall = time.perf_counter() - start
+
+    results = [r for client_results in per_client for r in client_results]
+    statuses = Counter(status for status, _ in results)
+    latencies = sorted(seconds for status, seconds in results if status == 302)
+    ok = len(latencies)
+    return {
+        'ok': ok,
+        'errors': {str(k): v for k, v in statuses.items() if k != 302},
+        'wall': wall,
+        'throughput': ok / wall,
+        'p50': latencies[ok // 2] if ok else 0.0,
+        'p95': latencies[min(int(ok * 0.95), ok - 1)] if ok else 0.0,
+        'max': latencies[-1] if ok else 0.0,
+        'concurrency': sum(seconds for _, seconds in results) / wall,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test sync vs async prediction views')
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--paths', default='/predictions/soil/,/predictions/async/soil/',
+                        help='Comma-separated view paths to test one after another')
+    parser.add_argument('--clients', type=int, default=32, help='Concurrent clients')
+    parser.add_argument('--requests', type=int, default=2, help='Requests per client')
+    parser.add_argument('--upload-kbps', type=float, default=512,
+                        help='Per-client soil upload bandwidth in kbit/s (0 = unthrottled)')
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--image', default=str(
+        BASE_DIR / 'datasets' / 'test_samples' / 'soil_images' / 'Black_9.jpg'
+    ))
+    parser.add_argument('--username', default='loadtest')
+    parser.add_argument('--password', default='loadtest-password')
+    parser.add_argument('--create-user', action='store_true',
+                        help='Create/reset the login user in the local database first')
+    args = parser.parse_args()
+
+    if args.create_user:
+        create_user(args.username, args.password)
+
+    image = Path(args.image).read_bytes()
+    upload_s = len(image) * 8 / (args.upload_kbps * 1000) if args.upload_kbps else 0
+
+    print("=" * 78)
+    print(f"PREDICTION VIEW LOAD TEST ({args.url}, {args.clients} clients x {args.requests} requests)")
+    print(f"Soil upload: {len(image) / 1024:.0f} KB at {args.upload_kbps:g} kbit/s (~{upload_s:.1f}s per upload)")
+    print("=" * 78)
+    print(f"{'path':<26} {'ok':>5} {'req/s':>7} {'p50 s':>7} {'p95 s':>7} {'max s':>7} {'in flight':>9}")
+    for path in args.paths.split(','):
+        stats = asyncio.run(run_path(args, path, image))
+        print(
+            f"{path:<26} {stats['ok']:>5} {stats['throughput']:7.2f} {stats['p50']:7.2f} "
+            f"{stats['p95']:7.2f} {stats['max']:7.2f} {stats['concurrency']:9.1f}"
+        )
+        if stats['errors']:
+            print(f"{'':<26} errors: {stats['errors']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Measure per-worker memory of the crop predictor across backends.
+
+Starts N worker processes that each load the crop model (like gunicorn
+workers without --preload), waits until all of them are loaded, then reads
+/proc/<pid>/smaps_rollup so PSS reflects pages shared between workers.
+
+Usage:
+    python scripts/benchmarks/measure_worker_memory.py --workers 4
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Backend label -> environment overrides
+CONFIGS = {
+    'sklearn': {'CROP_MODEL_BACKEND': 'sklearn', 'CROP_MODEL_MMAP': 'False'},
+    'fused': {'CROP_MODEL_BACKEND': 'fused', 'CROP_MODEL_MMAP': 'False'},
+    'fused+mmap': {'CROP_MODEL_BACKEND': 'fused', 'CROP_MODEL_MMAP': 'True'},
+}
+
+WORKER_CODE = """
+import os, sys, warnings
+warnings.filterwarnings('ignore')
+sys.path.insert(0, {base_dir!r})
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+import django
+django.setup()
+from apps.predictions.ml_services.crop_predictor import CropPredictor
+
+def read_kb():
+    stats = {{}}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                stats[parts[0].rstrip(':')] = int(parts[1])
+    return stats
+
+before = read_kb()
+predictor = CropPredictor()
+predictor.predict({{'nitrogen': 90, 'phosphorus': 42, 'potassium': 43,
+                   'temperature': 21, 'humidity': 82, 'ph_value': 6.5,
+                   'rainfall': 203}})
+print('READY', flush=True)
+sys.stdin.readline()
+after = read_kb()
+private = lambda s: s['Private_Clean'] + s['Private_Dirty']
+print('STATS', after['Rss'], after['Pss'], private(after) - private(before), flush=True)
+"""
+
+
+def measure(label, env_overrides, workers):
+    """Run `workers` processes with one configuration and return averages."""
+    env = dict(os.environ, **env_overrides)
+    code = WORKER_CODE.format(base_dir=BASE_DIR)
+    procs = [
+        subprocess.Popen(
+            [sys.executable, '-c', code], cwd=BASE_DIR, env=env,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, text=True
+        )
+        for _ in range(workers)
+    ]
+
+    # Wait until every worker has loaded the model
+    for proc in procs:
+        for line in proc.stdout:
+            if line.startswith('READY'):
+                break
+
+    results = []
+    for proc in procs:
+        proc.stdin.write('\n')
+        proc.stdin.flush()
+    for proc in procs:
+        for line in proc.stdout:
+            if line.startswith('STATS'):
+                results.append([int(v) for v in line.split()[1:]])
+                break
+        proc.wait()
+
+    rss, pss, private = (sum(col) / len(col) / 1024 for col in zip(*results))
+    print(f"{label:<12} {rss:>10.1f} {pss:>10.1f} {private:>16.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"Per-worker memory in MB, {args.workers} concurrent workers")
+    print(f"{'Backend':<12} {'RSS':>10} {'PSS':>10} {'Private (model)':>16}")
+    print("-" * 52)
+    for label, env_overrides in CONFIGS.items():
+        measure(label, env_overrides, args.workers)
+
+
+if __name__ == '__main__':
+    main()
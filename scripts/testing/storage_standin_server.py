@@ -0,0 +1,355 @@
+"""
+Local stand-in for the Supabase Storage API.
+
+Implements the part of /storage/v1 that config/storage_client.py uses, in
+memory, so the storage backend can be exercised without a Supabase project:
+
+    POST/PUT /object/<bucket>/<name>        upload (raw or multipart body)
+    GET/HEAD /object/[public/]<bucket>/<name>   (honours Range: bytes=N-[M])
+    DELETE   /object/<bucket>               {"prefixes": [...]}
+    POST     /object/list/<bucket>          {"prefix", "limit", "offset"}
+    POST     /upload/resumable              TUS create
+    HEAD/PATCH /upload/resumable/<id>       TUS offset / append
+
+Faults can be injected to check timeouts, retries and connection reuse:
+
+    --latency-ms          delay added to every request
+    --connect-latency-ms  delay added once per new connection (TLS handshake)
+    --fail-rate           fraction of requests answered 503 (a failing PATCH
+                          stores half its chunk first)
+
+GET /__stats__ returns connection / request / failure counters.
+
+Run it and point the app at it:
+
+    python scripts/testing/storage_standin_server.py --port 5000
+    SUPABASE_STORAGE_URL=http://127.0.0.1:5000 SUPABASE_KEY=local \\
+        python manage.py runserver
+
+or import StandInStorageServer and call serve_in_thread() from a script.
+"""
+
+import argparse
+import base64
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+PREFIX = '/storage/v1'
+
+
+class StandInStorageServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, key='', latency_ms=0.0, connect_latency_ms=0.0, fail_rate=0.0, seed=0):
+        super().__init__(address, _Handler)
+        self.key = key
+        self.latency = latency_ms / 1000.0
+        self.connect_latency = connect_latency_ms / 1000.0
+        self.fail_rate = fail_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.objects = {}   # (bucket, name) -> (bytes, content_type, updated)
+        self.uploads = {}   # upload id -> {'bucket', 'name', 'type', 'length', 'data'}
+        self.stats = {'connections': 0, 'requests': 0, 'failures': 0}
+        self.version = 0    # bumped on every write; invalidates listings
+        self.listings = {}  # (bucket, prefix, version, len(objects)) -> sorted entries
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_in_thread(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def handle_error(self, request, client_address):
+        # Clients closing a streamed download midway (seek, close) are expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def should_fail(self):
+        with self.lock:
+            return self.random.random() < self.fail_rate
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    disable_nagle_algorithm = True
+    wbufsize = -1  # headers and body go out in one write
+
+    def setup(self):
+        super().setup()
+        self.server.count('connections')
+        if self.server.connect_latency:
+            time.sleep(self.server.connect_latency)
+
+    def log_message(self, format, *args):
+        pass
+
+    # -- plumbing ------------------------------------------------------
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _send(self, status, body=b'', content_type='application/json', headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _error(self, status, error, message=''):
+        self._send(status, {'statusCode': str(status), 'error': error, 'message': message or error})
+
+    def _dispatch(self):
+        server = self.server
+        server.count('requests')
+        path = urlsplit(self.path).path
+
+        if path == '/__stats__':
+            return self._send(200, dict(server.stats, objects=len(server.objects)))
+        if server.latency:
+            time.sleep(server.latency)
+        if not path.startswith(PREFIX):
+            return self._error(404, 'not_found')
+        if server.key and self.headers.get('Authorization') != f'Bearer {server.key}':
+            return self._error(403, 'Unauthorized', 'Invalid API key')
+
+        if server.should_fail():
+            server.count('failures')
+            if self.command == 'PATCH':
+                # Keep part of the chunk to exercise resume-from-offset
+                return self._tus_patch(path[len(PREFIX):], fail=True)
+            self._body()
+            return self._error(503, 'Service Unavailable')
+
+        route = path[len(PREFIX):]
+        if route.startswith('/upload/resumable'):
+            handler = {'POST': self._tus_create, 'HEAD': self._tus_head, 'PATCH': self._tus_patch}
+        elif route.startswith('/object/list/'):
+            handler = {'POST': self._list}
+        else:
+            handler = {
+                'POST': self._upload, 'PUT': self._upload,
+                'GET': self._download, 'HEAD': self._download,
+                'DELETE': self._delete,
+            }
+        if self.command not in handler:
+            self._body()
+            return self._error(405, 'Method not allowed')
+        handler[self.command](route)
+
+    do_GET = do_HEAD = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch
+
+    # -- objects -------------------------------------------------------
+
+    def _split(self, route):
+        bucket, _, name = route[len('/object/'):].partition('/')
+        return unquote(bucket), unquote(name)
+
+    def _store(self, bucket, name, data, content_type, upsert):
+        with self.server.lock:
+            if (bucket, name) in self.server.objects and not upsert:
+                return False
+            self.server.objects[(bucket, name)] = (data, content_type, time.time())
+            self.server.version += 1
+            return True
+
+    def _upload(self, route):
+        bucket, name = self._split(route)
+        data = self._body()
+        content_type = self.headers.get('Content-Type', 'application/octet-stream')
+        if content_type.startswith('multipart/form-data'):
+            message = BytesParser(policy=HTTP).parsebytes(
+                f'Content-Type: {content_type}\r\n\r\n'.encode() + data
+            )
+            part = next(p for p in message.iter_parts() if p.get_filename() or p.get_param('name', header='content-disposition') == 'file')
+            data, content_type = part.get_payload(decode=True), part.get_content_type()
+        upsert = self.command == 'PUT' or self.headers.get('x-upsert') == 'true'
+        if not self._store(bucket, name, data, content_type, upsert):
+            return self._error(409, 'Duplicate', 'The resource already exists')
+        self._send(200, {'Key': f'{bucket}/{name}'})
+
+    def _download(self, route):
+        for access in ('/object/public/', '/object/authenticated/'):
+            if route.startswith(access):
+                route = '/object/' + route[len(access):]
+        bucket, name = self._split(route)
+        with self.server.lock:
+            obj = self.server.objects.get((bucket, name))
+        if obj is None:
+            return self._error(404, 'not_found', 'Object not found')
+        data, content_type, _ = obj
+        ranged = self._range(self.headers.get('Range'), len(data))
+        if ranged is None:
+            return self._send(200, data, content_type, headers={'Accept-Ranges': 'bytes'})
+        start, end = ranged
+        if start >= len(data):
+            return self._send(416, b'', content_type, headers={'Content-Range': f'bytes */{len(data)}'})
+        self._send(206, data[start:end + 1], content_type, headers={
+            'Accept-Ranges': 'bytes', 'Content-Range': f'bytes {start}-{end}/{len(data)}',
+        })
+
+    def _range(self, header, size):
+        """(start, end) of a single 'bytes=N-[M]' range, or None to send it all."""
+        if not header or not header.startswith('bytes=') or ',' in header:
+            return None
+        start, _, end = header[len('bytes='):].partition('-')
+        if not start.isdigit() or (end and not end.isdigit()):
+            return None
+        return int(start), min(int(end) if end else size - 1, size - 1)
+
+    def _delete(self, route):
+        bucket = unquote(route[len('/object/'):].strip('/'))
+        names = json.loads(self._body() or b'{}').get('prefixes', [])
+        deleted = []
+        with self.server.lock:
+            for name in names:
+                if self.server.objects.pop((bucket, name), None) is not None:
+                    self.server.version += 1
+                    deleted.append({'bucket_id': bucket, 'name': name})
+        self._send(200, deleted)
+
+    def _list(self, route):
+        bucket = unquote(route[len('/object/list/'):].strip('/'))
+        options = json.loads(self._body() or b'{}')
+        prefix = options.get('prefix', '').strip('/')
+        prefix = f'{prefix}/' if prefix else ''
+        with self.server.lock:
+            key = (bucket, prefix, self.server.version, len(self.server.objects))
+            listing = self.server.listings.get(key)
+            if listing is None:
+                listing = self.server.listings[key] = self._listing(bucket, prefix)
+        offset, limit = int(options.get('offset', 0)), int(options.get('limit', 100))
+        self._send(200, listing[offset:offset + limit])
+
+    def _listing(self, bucket, prefix):
+        """Sorted entries directly under prefix (folders have no id)."""
+        entries = {}
+        for (b, name), (data, content_type, updated) in self.server.objects.items():
+            if b != bucket or not name.startswith(prefix):
+                continue
+            rest = name[len(prefix):]
+            if '/' in rest:
+                folder = rest.split('/', 1)[0]
+                entries[folder] = {'name': folder, 'id': None, 'metadata': None}
+            else:
+                entries[rest] = {
+                    'name': rest,
+                    'id': str(uuid.uuid5(uuid.NAMESPACE_URL, f'{b}/{name}')),
+                    'updated_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(updated)),
+                    'metadata': {'size': len(data), 'mimetype': content_type},
+                }
+        return [entries[k] for k in sorted(entries)]
+
+    # -- resumable (TUS) -----------------------------------------------
+
+    def _tus_create(self, route):
+        self._body()
+        metadata = {}
+        for item in self.headers.get('Upload-Metadata', '').split(','):
+            if item.strip():
+                k, _, v = item.strip().partition(' ')
+                metadata[k] = base64.b64decode(v).decode()
+        bucket, name = metadata.get('bucketName'), metadata.get('objectName')
+        if not bucket or not name:
+            return self._error(400, 'InvalidRequest', 'bucketName and objectName are required')
+        with self.server.lock:
+            if (bucket, name) in self.server.objects and self.headers.get('x-upsert') != 'true':
+                exists = True
+            else:
+                exists = False
+                upload_id = uuid.uuid4().hex
+                self.server.uploads[upload_id] = {
+                    'bucket': bucket, 'name': name,
+                    'type': metadata.get('contentType', 'application/octet-stream'),
+                    'length': int(self.headers['Upload-Length']),
+                    'data': bytearray(),
+                }
+        if exists:
+            return self._error(409, 'Duplicate', 'The resource already exists')
+        self._send(201, headers={
+            'Location': f'{PREFIX}/upload/resumable/{upload_id}', 'Tus-Resumable': '1.0.0',
+        })
+
+    def _tus_upload(self, route):
+        return self.server.uploads.get(route.rsplit('/', 1)[-1])
+
+    def _tus_head(self, route):
+        upload = self._tus_upload(route)
+        if upload is None:
+            return self._error(404, 'not_found')
+        self._send(200, headers={
+            'Upload-Offset': str(len(upload['data'])),
+            'Upload-Length': str(upload['length']),
+            'Tus-Resumable': '1.0.0',
+            'Cache-Control': 'no-store',
+        })
+
+    def _tus_patch(self, route, fail=False):
+        chunk = self._body()
+        upload = self._tus_upload(route)
+        if upload is None:
+            return self._error(404, 'not_found')
+        with self.server.lock:
+            if int(self.headers.get('Upload-Offset', -1)) != len(upload['data']):
+                conflict = True
+            else:
+                conflict = False
+                upload['data'] += chunk[:len(chunk) // 2] if fail else chunk
+                offset = len(upload['data'])
+                done = offset >= upload['length']
+        if conflict:
+            return self._error(409, 'Conflict', 'Upload-Offset does not match')
+        if fail:
+            return self._error(503, 'Service Unavailable')
+        if done:
+            self._store(upload['bucket'], upload['name'], bytes(upload['data']), upload['type'], True)
+            with self.server.lock:
+                self.server.uploads.pop(route.rsplit('/', 1)[-1], None)
+        self._send(204, headers={'Upload-Offset': str(offset), 'Tus-Resumable': '1.0.0'})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the Supabase Storage API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--key', default='', help='Require this bearer token (default: accept any)')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--connect-latency-ms', type=float, default=0)
+    parser.add_argument('--fail-rate', type=float, default=0)
+    args = parser.parse_args()
+
+    server = StandInStorageServer(
+        (args.host, args.port), key=args.key, latency_ms=args.latency_ms,
+        connect_latency_ms=args.connect_latency_ms, fail_rate=args.fail_rate
+    )
+    print(f"Stand-in storage listening on {server.url}{PREFIX}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()